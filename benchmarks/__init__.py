@@ -0,0 +1,211 @@
+"""
+==========
+Benchmarks
+==========
+
+Measures the overhead that :mod:`test_helpers` adds to a test suite:
+creating and dropping temporary databases, installing virtual hosts,
+sending requests through :class:`~test_helpers.mixins.tornado.TornadoMixin`,
+encoding and decoding bodies, and creating patches.
+
+Run the suite from the top of the repository::
+
+   python -m benchmarks [--live] [--filter NAME] [--compare]
+
+The Postgres, MongoDB, and RabbitMQ benchmarks talk to in-process
+stand-ins for the client libraries by default so that they measure
+the helpers and not the servers.  Pass ``--live`` to run them against
+the servers named by the usual environment variables instead.  They
+always create their resources directly, so :envvar:`TEST_HELPERS_BROKER`
+is ignored while the benchmarks run.
+
+Each run is appended to a JSON lines history file, ``build/benchmarks.jsonl``
+unless :envvar:`TEST_HELPERS_BENCHMARK_HISTORY` says otherwise.  With
+``--compare``, the run is compared with the most recent run in the
+history from the same Python version, platform, and mode.  The command
+exits with a non-zero status if any benchmark got slower by more than
+the ``--threshold`` fraction.
+
+"""
+import collections
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+
+Benchmark = collections.namedtuple('Benchmark', ['name', 'factory', 'live'])
+"""A registered benchmark."""
+
+_benchmarks = []
+
+DEFAULT_HISTORY = os.path.join('build', 'benchmarks.jsonl')
+
+
+class Skip(Exception):
+    """Raised by a benchmark factory that cannot run here."""
+
+
+def benchmark(name, live=False):
+    """
+    Register a benchmark factory.
+
+    :param str name: the name that results are recorded under
+    :param bool live: does the benchmark require ``--live``?
+
+    The decorated function is called with a :class:`bool` that is
+    :data:`True` when running against live servers.  It is a generator
+    that yields the callable to time once, does its set up before the
+    ``yield``, and its clean up after it.  It can raise :class:`Skip`
+    if a dependency is not available.
+
+    """
+    def register(factory):
+        _benchmarks.append(Benchmark(name, factory, live))
+        return factory
+    return register
+
+
+def measure(function, repeat=5, min_time=0.05):
+    """
+    Time `function` and return per-call statistics.
+
+    :param function: the callable to time
+    :param int repeat: the number of samples to take
+    :param float min_time: the smallest duration of a sample.  The
+        number of calls in each sample is doubled until a sample
+        takes at least this long.
+    :returns: a :class:`dict` with the ``min`` and ``median`` seconds
+        per call and the ``number`` of calls in each sample
+
+    """
+    timer = timeit.Timer(function)
+    number = 1
+    while timer.timeit(number) < min_time and number < 1 << 20:
+        number *= 2
+    samples = sorted(elapsed / number
+                     for elapsed in timer.repeat(repeat, number))
+    return {'min': samples[0], 'median': samples[len(samples) // 2],
+            'number': number}
+
+
+def run(live=False, selected=None, repeat=5):
+    """
+    Run the registered benchmarks.
+
+    :param bool live: run against live servers instead of stand-ins
+    :param str selected: only run benchmarks whose name contains this
+    :param int repeat: the number of samples to take of each benchmark
+    :returns: a :class:`dict` that maps benchmark names to the
+        statistics returned by :func:`measure` or to :data:`None` if
+        the benchmark was skipped
+
+    :envvar:`TEST_HELPERS_BROKER` is unset while the benchmarks run.
+
+    """
+    broker_setting = os.environ.pop('TEST_HELPERS_BROKER', None)
+    try:
+        return _run(live, selected, repeat)
+    finally:
+        if broker_setting is not None:
+            os.environ['TEST_HELPERS_BROKER'] = broker_setting
+
+
+def _run(live, selected, repeat):
+    results = {}
+    for name, factory, needs_live in _benchmarks:
+        if selected and selected not in name:
+            continue
+        if needs_live and not live:
+            results[name] = None
+            continue
+        steps = factory(live)
+        try:
+            function = next(steps)
+        except Skip:
+            results[name] = None
+            continue
+        try:
+            results[name] = measure(function, repeat)
+        finally:
+            for _ in steps:
+                pass
+    return results
+
+
+def _revision():
+    try:
+        with open(os.devnull, 'w') as devnull:
+            output = subprocess.check_output(
+                ['git', 'rev-parse', '--short', 'HEAD'], stderr=devnull)
+        return output.decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_record(results, live=False):
+    """Wrap `results` with what is needed to compare them later."""
+    return {
+        'timestamp': time.time(),
+        'revision': _revision(),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': sys.platform,
+        'live': live,
+        'results': results,
+    }
+
+
+def _comparable(record, other):
+    return all(record[key] == other.get(key)
+               for key in ('python', 'implementation', 'platform', 'live'))
+
+
+def load_history(path):
+    """Return the records in the history file at `path`."""
+    if not os.path.exists(path):
+        return []
+    with open(path) as history_file:
+        return [json.loads(line) for line in history_file if line.strip()]
+
+
+def append_history(path, record):
+    """Append `record` to the history file at `path`."""
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(path, 'a') as history_file:
+        history_file.write(json.dumps(record, sort_keys=True) + '\n')
+
+
+def compare(record, history, threshold=0.25):
+    """
+    Compare `record` with the latest comparable record in `history`.
+
+    :param dict record: the record returned by :func:`make_record`
+    :param list history: earlier records, oldest first
+    :param float threshold: the fraction that the fastest time per call
+        can grow by before it is reported as a regression
+    :returns: a :class:`tuple` of the baseline record or :data:`None`
+        and a :class:`list` of ``(name, baseline, current, ratio,
+        regressed)`` tuples for every benchmark that both records
+        measured
+
+    """
+    for baseline in reversed(history):
+        if _comparable(record, baseline):
+            break
+    else:
+        return None, []
+
+    rows = []
+    for name, current in sorted(record['results'].items()):
+        previous = baseline['results'].get(name)
+        if current is None or previous is None:
+            continue
+        ratio = current['min'] / previous['min']
+        rows.append((name, previous['min'], current['min'], ratio,
+                     ratio > 1.0 + threshold))
+    return baseline, rows
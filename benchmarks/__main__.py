@@ -0,0 +1,61 @@
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+
+import benchmarks
+from benchmarks import fixtures, mixins  # noqa: F401 -- registers benchmarks
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='Measure the overhead of the test helpers.')
+    parser.add_argument('--live', action='store_true',
+                        help='use live servers instead of stand-ins')
+    parser.add_argument('--filter', dest='selected',
+                        help='only run benchmarks whose name contains this')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='samples to take of each benchmark')
+    parser.add_argument('--history', default=os.environ.get(
+        'TEST_HELPERS_BENCHMARK_HISTORY', benchmarks.DEFAULT_HISTORY),
+        help='JSON lines file that results are appended to')
+    parser.add_argument('--no-save', dest='save', action='store_false',
+                        help='do not append this run to the history')
+    parser.add_argument('--compare', action='store_true',
+                        help='compare with the latest comparable run')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='slowdown fraction reported as a regression')
+    options = parser.parse_args(args)
+
+    results = benchmarks.run(options.live, options.selected, options.repeat)
+    record = benchmarks.make_record(results, options.live)
+    for name, stats in sorted(results.items()):
+        if stats is None:
+            print('{0:50} skipped'.format(name))
+        else:
+            print('{0:50} {1:12.2f} us'.format(name, stats['min'] * 1e6))
+
+    status = 0
+    if options.compare:
+        baseline, rows = benchmarks.compare(
+            record, benchmarks.load_history(options.history),
+            options.threshold)
+        if baseline is None:
+            print('\nno comparable run in {0}'.format(options.history))
+        else:
+            print('\ncompared with {0}:'.format(
+                baseline['revision'] or 'previous run'))
+            for name, previous, current, ratio, regressed in rows:
+                print('{0:50} {1:+7.1%}{2}'.format(
+                    name, ratio - 1.0, '  REGRESSION' if regressed else ''))
+                status = status or int(regressed)
+
+    if options.save:
+        benchmarks.append_history(options.history, record)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
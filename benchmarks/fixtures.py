@@ -0,0 +1,184 @@
+"""Benchmarks for the Postgres, MongoDB, and RabbitMQ fixtures."""
+import atexit
+import collections
+
+from test_helpers import mongo, postgres, rabbit
+from test_helpers.compat import mock
+
+from . import benchmark
+
+
+class _Cursor(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, sql):
+        pass
+
+
+class _Connection(object):
+
+    autocommit = False
+
+    def cursor(self):
+        return _Cursor()
+
+    def close(self):
+        pass
+
+
+class _Psycopg2(object):
+    """Stands in for :mod:`psycopg2` without talking to a server."""
+
+    @staticmethod
+    def connect(**kwargs):
+        return _Connection()
+
+
+class _MongoClient(object):
+    """Stands in for :class:`pymongo.MongoClient`."""
+
+    databases = collections.defaultdict(
+        lambda: collections.defaultdict(list))
+
+    def __init__(self, host, port):
+        pass
+
+    def __getitem__(self, name):
+        return _MongoDatabase(self.databases[name])
+
+    def drop_database(self, name):
+        self.databases.pop(name, None)
+
+
+class _MongoDatabase(object):
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __getitem__(self, name):
+        return _MongoCollection(self.documents[name])
+
+
+class _MongoCollection(object):
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def insert(self, document):
+        self.documents.append(document)
+
+
+class _Response(object):
+
+    status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+
+class _Session(object):
+    """Stands in for a :class:`requests.Session` with the management API."""
+
+    def __init__(self):
+        self.headers = {}
+        self.auth = None
+
+    def request(self, method, url, **kwargs):
+        return _Response()
+
+
+class _Requests(object):
+    session = _Session
+
+
+class _Atexit(object):
+    """Stands in for :mod:`atexit` while fixtures are created repeatedly."""
+
+    @staticmethod
+    def register(function, *args, **kwargs):
+        return function
+
+
+@benchmark('postgres.TemporaryDatabase.create+drop')
+def postgres_create_drop(live):
+    patcher = None
+    if not live:
+        patcher = mock.patch.object(postgres, 'psycopg2', _Psycopg2)
+        patcher.start()
+
+    def create_drop():
+        database = postgres.TemporaryDatabase()
+        database.create()
+        database.drop()
+
+    try:
+        yield create_drop
+    finally:
+        del postgres._temporary_databases[:]
+        if patcher is not None:
+            patcher.stop()
+
+
+@benchmark('mongo.TemporaryDatabase.create+drop')
+def mongo_create_drop(live):
+    patcher = None
+    if not live:
+        patcher = mock.patch.object(mongo.pymongo, 'MongoClient',
+                                    _MongoClient)
+        patcher.start()
+
+    def create_drop():
+        database = mongo.TemporaryDatabase()
+        database.create()
+        database.drop()
+
+    try:
+        yield create_drop
+    finally:
+        if patcher is not None:
+            patcher.stop()
+
+
+def _rabbit_fixture(live):
+    # the fixture registers its clean up on every install, so it is
+    # registered once here instead of once for each timed call
+    patchers = [mock.patch.object(rabbit, 'atexit', _Atexit)]
+    if not live:
+        patchers.append(mock.patch.object(rabbit, 'requests', _Requests))
+    for patcher in patchers:
+        patcher.start()
+    fixture = rabbit.RabbitMqFixture('localhost', 'guest', 'guest')
+    atexit.register(fixture.remove_virtual_host)
+    return fixture, patchers
+
+
+@benchmark('rabbit.RabbitMqFixture.install_virtual_host')
+def rabbit_install_virtual_host(live):
+    fixture, patchers = _rabbit_fixture(live)
+
+    def install_remove():
+        fixture.install_virtual_host()
+        fixture.remove_virtual_host()
+
+    try:
+        yield install_remove
+    finally:
+        for patcher in patchers:
+            patcher.stop()
+
+
+@benchmark('rabbit.RabbitMqFixture.create_binding')
+def rabbit_create_binding(live):
+    fixture, patchers = _rabbit_fixture(live)
+    fixture.install_virtual_host()
+    try:
+        yield lambda: fixture.create_binding('exchange', 'queue', 'key')
+    finally:
+        fixture.remove_virtual_host()
+        for patcher in patchers:
+            patcher.stop()
@@ -0,0 +1,120 @@
+"""Benchmarks for the Tornado, codec, and patching mixins."""
+from test_helpers import bases, mixins
+
+from . import Skip, benchmark
+
+
+def target():
+    """Patched by the :class:`~test_helpers.mixins.PatchMixin` benchmarks."""
+    return 'original'
+
+
+class Target(object):
+    """Autospecced by the :class:`~test_helpers.mixins.PatchMixin`
+    benchmarks."""
+
+    def __init__(self, host, port=None):
+        self.host = host
+
+    def get(self, path, params=None):
+        return path
+
+    def post(self, path, body, headers=None):
+        return path
+
+
+def _tornado():
+    try:
+        from tornado import web
+        from test_helpers.mixins import tornado
+    except ImportError:
+        raise Skip('tornado is not installed')
+    return web, tornado
+
+
+def _start(handler, transport, *mixin_classes):
+    web, tornado = _tornado()
+    test_class = type('Benchmark', mixin_classes + (tornado.TornadoMixin,), {})
+    test_class.start_tornado(web.Application([('/', handler)]), transport)
+    return test_class
+
+
+def _request_benchmark(transport):
+    web, tornado = _tornado()
+
+    class Handler(web.RequestHandler):
+        def get(self):
+            self.write('ok')
+
+    test_class = _start(Handler, transport)
+    try:
+        yield lambda: test_class.get('/')
+    finally:
+        test_class.stop_tornado()
+
+
+for _transport in ('tcp', 'unix', 'memory'):
+    benchmark('tornado.TornadoMixin.request[{0}]'.format(_transport))(
+        lambda live, transport=_transport: _request_benchmark(transport))
+
+
+@benchmark('tornado.JsonMixin.request[memory]')
+def json_request(live):
+    web, tornado = _tornado()
+    document = {'items': [{'id': index, 'name': 'item {0}'.format(index),
+                           'tags': ['a', 'b', 'c']} for index in range(100)]}
+
+    class Handler(web.RequestHandler):
+        def post(self):
+            self.set_header('Content-Type', 'application/json')
+            self.write(self.request.body)
+
+    test_class = _start(Handler, 'memory', tornado.JsonMixin)
+
+    def round_trip():
+        return test_class.post('/', document).json['items']
+
+    try:
+        yield round_trip
+    finally:
+        test_class.stop_tornado()
+
+
+def _patch_benchmark(test_class, create):
+    test_class._active_patches = []
+
+    def create_stop():
+        create(test_class)
+        test_class.stop_patches()
+
+    yield create_stop
+
+
+def _patch_class(**attributes):
+    attributes.setdefault('patch_prefix', __name__)
+    return type('Benchmark', (mixins.PatchMixin, bases.BaseTest), attributes)
+
+
+@benchmark('PatchMixin.create_patch')
+def create_patch(live):
+    return _patch_benchmark(
+        _patch_class(), lambda cls: cls.create_patch('target'))
+
+
+@benchmark('PatchMixin.create_patch[autospec]')
+def create_autospec_patch(live):
+    return _patch_benchmark(
+        _patch_class(), lambda cls: cls.create_patch('Target', autospec=True))
+
+
+@benchmark('PatchMixin.create_patch[local]')
+def create_local_patch(live):
+    return _patch_benchmark(
+        _patch_class(patch_locally=True),
+        lambda cls: cls.create_patch('target'))
+
+
+@benchmark('PatchMixin.create_stub')
+def create_stub(live):
+    return _patch_benchmark(
+        _patch_class(), lambda cls: cls.create_stub('target'))
@@ -16,7 +16,7 @@ def read_requirements_file(filename):
 setup(
     name='test-helpers',
     description='A collection of test helpers to facilitate AAA testing.',
-    packages=find_packages(exclude=['tests', 'tests.*']),
+    packages=find_packages(exclude=['benchmarks', 'tests', 'tests.*']),
     test_suite='nose.collector',
     include_package_data=True,
     zip_safe=False,
@@ -28,10 +28,11 @@ setup(
     author_email='api@aweber.com',
     entry_points={'console_scripts': []},
     extras_require={
-        'tornado': ['tornado>=3.1'],
+        'tornado': ['tornado>=4.5'],
         'rabbit': ['requests>=2.3'],
         'postgres': ['psycopg2>=2.5,<3.0'],
-        'mongo': ['pymongo>=2.7,<2.8']
+        'mongo': ['pymongo>=2.7,<2.8'],
+        'msgpack': ['msgpack>=0.6'],
     },
     classifiers=[
         'Development Status :: 5 - Production/Stable',
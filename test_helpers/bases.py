@@ -10,8 +10,167 @@ the mixins and to help promote the usage of the Arrange-Act-Assert testing
 methodology used here at AWeber.
 
 """
+import atexit
+import cProfile
+import json
+import os
+import threading
+import timeit
+
+try:
+    import contextvars
+except ImportError:  # pragma: no cover
+    contextvars = None
+
+from test_helpers import resources
 from test_helpers.compat import unittest
 
+_class_context = None if contextvars is None else contextvars.ContextVar(
+    'test_helpers_class_context', default=None)
+_fixtures = {}
+_fixtures_lock = threading.Lock()
+_phase_times = {}
+_phase_profiles = {}
+
+
+class _CachedFixture(object):
+    """A fixture shared by the test classes that declare the same key."""
+
+    def __init__(self, teardown):
+        super(_CachedFixture, self).__init__()
+        self.teardown = teardown
+        self.value = None
+        self.created = False
+        self.invalid = False
+        self.references = 0
+        self.lock = threading.Lock()
+
+    def destroy(self):
+        if self.created:
+            self.created = False
+            self.teardown(self.value)
+            self.value = None
+
+
+def invalidate_fixture(key):
+    """Discard the cached fixture for `key`.
+
+    :param key: the :attr:`BaseTest.fixture_key` to invalidate
+
+    The next class that declares `key` creates a new fixture.  The
+    old fixture is destroyed as soon as no running class refers to it.
+
+    """
+    with _fixtures_lock:
+        entry = _fixtures.pop(key, None)
+        if entry is None:
+            return
+        entry.invalid = True
+        destroy = entry.references == 0
+    if destroy:
+        entry.destroy()
+
+
+def invalidate_fixtures():
+    """Discard every cached fixture.
+
+    This is registered with :func:`atexit.register` so cached fixtures
+    are destroyed when the process exits.
+
+    """
+    for key in list(_fixtures):
+        invalidate_fixture(key)
+
+atexit.register(invalidate_fixtures)
+
+
+def write_phase_report(path=None, slowest=20):
+    """Write the phase times recorded by :class:`BaseTest` as JSON.
+
+    :param str path: the file to write the report to.  This defaults
+        to the :envvar:`TEST_HELPERS_PHASE_REPORT` environment variable.
+    :param int slowest: the number of phases to list for each of
+        :meth:`~BaseTest.configure`, :meth:`~BaseTest.execute`, and
+        :meth:`~BaseTest.annihilate`
+    :returns: the report as a :class:`dict` or :data:`None` if no
+        report was written
+
+    The report contains the total time spent in each phase and the
+    slowest classes for each phase along with the profile that was
+    captured for them, if any.
+
+    This is registered with :func:`atexit.register` so the report
+    is written when the process exits if the environment variable
+    is set.
+
+    """
+    path = path or os.environ.get('TEST_HELPERS_PHASE_REPORT')
+    if not path or not _phase_times:
+        return None
+
+    report = {'class_count': len(_phase_times), 'totals': {}, 'slowest': {}}
+    for phase in ('configure', 'execute', 'annihilate'):
+        times = [(elapsed[phase], class_name)
+                 for class_name, elapsed in _phase_times.items()
+                 if phase in elapsed]
+        report['totals'][phase] = sum(elapsed for elapsed, _ in times)
+        report['slowest'][phase] = [
+            {'class': class_name, 'seconds': elapsed,
+             'profile': _phase_profiles.get((class_name, phase))}
+            for elapsed, class_name in sorted(times, reverse=True)[:slowest]]
+
+    with open(path, 'w') as report_file:
+        json.dump(report, report_file, indent=2, sort_keys=True)
+    return report
+
+atexit.register(write_phase_report)
+
+
+class _CProfileCapture(object):
+    """Profiles a phase with :mod:`cProfile`."""
+
+    suffix = '.prof'
+
+    def __init__(self):
+        super(_CProfileCapture, self).__init__()
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+
+    def save(self, path):
+        self.profiler.dump_stats(path)
+
+
+class _TracemallocCapture(object):
+    """Captures the memory allocated by a phase with :mod:`tracemalloc`."""
+
+    suffix = '.txt'
+
+    def __init__(self):
+        super(_TracemallocCapture, self).__init__()
+        import tracemalloc
+        self.tracemalloc = tracemalloc
+        self.started = not tracemalloc.is_tracing()
+        if self.started:
+            tracemalloc.start()
+        self.before = tracemalloc.take_snapshot()
+        self.after = None
+
+    def stop(self):
+        self.after = self.tracemalloc.take_snapshot()
+        if self.started:
+            self.tracemalloc.stop()
+
+    def save(self, path):
+        with open(path, 'w') as capture_file:
+            for stat in self.after.compare_to(self.before, 'lineno')[:50]:
+                capture_file.write('{0}\n'.format(stat))
+
+
+_profilers = {'cprofile': _CProfileCapture, 'tracemalloc': _TracemallocCapture}
+
 
 class BaseTest(unittest.TestCase):
     """Base class for the AWeber AAA testing style.
@@ -25,6 +184,47 @@ class BaseTest(unittest.TestCase):
 
     maxDiff = 100000
 
+    arrange_in_parallel = False
+    """Can :meth:`arrange` run in a background thread?
+
+    Set this to :data:`True` for test classes that do not share
+    mutable state with other test classes.  See
+    :mod:`test_helpers.parallel` for details.
+
+    """
+
+    fixture_key = None
+    """Key that identifies the fixture created by :meth:`create_fixture`.
+
+    Test classes that declare the same key share a single fixture
+    for the life of the process instead of each creating their own.
+    The fixture is available as :attr:`fixture` before
+    :meth:`configure` is called.  Call :func:`invalidate_fixture`
+    when a test changes the fixture so that later classes receive a
+    fresh one.
+
+    """
+
+    fixture = None
+    """The cached fixture when :attr:`fixture_key` is set."""
+
+    profile_phases = os.environ.get('TEST_HELPERS_PROFILE')
+    """Profiler to capture slow phases with.
+
+    This is either ``'cprofile'`` or ``'tracemalloc'``.  Each phase
+    is profiled and the capture is saved in :attr:`profile_directory`
+    when the phase takes longer than :attr:`profile_threshold`
+    seconds.  Profiling is disabled by default.
+
+    """
+
+    profile_threshold = float(
+        os.environ.get('TEST_HELPERS_PROFILE_THRESHOLD', '1.0'))
+    """Seconds that a phase must take for its profile to be saved."""
+
+    profile_directory = os.environ.get('TEST_HELPERS_PROFILE_DIR', '.')
+    """Directory that phase profiles are saved in."""
+
     @classmethod
     def setUpClass(cls):
         """Arrange the test and do the action.
@@ -33,19 +233,68 @@ class BaseTest(unittest.TestCase):
         this implementation as the last thing in your version of this
         method.
 
+        If :meth:`arrange` was already started by a
+        :class:`~test_helpers.parallel.ParallelArrangeSuite`, then this
+        waits for it to finish instead of arranging the test again.
+
         """
         super(BaseTest, cls).setUpClass()
+        arrangement = vars(cls).get('_arrangement')
+        if arrangement is not None:
+            del cls._arrangement
+            arrangement.wait()
+        else:
+            cls.arrange()
+
+    @classmethod
+    def arrange(cls):
+        """Run :meth:`configure` and :meth:`execute`.
+
+        :meth:`annihilate` is called if either of them fails.
+
+        :raises ValueError: if :attr:`profile_phases` names an unknown
+            profiler.  Nothing is configured in this case.
+
+        """
+        if cls.profile_phases and cls.profile_phases not in _profilers:
+            raise ValueError(
+                'unknown profiler {0!r}'.format(cls.profile_phases))
         try:
-            cls.configure()
-            cls.execute()
+            cls._acquire_fixture()
+            cls._time_phase('configure', cls.configure)
+            cls._time_phase('execute', cls._run_phase, cls.execute)
         except:
-            cls.annihilate()
+            cls._dismantle()
             raise
 
     @classmethod
     def tearDownClass(cls):
         super(BaseTest, cls).tearDownClass()
-        cls.annihilate()
+        cls._dismantle()
+
+    @classmethod
+    def _dismantle(cls):
+        """Run :meth:`annihilate` and release what :meth:`arrange` used."""
+        try:
+            cls._time_phase('annihilate', cls.annihilate)
+        finally:
+            if '_class_context' in vars(cls):
+                del cls._class_context
+            cls._release_fixture()
+            resources.check_leaks(_class_name(cls))
+
+    def run(self, result=None):
+        return self._in_class_context(super(BaseTest, self).run, result)
+
+    @classmethod
+    def get_phase_times(cls):
+        """Return the number of seconds that each phase took.
+
+        :returns: a :class:`dict` that maps the phase name to the
+            elapsed time of its most recent run for this class
+
+        """
+        return dict(_phase_times.get(_class_name(cls), {}))
 
     @classmethod
     def configure(cls):
@@ -68,3 +317,127 @@ class BaseTest(unittest.TestCase):
     def execute(cls):
         """Override to execute your test action."""
         pass
+
+    @classmethod
+    def create_fixture(cls):
+        """Override to create the fixture identified by :attr:`fixture_key`.
+
+        :returns: the fixture value.  The default implementation
+            returns :data:`None`.
+
+        This is called at most once for each :attr:`fixture_key`
+        until the key is invalidated.
+
+        """
+        return None
+
+    @classmethod
+    def destroy_fixture(cls, fixture):
+        """Extend to release a fixture created by :meth:`create_fixture`.
+
+        :param fixture: the value returned from :meth:`create_fixture`
+
+        This is called once the fixture has been invalidated and no
+        running class refers to it.
+
+        """
+        pass
+
+    @classmethod
+    def _time_phase(cls, name, function, *args):
+        """Call ``function(*args)`` and record how long it took."""
+        capture = None
+        if cls.profile_phases in _profilers:
+            try:
+                capture = _profilers[cls.profile_phases]()
+            except ValueError:  # another profiler is active in this process
+                pass
+        class_name = _class_name(cls)
+        start = timeit.default_timer()
+        try:
+            with resources.owned_by(class_name):
+                return cls._in_class_context(function, *args)
+        finally:
+            elapsed = timeit.default_timer() - start
+            _phase_times.setdefault(class_name, {})[name] = elapsed
+            if capture is not None:
+                capture.stop()
+                if elapsed >= cls.profile_threshold:
+                    path = os.path.join(
+                        cls.profile_directory,
+                        '{0}.{1}{2}'.format(class_name, name, capture.suffix))
+                    capture.save(path)
+                    _phase_profiles[class_name, name] = path
+
+    @classmethod
+    def _acquire_fixture(cls):
+        if cls.fixture_key is None:
+            return
+        with _fixtures_lock:
+            entry = _fixtures.get(cls.fixture_key)
+            if entry is None:
+                entry = _CachedFixture(cls.destroy_fixture)
+                _fixtures[cls.fixture_key] = entry
+            entry.references += 1
+        cls._fixture_entry = entry
+        with entry.lock:
+            if not entry.created:
+                entry.value = cls.create_fixture()
+                entry.created = True
+        cls.fixture = entry.value
+
+    @classmethod
+    def _release_fixture(cls):
+        entry = vars(cls).get('_fixture_entry')
+        if entry is None:
+            return
+        del cls._fixture_entry
+        with _fixtures_lock:
+            entry.references -= 1
+            destroy = entry.invalid and entry.references == 0
+        if destroy:
+            entry.destroy()
+
+    @classmethod
+    def _uses_class_context(cls):
+        """Should the class run in its own :class:`contextvars.Context`?
+
+        Mixins that keep their state in context variables extend this
+        to return :data:`True` when they are enabled.  The phases and
+        tests of the class then run in a context that is created when
+        the class is first used and discarded after :meth:`annihilate`
+        so that the state neither leaks into the thread that arranged
+        the class nor is missing from the thread that runs its tests.
+
+        """
+        return False
+
+    @classmethod
+    def _in_class_context(cls, function, *args):
+        """Call ``function(*args)`` in the context of the class."""
+        context = vars(cls).get('_class_context')
+        if context is None:
+            if contextvars is None or not cls._uses_class_context():
+                return function(*args)
+            context = contextvars.copy_context()
+            context.run(_class_context.set, context)
+            cls._class_context = context
+        if _class_context.get() is context:
+            return function(*args)
+        return context.run(function, *args)
+
+    @classmethod
+    def _run_phase(cls, phase):
+        """Run a test phase method such as :meth:`execute`.
+
+        :param phase: the bound class method to run
+        :returns: whatever `phase` returns
+
+        Extend this method to change how the phases are invoked.
+
+        """
+        return phase()
+
+
+def _class_name(cls):
+    return '{0}.{1}'.format(cls.__module__, cls.__name__)
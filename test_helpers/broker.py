@@ -0,0 +1,601 @@
+"""
+===============
+Fixture Broker
+===============
+
+The fixture broker is a small local process that owns pools of
+temporary Postgres databases, MongoDB databases, and RabbitMQ virtual
+hosts.  Test processes lease resources from it over a Unix domain
+socket instead of creating and destroying their own.  The broker keeps
+a few fresh MongoDB databases and virtual hosts warm, destroys returned
+resources and creates replacements in the background, and outlives the
+test processes so consecutive runs and parallel workers share it.
+Postgres databases are cloned when they are leased so that they always
+match the current template.
+
+The broker is used when the :envvar:`TEST_HELPERS_BROKER` environment
+variable is set.  Its value is either the path of the broker socket
+or ``1`` to use a socket in a per-user temporary directory.  The
+directory that holds the socket is created if it does not exist and
+must be a directory owned by the current user with mode ``0700``
+since leases carry database credentials.  The
+broker is started automatically the first time that a process needs
+it.  The existing APIs are unchanged:
+
+* :meth:`test_helpers.postgres.TemporaryDatabase.create` and
+  :meth:`~test_helpers.postgres.TemporaryDatabase.drop`
+* :meth:`test_helpers.mongo.TemporaryDatabase.create` and
+  :meth:`~test_helpers.mongo.TemporaryDatabase.drop`
+* :meth:`test_helpers.rabbit.RabbitMqFixture.install_virtual_host` and
+  :meth:`~test_helpers.rabbit.RabbitMqFixture.remove_virtual_host`
+
+Leased resources are never handed out twice.  They are destroyed when
+they are released or when the connection of the process that leased
+them closes, for example because the process exited or crashed.
+
+The broker can also be run by hand::
+
+   python -m test_helpers.broker --socket ~/.test-helpers/broker.sock
+
+It exits after :envvar:`TEST_HELPERS_BROKER_IDLE_TIMEOUT` seconds
+(600 by default) without connections and destroys its spare
+resources.  :envvar:`TEST_HELPERS_BROKER_POOL_SIZE` sets the number of
+spare resources kept for each pooled kind and set of parameters (2 by
+default).
+
+"""
+import argparse
+import collections
+import itertools
+import json
+import logging
+import os
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from six.moves import queue, socketserver
+
+_logger = logging.getLogger(__name__)
+_client = None
+_client_lock = threading.Lock()
+
+Lease = collections.namedtuple('Lease', ['lease_id', 'resource'])
+"""A leased resource and the identifier used to release it."""
+
+ResourceKind = collections.namedtuple(
+    'ResourceKind', ['create', 'describe', 'destroy', 'pooled'])
+ResourceKind.__new__.__defaults__ = (True,)
+"""Functions that manage one kind of pooled resource.
+
+``create`` is called with the lease parameters and returns a new
+resource, ``describe`` returns the JSON-compatible :class:`dict` sent
+to the process that leased the resource, and ``destroy`` is called
+with the resource when it is no longer needed.  ``pooled`` is
+:data:`False` for kinds that must be created when they are leased
+instead of being kept as spares.
+
+"""
+
+
+class BrokerError(RuntimeError):
+    """Raised when the broker cannot be reached or a request fails."""
+
+
+def _create_postgres(params):
+    from test_helpers import postgres
+    database = postgres.TemporaryDatabase(
+        user=params['user'], password=params['password'],
+        host=params['host'], port=params['port'],
+        **params['connect_kwargs'])
+    database.create(params['template'], **params['options'])
+    return database
+
+
+def _create_mongo(params):
+    from test_helpers import mongo
+    database = mongo.TemporaryDatabase(
+        host=params['host'], port=params['port'])
+    database.create()
+    return database
+
+
+def _create_vhost(params):
+    from test_helpers import rabbit
+    fixture = rabbit.RabbitMqFixture(
+        params['host'], params['user'], params['password'],
+        port=params['port'], mgmt_port=params['mgmt_port'])
+    fixture.install_virtual_host()
+    return fixture
+
+
+KINDS = {
+    'postgres': ResourceKind(
+        _create_postgres,
+        lambda database: {
+            'database': database.connection_parameters['database']},
+        lambda database: database.drop(),
+        pooled=False),
+    'mongo': ResourceKind(
+        _create_mongo,
+        lambda database: {'database': database.database_name},
+        lambda database: database.drop()),
+    'vhost': ResourceKind(
+        _create_vhost,
+        lambda fixture: {'virtual_host': fixture.virtual_host},
+        lambda fixture: fixture.remove_virtual_host()),
+}
+"""The :class:`ResourceKind` for each kind of resource that is pooled.
+
+Postgres databases are cloned from their template when they are
+leased instead of ahead of time.  A spare could have been cloned from
+an older version of the template, and cloning in the background would
+hold a connection to the template while the test process changes it.
+
+"""
+
+
+def default_socket_path():
+    """Return the broker socket path in a per-user temporary directory."""
+    user = os.getuid() if hasattr(os, 'getuid') else os.environ.get('USER')
+    return os.path.join(tempfile.gettempdir(),
+                        'test-helpers-{0}'.format(user), 'broker.sock')
+
+
+def _ensure_private_directory(path):
+    """Create the directory of `path` and make sure only we can use it.
+
+    :raises BrokerError: if the directory is not a real directory that
+        is owned by the current user with mode ``0700``.  Leases carry
+        credentials so a socket in a directory that another user
+        controls could be used to intercept them.
+
+    """
+    directory = os.path.dirname(path)
+    if not directory:
+        return
+    try:
+        os.makedirs(directory, 0o700)
+    except OSError:
+        if not os.path.isdir(directory):
+            raise
+    if not hasattr(os, 'getuid'):
+        return
+    status = os.lstat(directory)
+    if (not stat.S_ISDIR(status.st_mode) or status.st_uid != os.getuid() or
+            stat.S_IMODE(status.st_mode) != 0o700):
+        raise BrokerError(
+            'refusing to use {0} for the fixture broker since it is not a '
+            'directory owned by user {1} with mode 0700'.format(
+                directory, os.getuid()))
+
+
+class _Pool(object):
+
+    def __init__(self, kind, params):
+        super(_Pool, self).__init__()
+        self.kind = kind
+        self.params = params
+        self.spares = collections.deque()
+        self.pending = 0
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        broker = self.server.broker
+        leases = set()
+        broker._track_connection(1)
+        try:
+            for line in self.rfile:
+                try:
+                    reply = broker._dispatch(
+                        json.loads(line.decode('utf-8')), leases)
+                except Exception as error:
+                    reply = {'ok': False, 'error': '{0}: {1}'.format(
+                        error.__class__.__name__, error)}
+                self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+        finally:
+            for lease_id in leases:
+                broker.release(lease_id)
+            broker._track_connection(-1)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class Broker(object):
+    """
+    Serves pooled resources over a Unix domain socket.
+
+    :param str path: the socket to listen on
+    :param int pool_size: the number of spare resources to keep for
+        each kind and set of parameters
+    :param float idle_timeout: seconds without connections or leases
+        before the broker shuts itself down.  It runs until
+        :meth:`shutdown` is called if this is :data:`None`.
+    :param int workers: the number of background threads that create
+        and destroy resources
+    :param dict kinds: maps kind names to :class:`ResourceKind`
+        instances.  This defaults to :data:`KINDS`.
+
+    """
+
+    def __init__(self, path, pool_size=None, idle_timeout=None, workers=2,
+                 kinds=None):
+        super(Broker, self).__init__()
+        if pool_size is None:
+            pool_size = int(os.environ.get(
+                'TEST_HELPERS_BROKER_POOL_SIZE', '2'))
+        self.path = path
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.kinds = KINDS if kinds is None else kinds
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._pools = {}
+        self._leases = {}
+        self._connections = 0
+        self._last_activity = time.time()
+        self._closing = False
+        self._tasks = queue.Queue()
+        self._workers = [threading.Thread(target=self._work)
+                         for _ in range(workers)]
+        self._server = None
+        self._stopped = threading.Event()
+
+    def serve_forever(self):
+        """Listen for connections until the broker is shut down."""
+        _ensure_private_directory(self.path)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = _Server(self.path, _Handler)
+        self._server.broker = self
+        os.chmod(self.path, 0o600)
+        for worker in self._workers:
+            worker.daemon = True
+            worker.start()
+        if self.idle_timeout is not None:
+            monitor = threading.Thread(target=self._monitor)
+            monitor.daemon = True
+            monitor.start()
+        _logger.info('fixture broker listening on %s', self.path)
+        try:
+            self._server.serve_forever(poll_interval=0.1)
+        finally:
+            self._close()
+
+    def start(self):
+        """Run :meth:`serve_forever` in a background thread."""
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        while self._server is None and thread.is_alive():
+            time.sleep(0.01)
+        return thread
+
+    def shutdown(self):
+        """Stop serving and destroy every resource."""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._stopped.wait()
+
+    def lease(self, kind, params):
+        """
+        Lease a resource.
+
+        :param str kind: the name of the resource kind
+        :param dict params: parameters for creating the resource.
+            Resources are pooled separately for each set of parameters.
+        :returns: the lease identifier and the resource description
+
+        A spare resource is handed out if there is one.  Otherwise the
+        resource is created before this returns.  Either way, a
+        replacement spare is created in the background unless the
+        kind is not :attr:`~ResourceKind.pooled`.
+
+        """
+        if kind not in self.kinds:
+            raise ValueError('unknown resource kind {0!r}'.format(kind))
+        key = (kind, json.dumps(params, sort_keys=True))
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = _Pool(kind, params)
+            resource = pool.spares.popleft() if pool.spares else None
+        if resource is None:
+            resource = self.kinds[kind].create(params)
+        with self._lock:
+            lease_id = next(self._ids)
+            self._leases[lease_id] = (pool, resource)
+            self._last_activity = time.time()
+        self._replenish(pool)
+        return lease_id, self.kinds[kind].describe(resource)
+
+    def release(self, lease_id):
+        """Destroy the resource leased as `lease_id` in the background."""
+        with self._lock:
+            pool, resource = self._leases.pop(lease_id, (None, None))
+            self._last_activity = time.time()
+        if pool is not None:
+            self._tasks.put((self._destroy, pool, resource))
+
+    def stats(self):
+        """Return the number of leased and spare resources by kind."""
+        with self._lock:
+            stats = dict((kind, {'leased': 0, 'spare': 0})
+                         for kind in self.kinds)
+            for pool, _ in self._leases.values():
+                stats[pool.kind]['leased'] += 1
+            for pool in self._pools.values():
+                stats[pool.kind]['spare'] += len(pool.spares)
+            return stats
+
+    def _dispatch(self, message, leases):
+        operation = message.get('op')
+        if operation == 'lease':
+            lease_id, resource = self.lease(
+                message['kind'], message.get('params', {}))
+            leases.add(lease_id)
+            return {'ok': True, 'lease': lease_id, 'resource': resource}
+        if operation == 'release':
+            leases.discard(message['lease'])
+            self.release(message['lease'])
+            return {'ok': True}
+        if operation == 'ping':
+            return {'ok': True, 'pid': os.getpid()}
+        if operation == 'stats':
+            return {'ok': True, 'stats': self.stats()}
+        if operation == 'shutdown':
+            threading.Thread(target=self.shutdown).start()
+            return {'ok': True}
+        raise ValueError('unknown operation {0!r}'.format(operation))
+
+    def _replenish(self, pool):
+        if not self.kinds[pool.kind].pooled:
+            return
+        with self._lock:
+            needed = self.pool_size - len(pool.spares) - pool.pending
+            if self._closing or needed <= 0:
+                return
+            pool.pending += needed
+        for _ in range(needed):
+            self._tasks.put((self._create, pool, None))
+
+    def _create(self, pool, _):
+        try:
+            resource = self.kinds[pool.kind].create(pool.params)
+        finally:
+            with self._lock:
+                pool.pending -= 1
+        with self._lock:
+            if not self._closing:
+                pool.spares.append(resource)
+                return
+        self._destroy(pool, resource)
+
+    def _destroy(self, pool, resource):
+        self.kinds[pool.kind].destroy(resource)
+
+    def _work(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            function, pool, resource = task
+            try:
+                function(pool, resource)
+            except Exception:
+                _logger.exception('failed to %s %s resource',
+                                  function.__name__.lstrip('_'), pool.kind)
+
+    def _track_connection(self, delta):
+        with self._lock:
+            self._connections += delta
+            self._last_activity = time.time()
+
+    def _monitor(self):
+        while not self._stopped.wait(min(1.0, self.idle_timeout / 4.0)):
+            with self._lock:
+                idle = (not self._connections and not self._leases and
+                        time.time() - self._last_activity > self.idle_timeout)
+            if idle:
+                _logger.info('fixture broker idle, shutting down')
+                self._server.shutdown()
+                return
+
+    def _close(self):
+        with self._lock:
+            self._closing = True
+        for _ in self._workers:
+            self._tasks.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._server.server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        with self._lock:
+            remaining = list(self._leases.values())
+            self._leases.clear()
+            for pool in self._pools.values():
+                remaining.extend((pool, spare) for spare in pool.spares)
+                pool.spares.clear()
+        for pool, resource in remaining:
+            try:
+                self._destroy(pool, resource)
+            except Exception:
+                _logger.exception('failed to destroy %s resource', pool.kind)
+        self._stopped.set()
+
+
+class BrokerClient(object):
+    """
+    Leases resources from a broker.
+
+    :param str path: the broker socket
+    :param bool autostart: start a broker process if none is listening
+    :param float timeout: seconds to wait for a new broker to start
+
+    A client keeps one connection open for the life of the process.
+    The broker destroys every resource that was leased over the
+    connection when it closes.
+
+    """
+
+    def __init__(self, path, autostart=True, timeout=10.0):
+        super(BrokerClient, self).__init__()
+        self.path = path
+        self.autostart = autostart
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._socket = None
+        self._reader = None
+
+    def lease(self, kind, params):
+        """Lease a resource and return a :class:`Lease`."""
+        reply = self._request({'op': 'lease', 'kind': kind, 'params': params})
+        return Lease(reply['lease'], reply['resource'])
+
+    def release(self, lease):
+        """Return a :class:`Lease` to the broker."""
+        self._request({'op': 'release', 'lease': lease.lease_id})
+
+    def stats(self):
+        """Return the leased and spare resource counts of the broker."""
+        return self._request({'op': 'stats'})['stats']
+
+    def close(self):
+        """Close the connection, which releases every lease."""
+        with self._lock:
+            if self._socket is not None:
+                self._reader.close()
+                self._socket.close()
+                self._socket = self._reader = None
+
+    def _request(self, message):
+        with self._lock:
+            if self._socket is None:
+                self._connect()
+            try:
+                self._socket.sendall(json.dumps(message).encode('utf-8') +
+                                     b'\n')
+                line = self._reader.readline()
+            except socket.error as error:
+                line, reason = None, error
+            else:
+                reason = 'connection closed'
+            if not line:
+                self._socket.close()
+                self._socket = self._reader = None
+                raise BrokerError('lost connection to fixture broker at '
+                                  '{0}: {1}'.format(self.path, reason))
+        reply = json.loads(line.decode('utf-8'))
+        if not reply.get('ok'):
+            raise BrokerError(reply.get('error', 'request failed'))
+        return reply
+
+    def _connect(self):
+        _ensure_private_directory(self.path)
+        deadline, started = time.time() + self.timeout, False
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.path)
+                break
+            except socket.error as error:
+                sock.close()
+                if not self.autostart or time.time() > deadline:
+                    raise BrokerError('cannot connect to fixture broker at '
+                                      '{0}: {1}'.format(self.path, error))
+            if not started:
+                start_broker(self.path)
+                started = True
+            time.sleep(0.05)
+        self._socket = sock
+        self._reader = sock.makefile('rb')
+
+
+def start_broker(path):
+    """
+    Start a detached broker process listening on `path`.
+
+    The process runs in its own session so it outlives the process
+    that started it and it imports the same copy of the library as
+    this process.  Its log is written next to the socket.  If
+    another broker already holds the lock for `path`, the new process
+    exits immediately.
+
+    """
+    _ensure_private_directory(path)
+    env = dict(os.environ)
+    env.pop('TEST_HELPERS_BROKER', None)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.path.dirname(os.path.dirname(os.path.abspath(__file__)))] +
+        [entry for entry in [env.get('PYTHONPATH')] if entry])
+    kwargs = {'preexec_fn': os.setsid} if hasattr(os, 'setsid') else {}
+    with open(os.devnull, 'rb') as devnull:
+        with open(path + '.log', 'ab') as log:
+            subprocess.Popen(
+                [sys.executable, '-m', 'test_helpers.broker', '--socket',
+                 path], stdin=devnull, stdout=log, stderr=log,
+                close_fds=True, env=env, **kwargs)
+
+
+def get_client():
+    """
+    Return the broker client for this process.
+
+    :returns: a :class:`BrokerClient` or :data:`None` if the
+        :envvar:`TEST_HELPERS_BROKER` environment variable is not set
+
+    Forked processes get their own client so that leases are tied to
+    the process that made them.
+
+    """
+    global _client
+    setting = os.environ.get('TEST_HELPERS_BROKER', '')
+    if not setting:
+        return None
+    if setting.lower() in ('1', 'true', 'yes', 'auto'):
+        setting = default_socket_path()
+    with _client_lock:
+        if (_client is None or _client.path != setting or
+                _client.pid != os.getpid()):
+            _client = BrokerClient(setting)
+        return _client
+
+
+def main(args=None):
+    import fcntl
+
+    parser = argparse.ArgumentParser(prog='python -m test_helpers.broker')
+    parser.add_argument('--socket', default=default_socket_path())
+    parser.add_argument('--pool-size', type=int, default=None)
+    parser.add_argument('--idle-timeout', type=float, default=float(
+        os.environ.get('TEST_HELPERS_BROKER_IDLE_TIMEOUT', '600')))
+    options = parser.parse_args(args)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s %(process)d %(levelname)s %(name)s: %(message)s')
+
+    _ensure_private_directory(options.socket)
+    with open(options.socket + '.lock', 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except IOError:
+            _logger.info('another fixture broker is using %s', options.socket)
+            return 0
+        Broker(options.socket, options.pool_size,
+               options.idle_timeout).serve_forever()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
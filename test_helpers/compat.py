@@ -1,4 +1,6 @@
+import importlib
 import sys
+import types
 
 if sys.version_info >= (2, 7):  # pragma: no cover
     import unittest
@@ -6,18 +8,65 @@ else:
     import unittest2 as unittest
 
 try:
-    from unittest import mock
+    from urllib.parse import parse_qs, urlencode, urljoin, urlsplit
 except ImportError:
-    import mock
+    from urllib import urlencode
+    from urlparse import parse_qs, urljoin, urlsplit
 
-try:
-    from urllib.parse import urljoin
-except ImportError:
-    from urlparse import urljoin
+
+class LazyModule(types.ModuleType):
+    """
+    Stands in for a module that is imported when it is first used.
+
+    :param str names: the modules to try to import in order.  The
+        first one that can be imported is used.
+    :raises ImportError: when an attribute is used and none of the
+        modules can be imported
+
+    Attribute lookups are forwarded to the imported module so the
+    stand-in can be used wherever the module would be.  Attributes
+    that are set on the stand-in, for example by :func:`mock.patch`,
+    shadow the attributes of the module without changing it.
+
+    """
+
+    def __init__(self, *names):
+        super(LazyModule, self).__init__(names[0])
+        self._names = names
+        self._module = None
+
+    def __getattr__(self, attribute):
+        if attribute.startswith('__') and attribute.endswith('__'):
+            raise AttributeError(attribute)
+        return getattr(self.load(), attribute)
+
+    def __repr__(self):
+        return '<lazy module {0!r}>'.format(self.__name__)
+
+    def load(self):
+        """Import the module if necessary and return it."""
+        if self._module is None:
+            error = None
+            for name in self._names:
+                try:
+                    self._module = importlib.import_module(name)
+                    break
+                except ImportError as exc:
+                    error = error or exc
+            else:
+                raise error
+        return self._module
+
+
+mock = LazyModule('unittest.mock', 'mock')
 
 
 __all__ = (
+    'LazyModule',
     'mock',
+    'parse_qs',
     'unittest',
+    'urlencode',
     'urljoin',
+    'urlsplit',
 )
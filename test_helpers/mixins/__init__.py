@@ -15,9 +15,11 @@ as possible.  Each mixin class should ideally only inherit from
 """
 
 from .environment import EnvironmentMixin
+from .fixtures import FixtureMixin
 from .patch_mixin import PatchMixin
 
 __all__ = (
     'EnvironmentMixin',
+    'FixtureMixin',
     'PatchMixin',
 )
@@ -1,5 +1,97 @@
 import os
 
+try:
+    from collections.abc import MutableMapping
+except ImportError:  # pragma: no cover
+    from collections import MutableMapping
+
+try:
+    import contextvars
+except ImportError:  # pragma: no cover
+    contextvars = None
+
+_UNSET = object()
+_overlay = None if contextvars is None else contextvars.ContextVar(
+    'test_helpers_environment_overlay', default=None)
+
+
+class _OverlayEnviron(MutableMapping):
+    """Replacement for :data:`os.environ` that honors context overlays.
+
+    When the current thread or asyncio task has an overlay, reads see
+    the overlay on top of the process environment and writes only
+    change the overlay.  Everywhere else this behaves exactly like
+    the process environment that it wraps.
+
+    """
+
+    def __init__(self, environ):
+        super(_OverlayEnviron, self).__init__()
+        self.environ = environ
+
+    def __getitem__(self, key):
+        overlay = _overlay.get()
+        if overlay is not None and key in overlay:
+            value = overlay[key]
+            if value is _UNSET:
+                raise KeyError(key)
+            return value
+        return self.environ[key]
+
+    def __setitem__(self, key, value):
+        overlay = _overlay.get()
+        if overlay is None:
+            self.environ[key] = value
+        else:
+            self.environ.encodevalue(value)  # same type checks as os.environ
+            _overlay.set(dict(overlay, **{key: value}))
+
+    def __delitem__(self, key):
+        overlay = _overlay.get()
+        if overlay is None:
+            del self.environ[key]
+        else:
+            self[key]  # raises KeyError if the variable is not set
+            _overlay.set(dict(overlay, **{key: _UNSET}))
+
+    def __iter__(self):
+        overlay = _overlay.get()
+        if overlay is None:
+            for key in self.environ:
+                yield key
+            return
+        for key in self.environ:
+            if key not in overlay:
+                yield key
+        for key, value in list(overlay.items()):
+            if value is not _UNSET:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return 'environ({0!r})'.format(dict(self))
+
+    def copy(self):
+        return dict(self)
+
+
+def install_environment_overlay():
+    """Replace :data:`os.environ` with a context-aware version.
+
+    :raises RuntimeError: if :mod:`contextvars` is not available
+
+    This is called by :class:`EnvironmentMixin` when
+    :attr:`~EnvironmentMixin.environment_overlay` is enabled and is
+    safe to call more than once.
+
+    """
+    if _overlay is None:
+        raise RuntimeError('environment overlays require contextvars')
+    if not isinstance(os.environ, _OverlayEnviron):
+        os.environ = _OverlayEnviron(os.environ)
+
 
 class EnvironmentMixin(object):
     """
@@ -15,16 +107,34 @@ class EnvironmentMixin(object):
     ``annihilate`` class methods around the code under test such as
     :class:`test_helpers.bases.BaseTest`.
 
+    Set :attr:`environment_overlay` to keep environment changes local
+    to the test class.  The phases and tests of the class run in their
+    own :class:`contextvars.Context` so this makes it possible to run
+    tests that change the environment concurrently in one process,
+    for example with :mod:`test_helpers.parallel`.  Threads that the
+    test starts do not see the changes.
+    Reads through :data:`os.environ` and :func:`os.getenv` see the
+    changes but child processes only see them if the environment is
+    passed explicitly, for example ``env=dict(os.environ)``.
+
     """
 
+    environment_overlay = False
+    """Keep environment changes local to the test class?"""
+
     @classmethod
     def configure(cls):
         super(EnvironmentMixin, cls).configure()
         cls._saved_environment = {}
+        if cls.environment_overlay:
+            install_environment_overlay()
+            _overlay.set(dict(_overlay.get() or {}))
 
     @classmethod
     def annihilate(cls):
         super(EnvironmentMixin, cls).annihilate()
+        if cls.environment_overlay:
+            cls._saved_environment.clear()
         for key, value in cls._saved_environment.items():
             if value is None:
                 os.environ.pop(key, None)
@@ -32,6 +142,11 @@ class EnvironmentMixin(object):
                 os.environ[key] = value
         cls._saved_environment.clear()
 
+    @classmethod
+    def _uses_class_context(cls):
+        return (cls.environment_overlay or
+                super(EnvironmentMixin, cls)._uses_class_context())
+
     @classmethod
     def set_environment_variable(cls, name, value):
         """Set the value of an environment variable."""
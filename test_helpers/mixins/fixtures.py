@@ -0,0 +1,295 @@
+import logging
+import sys
+import threading
+
+import six
+from six.moves import queue
+
+from .. import resources
+
+
+_logger = logging.getLogger(__name__)
+
+
+class Fixture(object):
+    """
+    Declares a resource that a test class depends on.
+
+    :param setup: callable that creates the resource and returns it.
+        It is called with the values of the fixtures named in
+        `requires` as keyword parameters.
+    :param teardown: optional callable that is passed the value that
+        `setup` returned when the resource is no longer needed
+    :param requires: names of the fixtures that have to be set up
+        before this one
+
+    """
+
+    def __init__(self, setup, teardown=None, requires=()):
+        super(Fixture, self).__init__()
+        self.setup = setup
+        self.teardown = teardown
+        self.requires = tuple(requires)
+
+
+def postgres_database(template='template0', **kwargs):
+    """
+    Declare a :class:`test_helpers.postgres.TemporaryDatabase` fixture.
+
+    :param str template: the database to clone
+    :param kwargs: parameters for the
+        :class:`~test_helpers.postgres.TemporaryDatabase` initializer
+
+    """
+    def setup():
+        from test_helpers import postgres
+        database = postgres.TemporaryDatabase(**kwargs)
+        database.create(template=template)
+        return database
+
+    return Fixture(setup, lambda database: database.drop())
+
+
+def postgres_schema(template=None, **kwargs):
+    """
+    Declare a :class:`test_helpers.postgres.TemporarySchema` fixture.
+
+    :param str template: the schema to copy the structure of
+    :param kwargs: parameters for the
+        :class:`~test_helpers.postgres.TemporarySchema` initializer
+
+    """
+    def setup():
+        from test_helpers import postgres
+        schema = postgres.TemporarySchema(**kwargs)
+        schema.create(template=template)
+        return schema
+
+    return Fixture(setup, lambda schema: schema.drop())
+
+
+def mongo_database(**kwargs):
+    """
+    Declare a :class:`test_helpers.mongo.TemporaryDatabase` fixture.
+
+    :param kwargs: parameters for the
+        :class:`~test_helpers.mongo.TemporaryDatabase` initializer
+
+    """
+    def setup():
+        from test_helpers import mongo
+        database = mongo.TemporaryDatabase(**kwargs)
+        database.create()
+        return database
+
+    return Fixture(setup, lambda database: database.drop())
+
+
+def rabbit_virtual_host(*args, **kwargs):
+    """
+    Declare a :class:`test_helpers.rabbit.RabbitMqFixture` fixture.
+
+    :param args: positional parameters for the
+        :class:`~test_helpers.rabbit.RabbitMqFixture` initializer
+    :param kwargs: keyword parameters for the
+        :class:`~test_helpers.rabbit.RabbitMqFixture` initializer
+
+    The virtual host is installed when the fixture is set up.
+
+    """
+    def setup():
+        from test_helpers import rabbit
+        fixture = rabbit.RabbitMqFixture(*args, **kwargs)
+        fixture.install_virtual_host()
+        return fixture
+
+    return Fixture(setup, lambda fixture: fixture.remove_virtual_host())
+
+
+class FixtureScheduler(object):
+    """
+    Sets up a graph of fixtures concurrently and tears it down in order.
+
+    :param dict fixtures: maps fixture names to :class:`Fixture`
+        instances
+    :param int max_workers: the most fixtures to set up at the same
+        time.  There is no limit if this is :data:`None`.
+    :raises ValueError: if a fixture requires an unknown fixture or
+        the fixtures require each other in a cycle
+
+    Each fixture is set up in its own thread as soon as the fixtures
+    that it requires are ready.  Independent fixtures are therefore
+    set up concurrently.  Fixtures are torn down one at a time in the
+    reverse of the order that they finished setting up in so a fixture
+    is always torn down before the fixtures that it requires.
+
+    """
+
+    def __init__(self, fixtures, max_workers=None):
+        super(FixtureScheduler, self).__init__()
+        self.fixtures = dict(fixtures)
+        self.max_workers = max_workers
+        self.values = {}
+        self._ready = []
+        self._validate()
+
+    def start(self):
+        """Set up every fixture.
+
+        :returns: a :class:`dict` that maps fixture names to the
+            values returned from their setup functions
+        :raises: the first exception raised by a setup function.  The
+            fixtures that were already set up are torn down first.
+
+        """
+        waiting = dict((name, set(fixture.requires))
+                       for name, fixture in self.fixtures.items())
+        runnable = sorted(name for name, deps in waiting.items() if not deps)
+        finished = queue.Queue()
+        running, failure = 0, None
+
+        while runnable or running:
+            while runnable and (self.max_workers is None or
+                                running < self.max_workers):
+                name = runnable.pop(0)
+                del waiting[name]
+                thread = threading.Thread(
+                    target=self._setup,
+                    args=(name, finished, resources.current_owner()))
+                thread.daemon = True
+                thread.start()
+                running += 1
+
+            name, value, exc_info = finished.get()
+            running -= 1
+            if exc_info is not None:
+                failure = failure or exc_info
+                runnable = []
+                continue
+
+            self.values[name] = value
+            self._ready.append(name)
+            if failure is None:
+                for other, deps in sorted(waiting.items()):
+                    deps.discard(name)
+                    if not deps and other not in runnable:
+                        runnable.append(other)
+
+        if failure is not None:
+            self.stop()
+            six.reraise(*failure)
+        return dict(self.values)
+
+    def stop(self):
+        """Tear down the fixtures in reverse dependency order.
+
+        Failures are logged and do not prevent the remaining fixtures
+        from being torn down.
+
+        """
+        while self._ready:
+            name = self._ready.pop()
+            value = self.values.pop(name)
+            teardown = self.fixtures[name].teardown
+            if teardown is None:
+                continue
+            try:
+                teardown(value)
+            except Exception:
+                _logger.exception('failed to tear down fixture %s', name)
+
+    def _setup(self, name, finished, owner):
+        fixture = self.fixtures[name]
+        try:
+            with resources.owned_by(owner):
+                value = fixture.setup(**dict(
+                    (dep, self.values[dep]) for dep in fixture.requires))
+        except BaseException:
+            finished.put((name, None, sys.exc_info()))
+        else:
+            finished.put((name, value, None))
+
+    def _validate(self):
+        visiting, visited = set(), set()
+
+        def visit(name, path):
+            if name not in self.fixtures:
+                raise ValueError('fixture {0!r} requires unknown fixture '
+                                 '{1!r}'.format(path[-1], name))
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError('fixture cycle: {0}'.format(
+                    ' -> '.join(path[path.index(name):] + [name])))
+            visiting.add(name)
+            for dep in self.fixtures[name].requires:
+                visit(dep, path + [name])
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in sorted(self.fixtures):
+            visit(name, [])
+
+
+class FixtureMixin(object):
+    """
+    Mix this class in to set up declared fixtures concurrently.
+
+    Declare the fixtures that the test needs in the :attr:`fixtures`
+    class attribute.  They are set up by a :class:`FixtureScheduler`
+    when the class is configured and each value is stored in the
+    class attribute of the same name.  The fixtures are torn down
+    when the class is annihilated.
+
+    **Usage Example**
+
+    .. code-block:: python
+
+       from test_helpers import bases, mixins
+       from test_helpers.mixins import fixtures
+
+       class WhenLoadingAccounts(mixins.FixtureMixin, bases.BaseTest):
+
+           fixtures = {
+               'database': fixtures.postgres_database(),
+               'schema': fixtures.Fixture(
+                   load_schema, requires=['database']),
+               'vhost': fixtures.rabbit_virtual_host(
+                   'localhost', 'guest', 'guest'),
+           }
+
+           @classmethod
+           def configure(cls):
+               super(WhenLoadingAccounts, cls).configure()
+               cls.database.set_environment()
+
+    The database and virtual host are created at the same time and
+    the schema is loaded as soon as the database exists.
+
+    You need to mix this in over a class that calls the ``configure``
+    ``annihilate`` class methods around the code under test such as
+    :class:`test_helpers.bases.BaseTest`.
+
+    """
+
+    fixtures = {}
+    """Maps attribute names to :class:`Fixture` instances."""
+
+    fixture_workers = None
+    """The most fixtures to set up concurrently or :data:`None`."""
+
+    @classmethod
+    def configure(cls):
+        super(FixtureMixin, cls).configure()
+        cls._fixture_scheduler = FixtureScheduler(
+            cls.fixtures, cls.fixture_workers)
+        for name, value in cls._fixture_scheduler.start().items():
+            setattr(cls, name, value)
+
+    @classmethod
+    def annihilate(cls):
+        super(FixtureMixin, cls).annihilate()
+        scheduler = vars(cls).get('_fixture_scheduler')
+        if scheduler is not None:
+            scheduler.stop()
+            del cls._fixture_scheduler
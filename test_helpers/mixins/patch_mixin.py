@@ -1,5 +1,415 @@
+import collections
+import importlib
+import inspect
+import sys
+import threading
+import types
+
+try:
+    import contextvars
+except ImportError:  # pragma: no cover
+    contextvars = None
+
+from .. import bases, resources
 from .. compat import mock
 
+_MISSING = object()
+_resolved_targets = {}
+_dispatchers = {}
+_dispatchers_lock = threading.Lock()
+_local_patches = None if contextvars is None else contextvars.ContextVar(
+    'test_helpers_local_patches', default={})
+_autospec_shadows = {}
+_FUNCTION_TYPES = (types.FunctionType, types.MethodType)
+_PATCH_ONLY_KWARGS = frozenset(['create', 'new', 'new_callable', 'spec'])
+_SKIPPED_DUNDERS = frozenset(['__abstractmethods__', '__dict__', '__module__',
+                              '__qualname__', '__slots__', '__weakref__'])
+_iscoroutinefunction = getattr(inspect, 'iscoroutinefunction',
+                               lambda value: False)
+
+
+def _resolve_parent(dotted_path):
+    """Return the object that `dotted_path` names.
+
+    The object is imported and found the same way that
+    :func:`mock.patch` finds the parent of its target.  The module
+    that holds the object is cached for the life of the process and
+    is discarded if it is no longer in :data:`sys.modules`.  The
+    attributes below the module are looked up on every call so that
+    patched or reloaded objects are never returned stale.
+
+    """
+    try:
+        module, attributes = _resolved_targets[dotted_path]
+        if sys.modules.get(module.__name__) is not module:
+            raise KeyError(dotted_path)
+    except KeyError:
+        components = dotted_path.split('.')
+        import_path = components.pop(0)
+        parent = module = importlib.import_module(import_path)
+        attributes = []
+        for component in components:
+            import_path += '.' + component
+            try:
+                parent = getattr(parent, component)
+                attributes.append(component)
+            except AttributeError:
+                parent = module = importlib.import_module(import_path)
+                attributes = []
+        _resolved_targets[dotted_path] = (module, tuple(attributes))
+        return parent
+
+    parent = module
+    for attribute in attributes:
+        parent = getattr(parent, attribute)
+    return parent
+
+
+class _MethodSpec(object):
+    """Stands in for a method of an autospecced class.
+
+    :func:`mock.create_autospec` creates child mocks for methods as
+    soon as the parent mock is created and it inspects the signature
+    of each method to do so.  Child mocks for other attributes are
+    only created when they are first accessed.  Replacing methods with
+    instances of this descriptor defers the creation of the method
+    mocks until they are used.
+
+    Looking the attribute up returns a :class:`classmethod` wrapping
+    a function that carries the pre-computed signature.  Mock skips
+    the first parameter of class methods consistently when it checks
+    and matches calls so the signature includes a placeholder for it.
+
+    """
+
+    def __init__(self, name, signature):
+        super(_MethodSpec, self).__init__()
+
+        def method(*args, **kwargs):
+            pass
+
+        method.__name__ = name
+        if signature is not None:
+            method.__signature__ = signature
+        self.method = classmethod(method)
+
+    def __get__(self, instance, owner=None):
+        return self.method
+
+
+def _method_signature(raw):
+    """Return the signature of `raw` including the bound parameter."""
+    try:
+        if isinstance(raw, staticmethod):
+            signature = inspect.signature(raw.__func__)
+            placeholder = inspect.Parameter(
+                '_', inspect.Parameter.POSITIONAL_ONLY)
+            return signature.replace(parameters=[placeholder] + list(
+                signature.parameters.values()))
+        if isinstance(raw, classmethod):
+            return inspect.signature(raw.__func__)
+        return inspect.signature(raw)
+    except (TypeError, ValueError):
+        return None
+
+
+def _autospec_shadow(target):
+    """Return a cheap stand-in for the class `target` to autospec.
+
+    The stand-in has the same attributes as `target` except that its
+    methods are replaced by :class:`_MethodSpec` descriptors.  It is
+    created once per class and reused for as long as the class is the
+    same object.
+
+    """
+    try:
+        cached, shadow = _autospec_shadows[id(target)]
+        if cached is target:
+            return shadow
+    except KeyError:
+        pass
+
+    attributes = {'__doc__': target.__doc__}
+    for name in dir(target):
+        if name in _SKIPPED_DUNDERS:
+            continue
+        for klass in target.__mro__:
+            if name in vars(klass):
+                raw = vars(klass)[name]
+                break
+        else:
+            continue
+        if klass is object:
+            continue
+
+        is_dunder = name.startswith('__') and name.endswith('__')
+        bound = getattr(target, name, None)
+        if (is_dunder or
+                not isinstance(raw, (staticmethod, classmethod) +
+                               _FUNCTION_TYPES) or
+                _iscoroutinefunction(bound)):
+            attributes[name] = raw
+        else:
+            attributes[name] = _MethodSpec(name, _method_signature(raw))
+
+    shadow = type(target.__name__, (object,), attributes)
+    _autospec_shadows[id(target)] = (target, shadow)
+    return shadow
+
+
+def create_autospec(target, spec_set=False, name=None, **kwargs):
+    """Create an autospecced mock using a process-level cache.
+
+    :param target: the object to create the mock for
+    :param bool spec_set: passed to :func:`mock.create_autospec`
+    :param str name: the name of the mock
+    :param kwargs: additional parameters for the mock
+
+    This returns the same mocks as :func:`mock.create_autospec` but
+    classes are only introspected once per process and the method
+    mocks are created when they are first used.  Other targets are
+    passed to :func:`mock.create_autospec` directly.
+
+    """
+    if not isinstance(target, type) or not hasattr(inspect, 'signature'):
+        return mock.create_autospec(
+            target, spec_set=spec_set, _name=name, **kwargs)
+
+    new = mock.create_autospec(_autospec_shadow(target), spec_set=spec_set,
+                               _name=name, **kwargs)
+    new.__dict__['_spec_class'] = target
+    if 'return_value' not in kwargs:
+        new.return_value.__dict__['_spec_class'] = target
+    return new
+
+
+class Stub(object):
+    """A callable replacement that is much cheaper than a mock.
+
+    :keyword return_value: the value that each call returns
+    :keyword side_effect: a function that is called with the arguments
+        of each call and whose result is returned, or an exception
+        that each call raises
+    :keyword int history: the number of most recent calls to record
+        in :attr:`calls`.  Calls are only counted when this is zero,
+        although the ``(args, kwargs)`` of the most recent call are
+        always kept in :attr:`last_call`.
+
+    Unlike :class:`mock.MagicMock`, a stub does not create child mocks
+    and keeps a bounded amount of call information so memory use and
+    call overhead stay flat no matter how many times it is called.
+
+    """
+
+    __slots__ = ('return_value', 'side_effect', 'call_count', 'calls',
+                 'last_call')
+
+    def __init__(self, return_value=None, side_effect=None, history=0):
+        super(Stub, self).__init__()
+        self.return_value = return_value
+        self.side_effect = side_effect
+        self.call_count = 0
+        self.calls = collections.deque(maxlen=history) if history else None
+        self.last_call = None
+
+    def __call__(self, *args, **kwargs):
+        self.call_count += 1
+        self.last_call = (args, kwargs)
+        if self.calls is not None:
+            self.calls.append((args, kwargs))
+        side_effect = self.side_effect
+        if side_effect is None:
+            return self.return_value
+        if isinstance(side_effect, BaseException) or (
+                isinstance(side_effect, type) and
+                issubclass(side_effect, BaseException)):
+            raise side_effect
+        return side_effect(*args, **kwargs)
+
+    @property
+    def called(self):
+        """Has the stub been called?"""
+        return self.call_count > 0
+
+    def assert_called_with(self, *args, **kwargs):
+        """Assert that the most recent call used these arguments."""
+        if self.last_call != (args, kwargs):
+            raise AssertionError('expected call {0!r}, last call was '
+                                 '{1!r}'.format((args, kwargs),
+                                                self.last_call))
+
+    def reset(self):
+        """Forget the calls that were made so far."""
+        self.call_count = 0
+        self.last_call = None
+        if self.calls is not None:
+            self.calls.clear()
+
+
+class _Dispatcher(object):
+    """Stands in for an attribute that is patched context-locally.
+
+    The dispatcher replaces the attribute once, no matter how many
+    contexts patch it, and forwards every use to the patch that is
+    active in the current thread or asyncio task.  Contexts without an
+    active patch see the original value.
+
+    """
+
+    __slots__ = ('_parent', '_attribute', '_original', '_inherited',
+                 '_users')
+
+    def __init__(self, parent, attribute):
+        super(_Dispatcher, self).__init__()
+        self._parent = parent
+        self._attribute = attribute
+        self._original = inspect.getattr_static(parent, attribute, _MISSING)
+        self._inherited = attribute not in vars(parent)
+        self._users = 0
+
+    def _lookup(self):
+        value = _local_patches.get().get(self, self._original)
+        if value is _MISSING:
+            raise AttributeError(self._attribute)
+        return value
+
+    def _restore(self):
+        if self._inherited:
+            delattr(self._parent, self._attribute)
+        else:
+            setattr(self._parent, self._attribute, self._original)
+
+    def __get__(self, instance, owner=None):
+        value = self._lookup()
+        get = getattr(type(value), '__get__', None)
+        if get is None:
+            return value
+        return get(value, instance, owner)
+
+    def __call__(self, *args, **kwargs):
+        return self._lookup()(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._lookup(), name)
+
+    def __setattr__(self, name, value):
+        if name in _Dispatcher.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._lookup(), name, value)
+
+    def __delattr__(self, name):
+        delattr(self._lookup(), name)
+
+    def __repr__(self):
+        return repr(self._lookup())
+
+
+def _acquire_dispatcher(parent, attribute):
+    """Install the dispatcher for `attribute` of `parent` if necessary."""
+    with _dispatchers_lock:
+        key = (id(parent), attribute)
+        dispatcher = _dispatchers.get(key)
+        if dispatcher is None:
+            dispatcher = _Dispatcher(parent, attribute)
+            setattr(parent, attribute, dispatcher)
+            _dispatchers[key] = dispatcher
+        dispatcher._users += 1
+        return dispatcher
+
+
+def _release_dispatcher(dispatcher):
+    """Restore the original attribute when the last user is done."""
+    with _dispatchers_lock:
+        dispatcher._users -= 1
+        if not dispatcher._users:
+            del _dispatchers[(id(dispatcher._parent), dispatcher._attribute)]
+            dispatcher._restore()
+
+
+def _unpatched(parent, attribute):
+    """Return the value of `attribute` that the current context sees."""
+    value = getattr(parent, attribute)
+    if isinstance(value, _Dispatcher):
+        return value._lookup()
+    return value
+
+
+class _LocalPatch(object):
+    """A patcher that only affects the current thread or asyncio task.
+
+    This has the same ``start`` and ``stop`` interface as the objects
+    returned by :func:`mock.patch.object` and accepts the same keyword
+    parameters.  The replacement is created by :func:`mock.patch.object`
+    on a private holder and activated through a :class:`_Dispatcher`.
+
+    """
+
+    def __init__(self, parent, attribute, **kwargs):
+        super(_LocalPatch, self).__init__()
+        if _local_patches is None:
+            raise RuntimeError('context-local patches require contextvars')
+        original = inspect.getattr_static(parent, attribute, _MISSING)
+        if isinstance(original, type):
+            raise TypeError(
+                'cannot patch the class {0!r} locally since isinstance '
+                'checks and except clauses would see the dispatcher '
+                'instead of the class'.format(attribute))
+        if original is not _MISSING and not (
+                callable(original) or hasattr(type(original), '__get__')):
+            raise TypeError(
+                'cannot patch {0!r} locally since operators, indexing, and '
+                'iteration would see the dispatcher instead of the '
+                'value'.format(attribute))
+        self.parent = parent
+        self.attribute = attribute
+        self.kwargs = kwargs
+        self.dispatcher = None
+        self.patcher = None
+        self.previous = _MISSING
+        self.value = _MISSING
+
+    def start(self):
+        dispatcher = _acquire_dispatcher(self.parent, self.attribute)
+        try:
+            patches = _local_patches.get()
+            original = patches.get(dispatcher, dispatcher._original)
+            if isinstance(self.parent, type):
+                holder = type(self.parent.__name__, (object,), {})
+            else:
+                holder = types.ModuleType(
+                    getattr(self.parent, '__name__', 'holder'))
+            if original is not _MISSING:
+                setattr(holder, self.attribute, original)
+            patcher = mock.patch.object(holder, self.attribute, **self.kwargs)
+            new = patcher.start()
+        except:
+            _release_dispatcher(dispatcher)
+            raise
+
+        self.dispatcher, self.patcher = dispatcher, patcher
+        self.previous = patches.get(dispatcher, _MISSING)
+        self.value = vars(holder)[self.attribute]
+        patches = dict(patches)
+        patches[dispatcher] = self.value
+        _local_patches.set(patches)
+        return new
+
+    def stop(self):
+        dispatcher, self.dispatcher = self.dispatcher, None
+        if dispatcher is None:
+            return
+        patches = dict(_local_patches.get())
+        if patches.get(dispatcher, _MISSING) is self.value:
+            if self.previous is _MISSING:
+                del patches[dispatcher]
+            else:
+                patches[dispatcher] = self.previous
+            _local_patches.set(patches)
+        self.value = _MISSING
+        self.patcher.stop()
+        _release_dispatcher(dispatcher)
+
 
 class PatchMixin(object):
     """A mixin to allow inline patching and automatic un-patching.
@@ -44,21 +454,91 @@ class PatchMixin(object):
     patch_prefix = ''
     """Pattern used to generate fully-qualified patch names."""
 
+    patches = {}
+    """Patches to apply before the class is configured.
+
+    This maps patch targets to dictionaries of keyword parameters for
+    :meth:`create_patch`.  The patches are created with
+    :meth:`create_patches` and the patch objects are available in
+    the :attr:`patched` dictionary under the same keys.
+
+    """
+
+    patched = None
+    """Maps the keys of :attr:`patches` to the active patch objects."""
+
+    patch_locally = False
+    """Only patch targets for the current thread or asyncio task?
+
+    When this is enabled, a patched attribute is replaced once by a
+    dispatcher that forwards to the patch that is active in the
+    current context or to the original value if there is none.  The
+    phases and tests of the class run in their own context so test
+    classes that patch the same targets can run concurrently in
+    different threads.  Threads started by the code under test do not
+    see the patches unless they run in a copy of the current context,
+    for example with :meth:`contextvars.Context.run`.
+
+    The dispatcher only forwards calls, attribute access, and
+    descriptor lookups so only functions, methods, and other callable
+    or descriptor attributes can be patched locally.
+    :meth:`create_patch` raises :exc:`TypeError` for classes,
+    including exception classes, since ``isinstance`` checks and
+    ``except`` clauses would see the dispatcher, and for values such
+    as numbers, strings, lists, and dictionaries since operators,
+    indexing, and iteration would see it too.
+
+    """
+
     @classmethod
     def setUpClass(cls):
+        if issubclass(cls, bases.BaseTest):  # patched in arrange
+            return super(PatchMixin, cls).setUpClass()
         cls._active_patches = []
-        super(PatchMixin, cls).setUpClass()
+        cls.patched = cls.create_patches(cls.patches)
+        try:
+            super(PatchMixin, cls).setUpClass()
+        except:
+            cls.stop_patches()
+            raise
 
     @classmethod
     def tearDownClass(cls):
-        cls.stop_patches()
+        if not issubclass(cls, bases.BaseTest):  # stopped in _dismantle
+            cls.stop_patches()
         super(PatchMixin, cls).tearDownClass()
 
+    @classmethod
+    def arrange(cls):
+        cls._active_patches = []
+        with resources.owned_by(bases._class_name(cls)):
+            cls.patched = cls._in_class_context(cls.create_patches,
+                                                cls.patches)
+        try:
+            super(PatchMixin, cls).arrange()
+        except:
+            if cls._active_patches:  # failed before it was dismantled
+                cls._in_class_context(cls.stop_patches)
+            raise
+
+    @classmethod
+    def _dismantle(cls):
+        try:
+            cls._in_class_context(cls.stop_patches)
+        finally:
+            super(PatchMixin, cls)._dismantle()
+
+    @classmethod
+    def _uses_class_context(cls):
+        return (cls.patch_locally or
+                super(PatchMixin, cls)._uses_class_context())
+
     @classmethod
     def stop_patches(cls):
         """Stop any active patches when the class is finished."""
-        for patcher in cls._active_patches:
+        for patcher in vars(cls).get('_active_patches', ()):
             patcher.stop()
+            resources.unregister(patcher)
         cls._active_patches = []
 
     @classmethod
@@ -75,6 +555,13 @@ class PatchMixin(object):
             an argument to ``cls.patch_prefix.format()`` to create the
             fully-qualified patch target.
 
+        Classes that are patched with ``autospec=True`` are
+        introspected once per process by :func:`create_autospec`
+        instead of every time that they are patched.
+
+        The patch only applies to the current thread or asyncio task
+        if :attr:`patch_locally` is enabled.
+
         """
         patch_prefix = cls.patch_prefix
 
@@ -82,7 +569,71 @@ class PatchMixin(object):
             patch_prefix += '.'
 
         path = '{0}{1}'.format(patch_prefix, target)
-        patcher = mock.patch(path, **kwargs)
+        parent_path, _, attribute = path.rpartition('.')
+        parent = _resolve_parent(parent_path)
+        if kwargs.get('autospec') is True and not _PATCH_ONLY_KWARGS & set(
+                kwargs):
+            del kwargs['autospec']
+            kwargs = {'new': create_autospec(
+                _unpatched(parent, attribute), name=attribute, **kwargs)}
+        if cls.patch_locally:
+            patcher = _LocalPatch(parent, attribute, **kwargs)
+        else:
+            patcher = mock.patch.object(parent, attribute, **kwargs)
         patched = patcher.start()
+        if '_active_patches' not in vars(cls):
+            cls._active_patches = []
         cls._active_patches.append(patcher)
+        resources.register('patch', patcher, path)
+        return patched
+
+    @classmethod
+    def create_stub(cls, target, return_value=None, side_effect=None,
+                    history=0):
+        """Replace `target` with a :class:`Stub`.
+
+        :param str target: the target of the patch.  This is resolved
+            the same way as it is for :meth:`create_patch`.
+        :keyword return_value: the value that each call returns
+        :keyword side_effect: a function to call or an exception
+            to raise instead of returning `return_value`
+        :keyword int history: the number of most recent calls to record
+        :returns: the :class:`Stub` instance
+
+        Use this instead of :meth:`create_patch` when the code under
+        test calls the target so often that the overhead of a
+        :class:`mock.MagicMock` matters.
+
+        """
+        return cls.create_patch(target, new=Stub(
+            return_value=return_value, side_effect=side_effect,
+            history=history))
+
+    @classmethod
+    def create_patches(cls, targets):
+        """Create and apply a set of patches together.
+
+        :param dict targets: maps each patch target to a dictionary of
+            keyword parameters for :meth:`create_patch` or :data:`None`
+        :returns: a :class:`dict` that maps each target to the running
+            patch
+
+        Either every patch is applied or, if one of them fails, none
+        of them are.  Targets are resolved once per process so this is
+        considerably faster than patching the same targets in each
+        test class with :func:`mock.patch`.
+
+        """
+        first = len(vars(cls).get('_active_patches', ()))
+        patched = {}
+        try:
+            for target, kwargs in targets.items():
+                patched[target] = cls.create_patch(target, **(kwargs or {}))
+        except:
+            active_patches = vars(cls).get('_active_patches', [])
+            for patcher in reversed(active_patches[first:]):
+                patcher.stop()
+                resources.unregister(patcher)
+            del active_patches[first:]
+            raise
         return patched
@@ -0,0 +1,82 @@
+from __future__ import absolute_import
+
+
+class QueryCaptureMixin(object):
+    """Record the statements that :meth:`execute` runs in Postgres.
+
+    Set :attr:`capture_database` in ``configure`` to a created
+    :class:`~test_helpers.postgres.TemporaryDatabase`, or to a
+    :class:`~test_helpers.postgres.TemporarySchema` in a database that
+    only this class uses, and the statements that run in it while
+    ``execute`` runs are saved in :attr:`queries`.  This is useful for
+    catching code that suddenly issues a query per row::
+
+        class WhenListingUsers(QueryCaptureMixin, bases.BaseTest):
+
+            @classmethod
+            def configure(cls):
+                super(WhenListingUsers, cls).configure()
+                cls.capture_database = cls.database
+
+            @classmethod
+            def execute(cls):
+                cls.users = list_users()
+
+            def should_query_once(self):
+                self.assert_query_count(1)
+
+            def should_use_index(self):
+                self.assert_no_sequential_scans('users')
+
+    The mixin must appear before :class:`~test_helpers.bases.BaseTest`
+    in the list of base classes.
+
+    """
+
+    capture_database = None
+    """The database or schema to record statements in."""
+
+    queries = None
+    """The :class:`~test_helpers.postgres.QueryCapture` of ``execute``.
+
+    The assertion methods fail if this is :data:`None` because
+    :attr:`capture_database` was not set.
+
+    """
+
+    @classmethod
+    def _run_phase(cls, phase):
+        run_phase = super(QueryCaptureMixin, cls)._run_phase
+        if cls.capture_database is None or phase != cls.execute:
+            return run_phase(phase)
+        with cls.capture_database.capture_queries() as cls.queries:
+            return run_phase(phase)
+
+    def assert_query_count(self, expected):
+        """Fail unless ``execute`` ran `expected` statements."""
+        queries = self._captured_queries()
+        if queries.query_count != expected:
+            self.fail('{0} statements were run instead of {1}:\n{2}'.format(
+                queries.query_count, expected, '\n'.join(
+                    '{0.calls:6d}  {0.query}'.format(statement)
+                    for statement in queries.statements)))
+
+    def assert_no_sequential_scans(self, *tables):
+        """Fail if ``execute`` scanned any of `tables` sequentially.
+
+        Every table is checked if `tables` is omitted.
+
+        """
+        scans = self._captured_queries().sequential_scans
+        scanned = sorted(table for table in tables or scans
+                         if scans.get(table))
+        if scanned:
+            self.fail('sequential scans of {0}'.format(', '.join(
+                '{0} ({1})'.format(table, scans[table])
+                for table in scanned)))
+
+    def _captured_queries(self):
+        if self.queries is None:
+            self.fail('no statements were captured since capture_database '
+                      'is not configured')
+        return self.queries
@@ -1,13 +1,141 @@
 from __future__ import absolute_import
 
+import atexit
+import codecs
+import collections
+import datetime
+import functools
+import hashlib
+import inspect
+import io
+import itertools
 import json
+import math
+import mmap
 import os
+import shutil
 import socket
+import struct
+import tempfile
+import timeit
 
 from six import text_type
-from tornado import ioloop, httpclient, httpserver, httputil
+from tornado import (concurrent, gen, ioloop, httpclient, httpserver,
+                     httputil, netutil, simple_httpclient)
 
-from .. import bases, compat
+from .. import bases, compat, resources, serializers
+
+_shared_servers = {}
+_request_timings = {}
+
+RequestTiming = collections.namedtuple('RequestTiming', [
+    'method', 'path', 'code', 'request_time', 'time_to_first_byte',
+    'body_size'])
+"""Timing of a single request recorded by :class:`TornadoMixin`."""
+
+
+def _is_coroutine_function(function):
+    """Is `function` a Tornado coroutine or an ``async def`` function?"""
+    if gen.is_coroutine_function(function):
+        return True
+    iscoroutinefunction = getattr(inspect, 'iscoroutinefunction', None)
+    return iscoroutinefunction is not None and iscoroutinefunction(function)
+
+
+def stop_shared_servers(module=None):
+    """Stop servers started by :meth:`TornadoMixin.start_shared_tornado`.
+
+    :param str module: if specified, only the servers that are scoped
+        to the named module are stopped.  Otherwise, every shared server
+        is stopped.
+
+    This is registered with :func:`atexit.register` so you only need
+    to call it if you want to release the resources early, for example
+    from ``tearDownModule``.
+
+    """
+    for key in list(_shared_servers):
+        if module is None or key[0] == module:
+            _shared_servers.pop(key).stop_tornado()
+
+atexit.register(stop_shared_servers)
+
+
+def write_timing_report(path=None, slowest=20):
+    """Write the request timings recorded by :class:`TornadoMixin`.
+
+    :param str path: the file to write the JSON report to.  This
+        defaults to the :envvar:`TORNADO_TEST_TIMING_REPORT`
+        environment variable.
+    :param int slowest: the number of endpoints to include in the
+        ``slowest_endpoints`` section
+    :returns: the report as a :class:`dict` or :data:`None` if no
+        report was written
+
+    The report contains the request totals for the run, the totals
+    for each test class, and the endpoints that consumed the most
+    time.  Endpoints are identified by request method and path
+    without the query string.
+
+    This is registered with :func:`atexit.register` so the report
+    is written when the process exits if the environment variable
+    is set.
+
+    """
+    path = path or os.environ.get('TORNADO_TEST_TIMING_REPORT')
+    if not path or not _request_timings:
+        return None
+
+    endpoints = {}
+    classes = {}
+    for class_name, timings in _request_timings.items():
+        classes[class_name] = {
+            'request_count': len(timings),
+            'request_time': sum(timing.request_time for timing in timings),
+        }
+        for timing in timings:
+            stats = endpoints.setdefault((timing.method, timing.path), {
+                'method': timing.method,
+                'path': timing.path,
+                'request_count': 0,
+                'request_time': 0.0,
+                'max_request_time': 0.0,
+                'time_to_first_byte': 0.0,
+                'body_size': 0,
+            })
+            stats['request_count'] += 1
+            stats['request_time'] += timing.request_time
+            stats['max_request_time'] = max(stats['max_request_time'],
+                                            timing.request_time)
+            stats['time_to_first_byte'] += timing.time_to_first_byte or 0.0
+            stats['body_size'] += timing.body_size
+
+    for stats in endpoints.values():
+        stats['mean_request_time'] = (stats['request_time'] /
+                                      stats['request_count'])
+        stats['mean_time_to_first_byte'] = (
+            stats.pop('time_to_first_byte') / stats['request_count'])
+
+    report = {
+        'totals': {
+            'class_count': len(classes),
+            'request_count': sum(
+                stats['request_count'] for stats in endpoints.values()),
+            'request_time': sum(
+                stats['request_time'] for stats in endpoints.values()),
+            'body_size': sum(
+                stats['body_size'] for stats in endpoints.values()),
+        },
+        'classes': classes,
+        'slowest_endpoints': sorted(
+            endpoints.values(), key=lambda stats: stats['request_time'],
+            reverse=True)[:slowest],
+    }
+    with open(path, 'w') as report_file:
+        json.dump(report, report_file, indent=2, sort_keys=True)
+    return report
+
+atexit.register(write_timing_report)
 
 
 class TornadoMixin(object):
@@ -72,46 +200,196 @@ class TornadoMixin(object):
        The number of seconds to run the IO loop for before giving up
        on the request.
 
+    .. attribute:: tornado_transport
+
+       Selects how requests reach the application.  This is one of
+       ``'tcp'`` (the default), ``'unix'``, or ``'memory'``.  See
+       :meth:`start_tornado` for details.
+
+    .. attribute:: timing_capacity
+
+       The number of :class:`RequestTiming` records to keep for each
+       test class.  Timing is disabled when this is zero which is the
+       default unless the :envvar:`TORNADO_TEST_TIMINGS` or
+       :envvar:`TORNADO_TEST_TIMING_REPORT` environment variable is
+       set.  Only the most recent requests are kept.  The records are
+       available from :meth:`get_request_timings` and are summarized
+       by :func:`write_timing_report`.
+
     """
 
     client = None
     io_loop = None
     request_timeout = float(os.environ.get('ASYNC_TEST_TIMEOUT', '20.0'))
+    tornado_transport = os.environ.get('TORNADO_TEST_TRANSPORT', 'tcp')
+    timing_capacity = int(os.environ.get(
+        'TORNADO_TEST_TIMINGS',
+        '1000' if os.environ.get('TORNADO_TEST_TIMING_REPORT') else '0'))
     url_root = None
-    _result = None
-    _request_timeout_failure = object()
+    _unix_socket_path = None
 
     @classmethod
-    def start_tornado(cls, application):
+    def start_tornado(cls, application, transport=None):
         """Start up tornado and register `application`.
 
         :param application: anything suitable as a Tornado *request
             callback* (see :class:`tornado.httpserver.HTTPServer`)
+        :param str transport: overrides :attr:`tornado_transport`
 
-        This method binds a socket to an arbitrary temporary port,
-        creates a new Tornado IOLoop, and adds the `application`'
-        to it.  Calling any of the request-related methods will
-        start the IOLoop and run it until a response is received.
+        This method creates a new Tornado IOLoop, and adds the
+        `application` to it.  Calling any of the request-related
+        methods will run the IOLoop until a response is received.
 
-        """
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, 0)
-        sock.setblocking(0)
-        sock.bind(('127.0.0.1', 0))
-        sock.listen(128)
+        How requests are delivered depends on the `transport`:
+
+        ``tcp``
+           binds a socket to an arbitrary temporary port on the
+           loopback interface and sends requests over it
 
-        cls.url_root = 'http://{0}:{1}'.format(*sock.getsockname())
-        cls.io_loop = ioloop.IOLoop()
-        cls.io_loop.make_current()
+        ``unix``
+           binds a Unix domain socket in a temporary directory and
+           sends requests over it.  This avoids consuming ephemeral
+           TCP ports.
 
-        cls.client = httpclient.AsyncHTTPClient(io_loop=cls.io_loop)
-        cls.server = httpserver.HTTPServer(application, cls.io_loop)
-        cls.server.add_socket(sock)
+        ``memory``
+           does not create a socket at all.  Each request is handed
+           directly to the application through an in-memory connection
+           and the response is collected without being serialized.
+           Redirects are not followed in this mode and it requires
+           Tornado 4.0 or newer.
+
+        """
+        transport = transport or cls.tornado_transport
+        if transport not in ('tcp', 'unix', 'memory'):
+            raise ValueError('unknown transport {0!r}'.format(transport))
+
+        cls.io_loop = ioloop.IOLoop(make_current=False)
+        resources.register('ioloop', cls.io_loop, cls.__name__)
+        cls.io_loop.run_sync(
+            lambda: cls._create_endpoints(application, transport))
 
     @classmethod
     def stop_tornado(cls):
         """Terminate the tornado IO loop."""
-        cls.io_loop.clear_current()
+        cls.client.close()
         cls.io_loop.close(all_fds=True)
+        resources.unregister(cls.io_loop)
+        resources.unregister(cls.server)
+        if cls._unix_socket_path is not None:
+            shutil.rmtree(
+                os.path.dirname(cls._unix_socket_path), ignore_errors=True)
+            cls._unix_socket_path = None
+
+    @classmethod
+    def _create_endpoints(cls, application, transport):
+        """Create the server and client for `transport`.
+
+        This is run on :attr:`io_loop` so that the objects that
+        it creates are attached to it.
+
+        """
+        cls.server = httpserver.HTTPServer(application)
+
+        if transport == 'tcp':
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, 0)
+            sock.setblocking(0)
+            sock.bind(('127.0.0.1', 0))
+            sock.listen(128)
+            cls.url_root = 'http://{0}:{1}'.format(*sock.getsockname())
+            cls.client = httpclient.AsyncHTTPClient(force_instance=True)
+            cls.server.add_socket(sock)
+            resources.register('socket', cls.server, cls.url_root)
+
+        elif transport == 'unix':
+            cls._unix_socket_path = os.path.join(
+                tempfile.mkdtemp(), 'tornado.sock')
+            sock = netutil.bind_unix_socket(cls._unix_socket_path)
+            cls.url_root = 'http://localhost'
+            cls.client = simple_httpclient.SimpleAsyncHTTPClient(
+                force_instance=True,
+                resolver=_UnixSocketResolver(
+                    socket_path=cls._unix_socket_path))
+            cls.server.add_socket(sock)
+            resources.register('socket', cls.server, cls._unix_socket_path)
+
+        else:
+            cls.url_root = 'http://localhost'
+            cls.client = _InMemoryHTTPClient(
+                force_instance=True, server=cls.server)
+
+    @classmethod
+    def start_shared_tornado(cls, application, scope='session',
+                             transport=None):
+        """Attach to a server that is shared with other classes.
+
+        :param application: anything suitable as a Tornado *request
+            callback* (see :class:`tornado.httpserver.HTTPServer`)
+        :param str scope: either ``'module'`` to share the server
+            between classes in the same module or ``'session'`` to
+            share it between every class in the process
+        :param str transport: overrides :attr:`tornado_transport`
+
+        The first call for a given `application` starts it exactly
+        like :meth:`start_tornado` does.  Subsequent calls reuse the
+        same IOLoop, client, and server.  Call
+        :meth:`release_shared_tornado` instead of :meth:`stop_tornado`
+        when the class is finished.
+
+        Module scoped servers are stopped when a class from a different
+        module attaches to a module scoped server or when
+        :func:`stop_shared_servers` is called.  Session scoped servers
+        are stopped when the process exits.
+
+        """
+        if scope == 'module':
+            scope_name = cls.__module__
+            for key in list(_shared_servers):
+                if key[0] not in (None, scope_name):
+                    _shared_servers.pop(key).stop_tornado()
+        elif scope == 'session':
+            scope_name = None
+        else:
+            raise ValueError('unknown scope {0!r}'.format(scope))
+
+        transport = transport or cls.tornado_transport
+        key = (scope_name, id(application), transport)
+        try:
+            shared = _shared_servers[key]
+        except KeyError:
+            shared = type('SharedTornado', (TornadoMixin,), {
+                'request_timeout': cls.request_timeout,
+                'shared_application': application,
+            })
+            shared.start_tornado(application, transport)
+            resources.disown(shared.io_loop)
+            resources.disown(shared.server)
+            _shared_servers[key] = shared
+
+        cls.io_loop = shared.io_loop
+        cls.client = shared.client
+        cls.server = shared.server
+        cls.url_root = shared.url_root
+
+    @classmethod
+    def release_shared_tornado(cls):
+        """Detach from the server attached by :meth:`start_shared_tornado`.
+
+        The server is left running for the next class.  This calls
+        :meth:`reset_tornado` so that class specific state does not
+        leak into the next class.
+
+        """
+        cls.reset_tornado()
+
+    @classmethod
+    def reset_tornado(cls):
+        """Reset per-class state before a shared server is reused.
+
+        Extend this method to reset any state that your application
+        accumulates between requests.
+
+        """
+        pass
 
     @classmethod
     def delete(cls, path, **kwargs):
@@ -158,8 +436,9 @@ class TornadoMixin(object):
         :param kwargs: additional arguments passed to the
             :class:`tornado.httpclient.HTTPRequest` initializer
 
-        :returns: either a :class:`tornado.httpclient.HTTPResponse`
-            instance or :data:`None` if the request timed out.
+        :returns: a :class:`tornado.httpclient.HTTPResponse` instance
+        :raises AssertionError: if a response is not received
+            within :attr:`request_timeout` seconds
 
         The `path` parameter can be a relative path or an absolute
         URL.  It will be joined to :attr:`url_root` before the
@@ -168,35 +447,304 @@ class TornadoMixin(object):
         """
         request = httpclient.HTTPRequest(
             compat.urljoin(cls.url_root, path), method=method, **kwargs)
-        cls.client.fetch(request, callback=cls._on_request_complete)
-        return cls._wait_for_completion()
+        return cls.io_loop.run_sync(lambda: cls._fetch_with_timeout(request))
 
     @classmethod
-    def _on_request_complete(cls, result, **_):
-        """Called when a request completes or times out.
+    def fetch(cls, method, path, **kwargs):
+        """Issue a request to the application from a coroutine.
+
+        :param str method: HTTP method to invoke
+        :param str path: possibly absolute path of the resource
+            to invoke
+        :param kwargs: additional arguments passed to the
+            :class:`tornado.httpclient.HTTPRequest` initializer
 
-        :param result: the response received from the application
-            or :data:`._request_timeout_failure`
+        :returns: a future that resolves to a
+            :class:`tornado.httpclient.HTTPResponse` instance
+
+        This is the asynchronous version of :meth:`request`.  Use
+        it when :attr:`io_loop` is already running, for example from
+        a coroutine ``execute`` method of :class:`TornadoTest`:
+
+        .. code-block:: python
+
+           @classmethod
+           async def execute(cls):
+               cls.response = await cls.fetch('GET', '/index')
 
         """
-        cls._result = result
-        cls.io_loop.stop()
+        request = httpclient.HTTPRequest(
+            compat.urljoin(cls.url_root, path), method=method, **kwargs)
+        return cls._fetch_with_timeout(request)
 
     @classmethod
-    def _wait_for_completion(cls):
-        def timeout():
-            try:
-                raise RuntimeError('timeout failure')
-            finally:
-                cls._on_request_complete(cls._request_timeout_failure)
+    def stream(cls, method, path, consumer, **kwargs):
+        """Issue a request and stream the response body to `consumer`.
+
+        :param str method: HTTP method to invoke
+        :param str path: possibly absolute path of the resource
+            to invoke
+        :param consumer: callable that is invoked with each chunk of
+            the response body as it is received.  See
+            :class:`DigestConsumer` and :class:`JsonLinesConsumer`.
+        :param kwargs: additional arguments passed to :meth:`request`
+
+        :returns: a :class:`tornado.httpclient.HTTPResponse` instance
+        :raises tornado.httpclient.HTTPError: if the response has an
+            error status or no response was received
 
-        tmo_handle = cls.io_loop.add_timeout(
-            cls.io_loop.time() + cls.request_timeout, timeout)
-        cls.io_loop.start()
-        cls.io_loop.remove_timeout(tmo_handle)
+        The response body is never buffered so the ``body`` of
+        the returned response is empty.  Use this to test endpoints
+        that return very large responses.
 
-        assert cls._result is not cls._request_timeout_failure
-        return cls._result
+        If `consumer` has a ``close`` method, then it is called once
+        the whole response has been received successfully.  It is not
+        called for error responses since their body is usually not
+        what the consumer expects.
+
+        """
+        response = cls.request(method, path, streaming_callback=consumer,
+                               **kwargs)
+        response.rethrow()
+        close = getattr(consumer, 'close', None)
+        if close is not None:
+            close()
+        return response
+
+    @classmethod
+    @gen.coroutine
+    def _fetch_with_timeout(cls, request):
+        """Send `request` and wait at most :attr:`request_timeout`."""
+        try:
+            response = yield gen.with_timeout(
+                datetime.timedelta(seconds=cls.request_timeout),
+                cls._fetch(request))
+        except gen.TimeoutError:
+            raise AssertionError('timeout failure')
+        raise gen.Return(response)
+
+    @classmethod
+    @gen.coroutine
+    def _fetch(cls, request):
+        """Send `request` to the application and return a future.
+
+        :param tornado.httpclient.HTTPRequest request: the request
+            to send
+
+        The future always resolves to a
+        :class:`tornado.httpclient.HTTPResponse` instance.  Error
+        responses are returned instead of raised and failures that
+        prevent a response from being received are reported as a
+        synthesized ``599`` response, just like the callback interface
+        of :meth:`tornado.httpclient.AsyncHTTPClient.fetch` does.
+
+        """
+        timer = _RequestTimer(request) if cls.timing_capacity else None
+        try:
+            response = yield cls.client.fetch(request)
+        except Exception as error:
+            response = getattr(error, 'response', None)
+            if response is None:
+                response = httpclient.HTTPResponse(request, 599, error=error)
+        if timer is not None:
+            cls._record_timing(timer.finish(response))
+        raise gen.Return(response)
+
+    @classmethod
+    def get_request_timings(cls):
+        """Return the :class:`RequestTiming` records for this class.
+
+        :returns: a :class:`list` of the most recent
+            :attr:`timing_capacity` records, oldest first
+
+        """
+        return list(_request_timings.get(bases._class_name(cls), ()))
+
+    @classmethod
+    def _record_timing(cls, timing):
+        name = bases._class_name(cls)
+        try:
+            timings = _request_timings[name]
+        except KeyError:
+            timings = collections.deque(maxlen=cls.timing_capacity)
+            _request_timings[name] = timings
+        timings.append(timing)
+
+
+class _RequestTimer(object):
+
+    """Measures a request as it is sent by :meth:`TornadoMixin._fetch`.
+
+    The header and streaming callbacks of `request` are wrapped so
+    that the arrival of the first response byte and the size of
+    streamed bodies are captured.
+
+    """
+
+    __slots__ = ('request', 'start', 'first_byte', 'streamed',
+                 'header_callback', 'streaming_callback')
+
+    def __init__(self, request):
+        self.request = request
+        self.first_byte = None
+        self.streamed = 0
+        self.header_callback = request.header_callback
+        self.streaming_callback = request.streaming_callback
+        request.header_callback = self.on_header
+        if request.streaming_callback is not None:
+            request.streaming_callback = self.on_chunk
+        self.start = timeit.default_timer()
+
+    def on_header(self, line):
+        if self.first_byte is None:
+            self.first_byte = timeit.default_timer() - self.start
+        if self.header_callback is not None:
+            self.header_callback(line)
+
+    def on_chunk(self, chunk):
+        self.streamed += len(chunk)
+        self.streaming_callback(chunk)
+
+    def finish(self, response):
+        """Restore the request callbacks and return a timing record."""
+        elapsed = timeit.default_timer() - self.start
+        self.request.header_callback = self.header_callback
+        self.request.streaming_callback = self.streaming_callback
+        if self.streaming_callback is None and response.buffer is not None:
+            body_size = len(response.body)
+        else:
+            body_size = self.streamed
+        return RequestTiming(
+            self.request.method,
+            compat.urlsplit(self.request.url).path or '/',
+            response.code,
+            elapsed if response.request_time is None
+            else response.request_time,
+            self.first_byte,
+            body_size)
+
+
+class _UnixSocketResolver(netutil.Resolver):
+
+    """Resolves every host name to a Unix domain socket."""
+
+    def initialize(self, socket_path, **_):
+        self.socket_path = socket_path
+
+    def close(self):
+        pass
+
+    @gen.coroutine
+    def resolve(self, host, port, family=socket.AF_UNSPEC, **_):
+        raise gen.Return([(socket.AF_UNIX, self.socket_path)])
+
+
+class _InMemoryConnection(httputil.HTTPConnection):
+
+    """Server side of a request that never touches a socket.
+
+    The application writes its response to this connection which
+    collects it and passes a :class:`tornado.httpclient.HTTPResponse`
+    to `callback` when the application finishes the request.
+
+    """
+
+    def __init__(self, request, callback):
+        super(_InMemoryConnection, self).__init__()
+        self.request = request
+        self.callback = callback
+        self.code = None
+        self.reason = None
+        self.headers = None
+        self.buffer = io.BytesIO()
+        self.start_time = timeit.default_timer()
+
+    def set_close_callback(self, callback):
+        pass
+
+    def write_headers(self, start_line, headers, chunk=None, callback=None):
+        self.code = start_line.code
+        self.reason = start_line.reason
+        self.headers = headers
+        if self.request.header_callback is not None:
+            self.request.header_callback('{0} {1} {2}\r\n'.format(
+                *start_line))
+            for name, value in headers.get_all():
+                self.request.header_callback(
+                    '{0}: {1}\r\n'.format(name, value))
+            self.request.header_callback('\r\n')
+        return self.write(chunk or b'', callback=callback)
+
+    def write(self, chunk, callback=None):
+        if self.request.streaming_callback is not None:
+            if chunk:
+                self.request.streaming_callback(chunk)
+        else:
+            self.buffer.write(chunk)
+        if callback is not None:
+            callback()
+        future = concurrent.Future()
+        future.set_result(None)
+        return future
+
+    def finish(self):
+        self.buffer.seek(0)
+        self.callback(httpclient.HTTPResponse(
+            self.request, self.code, reason=self.reason,
+            headers=self.headers, buffer=self.buffer,
+            effective_url=self.request.url,
+            request_time=timeit.default_timer() - self.start_time))
+
+
+class _InMemoryHTTPClient(httpclient.AsyncHTTPClient):
+
+    """HTTP client that hands requests directly to an HTTP server.
+
+    The ``server`` keyword is the :class:`tornado.httpserver.HTTPServer`
+    that would normally receive the request over a socket.
+
+    """
+
+    def initialize(self, *args, **kwargs):
+        self.server = kwargs.pop('server')
+        super(_InMemoryHTTPClient, self).initialize(*args, **kwargs)
+
+    def fetch_impl(self, request, callback):
+        future = self._deliver(request, callback)
+        self.io_loop.add_future(future, lambda f: self._on_delivered(
+            request, callback, f))
+
+    @gen.coroutine
+    def _deliver(self, request, callback):
+        url = compat.urlsplit(request.url)
+        path = url.path or '/'
+        if url.query:
+            path = '{0}?{1}'.format(path, url.query)
+
+        body = request.body or b''
+        headers = httputil.HTTPHeaders(request.headers)
+        headers.setdefault('Host', url.netloc)
+        if body:
+            headers['Content-Length'] = str(len(body))
+
+        connection = _InMemoryConnection(request, callback)
+        delegate = self.server.start_request(self, connection)
+        pending = delegate.headers_received(
+            httputil.RequestStartLine(request.method, path, 'HTTP/1.1'),
+            headers)
+        if pending is not None:
+            yield pending
+        if body:
+            pending = delegate.data_received(body)
+            if pending is not None:
+                yield pending
+        delegate.finish()
+
+    @staticmethod
+    def _on_delivered(request, callback, future):
+        error = future.exception()
+        if error is not None:
+            callback(httpclient.HTTPResponse(request, 599, error=error))
 
 
 class TornadoTest(TornadoMixin, bases.BaseTest):
@@ -218,11 +766,26 @@ class TornadoTest(TornadoMixin, bases.BaseTest):
     :class:`tornado.httpserver.HTTPServer` for a complete
     description of what constitutes a *"request callback"*.
 
+    The :meth:`~.bases.BaseTest.execute` method may be a Tornado
+    coroutine or an ``async def`` method.  If it is, then it is run to
+    completion on :attr:`io_loop` and it can use
+    :meth:`~TornadoMixin.fetch` to interact with the application.
+
+    By default, each test class starts and stops its own server.
+    When many classes test the same application, set
+    :attr:`tornado_scope` to ``'module'`` or ``'session'`` and the
+    server will be shared between them instead.  Extend
+    :meth:`~TornadoMixin.reset_tornado` to reset any application
+    state between classes.
+
     """
 
     tornado_application = None
     """The Tornado request handler callable."""
 
+    tornado_scope = 'class'
+    """Lifetime of the server: ``'class'``, ``'module'``, or ``'session'``."""
+
     @classmethod
     def configure(cls, application=None):
         """Configures the Tornado IOLoop.
@@ -230,25 +793,371 @@ class TornadoTest(TornadoMixin, bases.BaseTest):
         :param application: overrides :attr:`tornado_application`
 
         """
-        cls.start_tornado(application or cls.tornado_application)
+        application = application or cls.tornado_application
+        if cls.tornado_scope == 'class':
+            cls.start_tornado(application)
+        else:
+            cls.start_shared_tornado(application, cls.tornado_scope)
         super(TornadoTest, cls).configure()
 
+    @classmethod
+    def _run_phase(cls, phase):
+        """Run `phase` to completion on :attr:`io_loop` if it is async."""
+        run_phase = super(TornadoTest, cls)._run_phase
+        if _is_coroutine_function(phase):
+            return cls.io_loop.run_sync(lambda: run_phase(phase))
+        return run_phase(phase)
+
     @classmethod
     def annihilate(cls):
         """Terminates the Tornado application."""
         super(TornadoTest, cls).annihilate()
-        cls.stop_tornado()
+        if cls.tornado_scope == 'class':
+            cls.stop_tornado()
+        else:
+            cls.release_shared_tornado()
 
 
-class JsonMixin(object):
+class DigestConsumer(object):
 
-    """Mix in over :class:`TornadoMixin` to enable JSON handling.
+    """Streaming consumer that hashes and measures a response body.
+
+    :param str algorithm: name of the :mod:`hashlib` algorithm to use
+
+    Pass an instance to :meth:`TornadoMixin.stream` to assert on the
+    size and checksum of a response without keeping it in memory.
+
+    .. attribute:: size
+
+       The number of bytes received.
+
+    .. attribute:: chunk_count
+
+       The number of chunks received.
+
+    """
+
+    def __init__(self, algorithm='sha256'):
+        super(DigestConsumer, self).__init__()
+        self.size = 0
+        self.chunk_count = 0
+        self._hash = hashlib.new(algorithm)
+
+    def __call__(self, chunk):
+        self.size += len(chunk)
+        self.chunk_count += 1
+        self._hash.update(chunk)
+
+    def hexdigest(self):
+        """Return the digest of the data received so far."""
+        return self._hash.hexdigest()
+
+
+class JsonLinesConsumer(object):
+
+    """Streaming consumer that decodes newline-delimited JSON.
+
+    :param callback: optional callable that is invoked with each
+        decoded record
+    :param str encoding: character encoding of the response body
+
+    Each complete line is decoded as soon as it is received and
+    passed to `callback`.  Only the current partial line is retained
+    so memory use does not grow with the size of the response.
+    :meth:`TornadoMixin.stream` calls :meth:`close` to decode a final
+    line that is not newline terminated.
+
+    .. attribute:: record_count
+
+       The number of records decoded.
+
+    """
+
+    def __init__(self, callback=None, encoding='utf-8'):
+        super(JsonLinesConsumer, self).__init__()
+        self.callback = callback
+        self.encoding = encoding
+        self.record_count = 0
+        self._partial = b''
+
+    def __call__(self, chunk):
+        lines = (self._partial + chunk).split(b'\n')
+        self._partial = lines.pop()
+        for line in lines:
+            self._process(line)
+
+    def close(self):
+        """Decode the final record if it was not newline terminated."""
+        self._process(self._partial)
+        self._partial = b''
+
+    def _process(self, line):
+        if line.strip():
+            record = json.loads(line.decode(self.encoding))
+            self.record_count += 1
+            if self.callback is not None:
+                self.callback(record)
+
+
+class BenchmarkResult(object):
+
+    """Measurements collected by :meth:`TornadoBenchmarkMixin.benchmark`.
 
-    This mix in extends :meth:`TornadoMixin.request` so that it will
-    automatically serialize request data and deserialize responses
-    as JSON.  It does honor the HTTP content type headers so it will
-    not accidentally deserialize a non-JSON response or serialize an
-    already serialized request.
+    .. attribute:: latencies
+
+       List of the latency of each request in seconds in the order
+       that the requests completed.
+
+    .. attribute:: status_counts
+
+       Dictionary that maps each HTTP status code received to the
+       number of times that it was received.  Requests that failed
+       without a response are counted under ``599``.
+
+    .. attribute:: error_count
+
+       The number of requests that resulted in an error response
+       or failed to complete.
+
+    .. attribute:: elapsed
+
+       Wall-clock duration of the entire run in seconds.
+
+    """
+
+    def __init__(self):
+        super(BenchmarkResult, self).__init__()
+        self.latencies = []
+        self.status_counts = {}
+        self.error_count = 0
+        self.elapsed = 0.0
+
+    @property
+    def request_count(self):
+        """The number of requests that completed."""
+        return len(self.latencies)
+
+    @property
+    def requests_per_second(self):
+        """The throughput over the entire run."""
+        if not self.elapsed:
+            return 0.0
+        return self.request_count / self.elapsed
+
+    @property
+    def p50(self):
+        """The median request latency in seconds."""
+        return self.percentile(50)
+
+    @property
+    def p95(self):
+        """The 95th percentile request latency in seconds."""
+        return self.percentile(95)
+
+    @property
+    def p99(self):
+        """The 99th percentile request latency in seconds."""
+        return self.percentile(99)
+
+    def percentile(self, pct):
+        """Calculate a latency percentile using the nearest-rank method.
+
+        :param float pct: the percentile to calculate between 0 and 100
+        :returns: the latency in seconds or :data:`None` if no
+            requests completed
+
+        """
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        rank = int(math.ceil(pct / 100.0 * len(ordered)))
+        return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+    def record(self, latency, response):
+        """Add a completed request to the result.
+
+        :param float latency: request latency in seconds
+        :param tornado.httpclient.HTTPResponse response: the response
+
+        """
+        self.latencies.append(latency)
+        self.status_counts[response.code] = (
+            self.status_counts.get(response.code, 0) + 1)
+        if response.error is not None:
+            self.error_count += 1
+
+    def as_dict(self):
+        """Return the summarized result as a dictionary."""
+        return {
+            'request_count': self.request_count,
+            'error_count': self.error_count,
+            'status_counts': dict(self.status_counts),
+            'elapsed': self.elapsed,
+            'requests_per_second': self.requests_per_second,
+            'p50': self.p50,
+            'p95': self.p95,
+            'p99': self.p99,
+        }
+
+
+class TornadoBenchmarkMixin(object):
+
+    """Mix in over :class:`TornadoMixin` to measure an application.
+
+    This mix in adds the :meth:`benchmark` method which drives the
+    application started by :meth:`TornadoMixin.start_tornado` with
+    a number of concurrent clients and reports the throughput and
+    latency percentiles as a :class:`BenchmarkResult` so that tests
+    can assert on them.
+
+    **Usage**
+
+    .. code-block:: python
+
+       class WhenBenchmarkingIndex(TornadoBenchmarkMixin, TornadoTest):
+
+           tornado_application = myproject.Application()
+
+           @classmethod
+           def execute(cls):
+               cls.result = cls.benchmark(
+                   [('GET', '/index'), ('POST', '/items', {'body': '{}'})],
+                   count=1000, concurrency=20)
+
+           def should_not_fail_requests(self):
+               self.assertEqual(self.result.error_count, 0)
+
+           def should_respond_quickly(self):
+               self.assertLess(self.result.p99, 0.05)
+
+    """
+
+    benchmark_concurrency = 10
+    """Default number of concurrent clients used by :meth:`benchmark`."""
+
+    @classmethod
+    def benchmark(cls, request_mix, count=None, duration=None,
+                  concurrency=None):
+        """Issue a stream of requests to the application.
+
+        :param list request_mix: sequence of ``(method, path)`` or
+            ``(method, path, kwargs)`` tuples that are issued in
+            round-robin order.  Repeat an entry to weight it.
+        :param int count: total number of requests to issue
+        :param float duration: number of seconds to issue requests for
+        :param int concurrency: number of requests that are in flight
+            at any one time.  This defaults to
+            :attr:`benchmark_concurrency`.
+        :returns: a :class:`BenchmarkResult` instance
+
+        If neither `count` nor `duration` is specified, then each
+        entry in `request_mix` is issued exactly once.  If both are
+        specified, then the run stops when either limit is reached.
+
+        Each request must complete within :attr:`request_timeout`
+        seconds or the benchmark fails with an :exc:`AssertionError`
+        instead of blocking the test run.
+
+        """
+        if not request_mix:
+            raise ValueError('at least one request is required')
+        if count is None and duration is None:
+            count = len(request_mix)
+        if concurrency is None:
+            concurrency = cls.benchmark_concurrency
+
+        result = BenchmarkResult()
+        entries = itertools.cycle(request_mix)
+        issued = itertools.count()
+        started = timeit.default_timer()
+        deadline = None if duration is None else started + duration
+
+        @gen.coroutine
+        def worker():
+            for entry in entries:
+                if count is not None and next(issued) >= count:
+                    break
+                if deadline is not None and timeit.default_timer() >= deadline:
+                    break
+                method, path = entry[:2]
+                kwargs = entry[2] if len(entry) > 2 else {}
+                request = httpclient.HTTPRequest(
+                    compat.urljoin(cls.url_root, path), method=method,
+                    **kwargs)
+                request_started = timeit.default_timer()
+                response = yield cls._fetch_with_timeout(request)
+                result.record(
+                    timeit.default_timer() - request_started, response)
+
+        @gen.coroutine
+        def run():
+            yield [worker() for _ in range(concurrency)]
+
+        try:
+            cls.io_loop.run_sync(run, timeout=cls._benchmark_timeout(
+                count, duration, concurrency))
+        except gen.TimeoutError:
+            raise AssertionError('timeout failure')
+        result.elapsed = timeit.default_timer() - started
+        return result
+
+    @classmethod
+    def _benchmark_timeout(cls, count, duration, concurrency):
+        """Return the longest that a :meth:`benchmark` run may take.
+
+        This allows every worker to wait :attr:`request_timeout` for
+        each of its requests and then one more so that the timeouts
+        of the individual requests are reported first.
+
+        """
+        limits = []
+        if count is not None:
+            rounds = math.ceil(float(count) / concurrency)
+            limits.append((rounds + 1) * cls.request_timeout)
+        if duration is not None:
+            limits.append(duration + 2 * cls.request_timeout)
+        return min(limits)
+
+
+class CodecMixin(object):
+
+    """Mix in over :class:`TornadoMixin` to encode and decode bodies.
+
+    This mix in extends :meth:`TornadoMixin.request` and
+    :meth:`TornadoMixin.fetch` so that they will automatically
+    serialize request data and deserialize responses based on the
+    HTTP content type headers.  Bodies are translated by the
+    serializer registered for the content type with
+    :func:`test_helpers.serializers.register_serializer`.
+
+    Request bodies that are already :class:`bytes` or text are sent
+    as-is.  Anything else, including an explicit :data:`None`, is
+    serialized using the request content type or
+    :attr:`default_content_type` if the request does not specify one.
+
+    The decoded response body is saved as the :attr:`decoded_attribute`
+    attribute of the response.  It is :data:`None` when the response
+    content type does not have a registered serializer or the body
+    cannot be decoded.  Raw ``application/octet-stream`` bodies are
+    exposed as a :class:`memoryview` so that they are not copied.
+
+    """
+
+    default_content_type = 'application/json; charset=utf-8'
+    """Content type used to serialize request bodies by default."""
+
+    accept = 'application/json'
+    """Value of the :mailheader:`Accept` header unless one is specified."""
+
+    decoded_attribute = 'data'
+    """Name of the response attribute that holds the decoded body."""
+
+    lazy_decode = True
+    """Decode the response body when it is first accessed.
+
+    The decoded value is cached on the response so the body is
+    decoded at most once.  Set this to :data:`False` to decode every
+    response body as soon as it is received.
 
     """
 
@@ -259,49 +1168,440 @@ class JsonMixin(object):
         :param args: positional parameters to send to ``super().request``
         :param kwargs: keyword parameters to send to ``super().request``
 
-        :returns: either a :class:`tornado.httpclient.HTTPResponse`
-            instance or :data:`None` if the request timed out.
+        :returns: a :class:`tornado.httpclient.HTTPResponse` instance
+
+        """
+        kwargs = cls._prepare_request(kwargs)
+        response = super(CodecMixin, cls).request(*args, **kwargs)
+        return cls._process_response(response, kwargs)
+
+    @classmethod
+    @gen.coroutine
+    def fetch(cls, *args, **kwargs):
+        """Send a request from a coroutine and process the response.
+
+        :param args: positional parameters to send to ``super().fetch``
+        :param kwargs: keyword parameters to send to ``super().fetch``
+
+        :returns: a future that resolves to a
+            :class:`tornado.httpclient.HTTPResponse` instance
 
         """
+        kwargs = cls._prepare_request(kwargs)
+        response = yield super(CodecMixin, cls).fetch(*args, **kwargs)
+        raise gen.Return(cls._process_response(response, kwargs))
+
+    @classmethod
+    def _request_serializer(cls, media_type):
+        return serializers.get_serializer(media_type)
+
+    @classmethod
+    def _response_serializer(cls, media_type):
+        return serializers.get_serializer(media_type)
+
+    @classmethod
+    def _prepare_request(cls, kwargs):
         headers = httputil.HTTPHeaders()
         if 'headers' in kwargs:
             headers.update(kwargs.pop('headers'))
 
-        if 'body' in kwargs:
-            header_val = headers.get('content-type', 'application/json')
-            content_type = header_val
-            if ';' in content_type:
-                content_type, _ = header_val.split(';', 1)
-            body = kwargs.get('body')
-            if (content_type.endswith('json')
-                    and not isinstance(body, text_type)):
-                kwargs['body'] = json.dumps(body).encode('utf-8')
+        body = kwargs.get('body')
+        if 'body' in kwargs and not isinstance(body, (text_type, bytes)):
+            content_type = serializers.parse_content_type(
+                headers.get('content-type', cls.default_content_type))
+            serializer = cls._request_serializer(content_type.media_type)
+            if serializer is not None:
+                kwargs['body'] = serializer.dumps(body)
                 if 'content-type' not in headers:
-                    content_type = 'application/json; charset=utf-8'
-                    headers['Content-Type'] = content_type
+                    headers['Content-Type'] = cls.default_content_type
 
         if 'accept' not in headers:
-            headers['Accept'] = 'application/json'
+            headers['Accept'] = cls.accept
 
         if headers:
             kwargs['headers'] = headers
 
-        response = super(JsonMixin, cls).request(*args, **kwargs)
-        response.json = None
-
-        header_val = response.headers.get(
-            'content-type', 'application/octet-stream')
-        content_type, params = header_val, ''
-        if ';' in content_type:
-            content_type, params = header_val.split(';', 1)
-        if content_type.endswith('json'):
-            encoding = 'utf-8'
-            for param in params.split(','):
-                if param.strip().startswith('charset='):
-                    encoding = param.split('=')[1]
-            try:
-                response.json = json.loads(response.body.decode(encoding))
-            except:
-                response.json = None
+        return kwargs
+
+    @classmethod
+    def _process_response(cls, response, kwargs):
+        attribute = cls.decoded_attribute
+        if kwargs.get('streaming_callback') is not None:
+            setattr(response, attribute, None)
+            return response
+
+        content_type = serializers.parse_content_type(
+            response.headers.get('content-type', 'application/octet-stream'))
+        serializer = cls._response_serializer(content_type.media_type)
+        if serializer is None:
+            setattr(response, attribute, None)
+            return response
+
+        decode = functools.partial(
+            cls._decode_body, response, serializer,
+            content_type.charset or 'utf-8')
+        if cls.lazy_decode:
+            response.__class__ = _lazy_response_class(
+                response.__class__, attribute)
+            response.__dict__.setdefault('_lazy_decoders', {})[attribute] = (
+                decode)
+        else:
+            setattr(response, attribute, decode())
 
         return response
+
+    @staticmethod
+    def _decode_body(response, serializer, encoding):
+        try:
+            body = response.body
+            if (not isinstance(serializer, serializers.RawSerializer) and
+                    codecs.lookup(encoding).name != 'utf-8'):
+                body = body.decode(encoding)
+            return serializer.loads(body)
+        except Exception:
+            return None
+
+
+class JsonMixin(CodecMixin):
+
+    """Mix in over :class:`TornadoMixin` to enable JSON handling.
+
+    This is the JSON flavor of :class:`CodecMixin`.  Request data is
+    serialized as JSON unless the request specifies a different
+    content type and JSON responses are deserialized into the
+    ``json`` attribute of the response.  It does honor the HTTP
+    content type headers so it will not accidentally deserialize a
+    non-JSON response or serialize an already serialized request.
+
+    Encoding and decoding is delegated to :attr:`json_serializer`
+    which encodes request bodies exactly as :func:`json.dumps` does
+    unless a faster JSON library is selected.  Response bodies are
+    parsed directly from :class:`bytes` when they are UTF-8 encoded
+    and only when ``response.json`` is first accessed.
+
+    """
+
+    json_serializer = serializers.get_serializer('application/json')
+    """The :class:`~test_helpers.serializers.JsonSerializer` to use."""
+
+    decoded_attribute = 'json'
+
+    @classmethod
+    def _request_serializer(cls, media_type):
+        serializer = serializers.get_serializer(media_type)
+        if isinstance(serializer, serializers.JsonSerializer):
+            return cls.json_serializer
+        return serializer
+
+    @classmethod
+    def _response_serializer(cls, media_type):
+        serializer = serializers.get_serializer(media_type)
+        if isinstance(serializer, serializers.JsonSerializer):
+            return cls.json_serializer
+        return None
+
+
+class MsgpackMixin(CodecMixin):
+
+    """Mix in over :class:`TornadoMixin` to enable MessagePack handling.
+
+    This is the MessagePack flavor of :class:`CodecMixin`.  Request
+    data is serialized as ``application/msgpack`` unless the request
+    specifies a different content type and responses are deserialized
+    into the ``data`` attribute of the response.  This requires the
+    `msgpack`_ library.
+
+    .. _msgpack: https://pypi.org/project/msgpack/
+
+    """
+
+    default_content_type = 'application/msgpack'
+    accept = 'application/msgpack'
+
+
+class _LazyDecode(object):
+
+    """Decodes and caches a response attribute on first access."""
+
+    def __init__(self, attribute):
+        self.attribute = attribute
+
+    def __get__(self, response, owner):
+        if response is None:
+            return self
+        value = response._lazy_decoders.pop(self.attribute)()
+        setattr(response, self.attribute, value)
+        return value
+
+
+_lazy_response_classes = {}
+
+
+def _lazy_response_class(response_class, attribute):
+    """Return a subclass of `response_class` that decodes `attribute`."""
+    key = (response_class, attribute)
+    try:
+        return _lazy_response_classes[key]
+    except KeyError:
+        lazy_class = type(response_class.__name__, (response_class,),
+                          {attribute: _LazyDecode(attribute)})
+        _lazy_response_classes[key] = lazy_class
+        return lazy_class
+
+
+class CassetteMissError(Exception):
+
+    """Raised when a replayed request is not found in a cassette."""
+
+
+class Cassette(object):
+
+    """Records outbound HTTP exchanges to a file and replays them.
+
+    :param str path: the cassette file
+    :param str mode: one of ``'record'``, ``'replay'``, or ``'auto'``
+
+    In *record* mode every request is sent, even if the same request
+    was recorded before, and the cassette is rewritten by
+    :meth:`save`.  In *replay* mode responses are
+    served from the cassette and requests that are not in it fail
+    with a :exc:`CassetteMissError`.  The *auto* mode replays the
+    exchanges that are in the cassette and records the rest.
+
+    Exchanges are indexed by the request method, URL, and a hash of
+    the request body.  The cassette file holds a compact index
+    followed by the raw response bodies.  The file is memory-mapped
+    when it is opened so only the bodies that are replayed are read.
+
+    """
+
+    MAGIC = b'test-helpers-cassette-1\n'
+
+    def __init__(self, path, mode='auto'):
+        super(Cassette, self).__init__()
+        if mode not in ('record', 'replay', 'auto'):
+            raise ValueError('unknown cassette mode {0!r}'.format(mode))
+        self.path = path
+        self.mode = mode
+        self._index = {}
+        self._recorded = {}
+        self._file = None
+        self._map = None
+        self._body_offset = 0
+        if mode != 'record' and os.path.exists(path):
+            self._load()
+
+    @property
+    def recording(self):
+        """Is this cassette recording new exchanges?"""
+        return self.mode != 'replay'
+
+    def __len__(self):
+        return len(set(self._index) | set(self._recorded))
+
+    @staticmethod
+    def key(request):
+        """Return the index key for `request`."""
+        body_hash = hashlib.sha1(request.body or b'').hexdigest()
+        return hashlib.sha1('\n'.join(
+            [request.method, request.url, body_hash]).encode('utf-8')
+        ).hexdigest()
+
+    def play(self, request):
+        """Return the recorded response for `request` or :data:`None`.
+
+        :data:`None` is always returned in *record* mode so that the
+        request is sent and its response recorded again.
+
+        """
+        if self.mode == 'record':
+            return None
+        key = self.key(request)
+        try:
+            entry, body = self._recorded[key]
+        except KeyError:
+            try:
+                entry = self._index[key]
+            except KeyError:
+                if self.mode == 'replay':
+                    raise CassetteMissError(
+                        '{0} {1} is not in {2}'.format(
+                            request.method, request.url, self.path))
+                return None
+            start = self._body_offset + entry['offset']
+            body = self._map[start:start + entry['length']]
+        return httpclient.HTTPResponse(
+            request, entry['code'], reason=entry['reason'],
+            headers=httputil.HTTPHeaders(entry['headers']),
+            buffer=io.BytesIO(body), effective_url=request.url,
+            request_time=0.0)
+
+    def record(self, request, response):
+        """Add an exchange to the cassette."""
+        headers = [] if response.headers is None else [
+            list(header) for header in response.headers.get_all()]
+        self._recorded[self.key(request)] = ({
+            'method': request.method,
+            'url': request.url,
+            'code': response.code,
+            'reason': response.reason,
+            'headers': headers,
+        }, response.body or b'')
+
+    def save(self):
+        """Write the cassette to disk if anything was recorded."""
+        if not self._recorded:
+            return
+
+        entries, bodies, offset = {}, [], 0
+        for key in self._index:
+            if key not in self._recorded:
+                entry = dict(self._index[key])
+                start = self._body_offset + entry['offset']
+                bodies.append(self._map[start:start + entry['length']])
+                entry['offset'] = offset
+                entries[key] = entry
+                offset += entry['length']
+        for key, (entry, body) in self._recorded.items():
+            entry = dict(entry, offset=offset, length=len(body))
+            bodies.append(body)
+            entries[key] = entry
+            offset += len(body)
+
+        index = json.dumps(entries, sort_keys=True).encode('utf-8')
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as cassette_file:
+            cassette_file.write(self.MAGIC)
+            cassette_file.write(struct.pack('>Q', len(index)))
+            cassette_file.write(index)
+            for body in bodies:
+                cassette_file.write(body)
+
+        self.close()
+        os.rename(temp_path, self.path)
+        self._recorded.clear()
+        self._load()
+
+    def close(self):
+        """Release the memory map of the cassette file."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._index = {}
+
+    def _load(self):
+        self._file = open(self.path, 'rb')
+        self._map = mmap.mmap(
+            self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        header_size = len(self.MAGIC) + 8
+        if self._map[:len(self.MAGIC)] != self.MAGIC:
+            self.close()
+            raise ValueError('{0} is not a cassette'.format(self.path))
+        index_size, = struct.unpack(
+            '>Q', self._map[len(self.MAGIC):header_size])
+        self._body_offset = header_size + index_size
+        self._index = json.loads(
+            self._map[header_size:self._body_offset].decode('utf-8'))
+
+
+class CassetteMixin(object):
+
+    """Record and replay the HTTP requests that an application makes.
+
+    Mix this in over :class:`TornadoTest` to intercept every request
+    that the application under test sends through a
+    :class:`tornado.httpclient.AsyncHTTPClient`.  The first run
+    records the exchanges in :attr:`cassette_path`.  Later runs replay
+    them without touching the network which makes them deterministic
+    and fast.  Requests sent to the application by the test itself
+    are never recorded.
+
+    **Usage**
+
+    .. code-block:: python
+
+       class WhenFetchingProfile(CassetteMixin, TornadoTest):
+
+           tornado_application = myproject.Application()
+           cassette_path = 'tests/cassettes/profile.cassette'
+
+           @classmethod
+           def execute(cls):
+               cls.response = cls.get('/profile')
+
+    """
+
+    cassette_path = None
+    """File that exchanges are recorded to and replayed from.
+
+    Requests are sent without being recorded or replayed when this
+    is :data:`None`.
+
+    """
+
+    cassette_mode = os.environ.get('TEST_HELPERS_CASSETTE_MODE', 'auto')
+    """The :class:`Cassette` mode to use."""
+
+    cassette = None
+    """The :class:`Cassette` instance while the test is running."""
+
+    @classmethod
+    def configure(cls):
+        super(CassetteMixin, cls).configure()
+        if cls.cassette_path is None:
+            return
+        cls.cassette = Cassette(cls.cassette_path, cls.cassette_mode)
+        cls._cassette_patches = [
+            compat.mock.patch.object(
+                client_class, 'fetch_impl',
+                cls._wrap_fetch_impl(client_class.fetch_impl))
+            for client_class in _http_client_classes()
+            if 'fetch_impl' in vars(client_class)
+        ]
+        for patcher in cls._cassette_patches:
+            patcher.start()
+
+    @classmethod
+    def annihilate(cls):
+        for patcher in getattr(cls, '_cassette_patches', []):
+            patcher.stop()
+        cls._cassette_patches = []
+        if cls.cassette is not None:
+            cls.cassette.save()
+            cls.cassette.close()
+            cls.cassette = None
+        super(CassetteMixin, cls).annihilate()
+
+    @classmethod
+    def _wrap_fetch_impl(cls, fetch_impl):
+        def wrapper(client, request, callback):
+            if client is cls.client:
+                return fetch_impl(client, request, callback)
+
+            try:
+                response = cls.cassette.play(request)
+            except CassetteMissError as error:
+                response = httpclient.HTTPResponse(request, 599, error=error)
+            if response is not None:
+                client.io_loop.add_callback(callback, response)
+                return
+
+            def on_response(response):
+                if response.code != 599:
+                    cls.cassette.record(request, response)
+                callback(response)
+
+            return fetch_impl(client, request, on_response)
+
+        return wrapper
+
+
+def _http_client_classes(base=httpclient.AsyncHTTPClient):
+    """Return `base` and all of its subclasses."""
+    classes = [base]
+    for subclass in base.__subclasses__():
+        classes.extend(_http_client_classes(subclass))
+    return classes
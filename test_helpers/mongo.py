@@ -4,7 +4,9 @@ import logging
 import os
 import uuid
 
-from pymongo import MongoClient
+from test_helpers import broker, compat, resources
+
+pymongo = compat.LazyModule('pymongo')
 
 _logger = logging.getLogger(__name__)
 _temporary_databases = []
@@ -56,18 +58,33 @@ class TemporaryDatabase(object):
                                os.environ.get('MONGOHOST', 'localhost'))
         self.port = int(kwargs.pop('port', os.environ.get('MONGOPORT', 27017)))
         self.database_name = None
+        self._lease = None
 
     def create(self):
-        """Create the temporary database if it does not exist."""
+        """Create the temporary database if it does not exist.
+
+        The database is leased from the :mod:`fixture broker
+        <test_helpers.broker>` when :envvar:`TEST_HELPERS_BROKER` is set.
+
+        """
 
         if self.database_name is not None:
             return
+        client = broker.get_client()
+        if client is not None:
+            self._lease_database(client)
+            return
         database_name = 'test{0}'.format(uuid.uuid4().hex)
+        resources.register('mongo', self, database_name)
 
-        mongodb = MongoClient(self.host, self.port)
-        db = mongodb[database_name]
-        collection = db['test_helpers']
-        collection.insert({'create_date': datetime.datetime.utcnow()})
+        try:
+            mongodb = pymongo.MongoClient(self.host, self.port)
+            db = mongodb[database_name]
+            collection = db['test_helpers']
+            collection.insert({'create_date': datetime.datetime.utcnow()})
+        except:
+            resources.unregister(self)
+            raise
 
         self.database_name = database_name
         _temporary_databases.append(self)
@@ -76,10 +93,16 @@ class TemporaryDatabase(object):
         """Drop the temporary database if it was created."""
         if self.database_name is None:
             return
-        mongodb = MongoClient(self.host, self.port)
-        mongodb.drop_database(self.database_name)
+        if self._lease is not None:
+            client, lease = self._lease
+            client.release(lease)
+            self._lease = None
+        else:
+            mongodb = pymongo.MongoClient(self.host, self.port)
+            mongodb.drop_database(self.database_name)
         _temporary_databases.remove(self)
         self.database_name = None
+        resources.unregister(self)
 
     def set_environment(self):
         """
@@ -93,3 +116,14 @@ class TemporaryDatabase(object):
         os.environ['MONGOPORT'] = str(self.port)
         if self.database_name is not None:
             os.environ['MONGODATABASE'] = self.database_name
+
+    def _lease_database(self, client):
+        lease = client.lease('mongo', {'host': self.host, 'port': self.port})
+        try:
+            resources.register('mongo', self, lease.resource['database'])
+        except:
+            client.release(lease)
+            raise
+        self.database_name = lease.resource['database']
+        self._lease = (client, lease)
+        _temporary_databases.append(self)
@@ -0,0 +1,198 @@
+"""
+================
+Parallel Arrange
+================
+
+Most of the time that a :class:`~test_helpers.bases.BaseTest` suite
+spends is in the :meth:`~test_helpers.bases.BaseTest.configure` and
+:meth:`~test_helpers.bases.BaseTest.execute` phases waiting on I/O --
+cloning databases, creating virtual hosts, or sending HTTP requests.
+The classes in this module arrange independent test classes in a
+pool of background threads while the assertions of earlier classes
+run.  The assertions themselves are run in the main thread as usual.
+
+Only classes that set
+:attr:`~test_helpers.bases.BaseTest.arrange_in_parallel` are arranged
+in the background.  Every other class is arranged in the main thread
+when :meth:`~unittest.TestCase.setUpClass` is called.
+
+**Usage Example**
+
+.. code-block:: python
+
+   import unittest
+
+   from test_helpers import parallel
+
+   if __name__ == '__main__':
+       unittest.main(testLoader=parallel.ParallelArrangeLoader())
+
+The :envvar:`TEST_HELPERS_ARRANGE_WORKERS` environment variable sets
+the number of background threads.  It defaults to four.
+
+"""
+import os
+import sys
+import threading
+
+import six
+from six.moves import queue
+
+from test_helpers import bases
+from test_helpers.compat import unittest
+
+
+class Arrangement(object):
+    """
+    Tracks a test class that is being arranged in the background.
+
+    :param cls: the :class:`~test_helpers.bases.BaseTest` subclass
+
+    """
+
+    def __init__(self, cls):
+        super(Arrangement, self).__init__()
+        self.cls = cls
+        self.exc_info = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._started = False
+        self._cancelled = False
+
+    @property
+    def arranged(self):
+        """Was the class arranged successfully?"""
+        return (self._started and self._done.is_set() and
+                self.exc_info is None)
+
+    def run(self):
+        """Arrange the class and record any failure."""
+        with self._lock:
+            if self._cancelled:
+                self._done.set()
+                return
+            self._started = True
+        try:
+            self.cls.arrange()
+        except BaseException:
+            self.exc_info = sys.exc_info()
+        finally:
+            self._done.set()
+
+    def cancel(self):
+        """Prevent the class from being arranged if it has not started."""
+        with self._lock:
+            self._cancelled = True
+
+    def wait(self):
+        """Wait for the class to be arranged.
+
+        :raises: the exception that :meth:`~.BaseTest.arrange` raised
+
+        """
+        self._done.wait()
+        if self.exc_info is not None:
+            exc_info, self.exc_info = self.exc_info, None
+            six.reraise(*exc_info)
+
+
+class ParallelArrangeSuite(unittest.TestSuite):
+    """
+    Test suite that arranges test classes in background threads.
+
+    :keyword int max_workers: the number of threads to arrange
+        classes in.  This defaults to the value of the
+        :envvar:`TEST_HELPERS_ARRANGE_WORKERS` environment variable.
+
+    When the outermost suite is run, every eligible class that it
+    contains is queued in the order that the classes will run.  The
+    suite then runs as a regular :class:`unittest.TestSuite` does
+    and :meth:`~test_helpers.bases.BaseTest.setUpClass` waits for
+    the background arrangement of its class to finish.
+
+    If the run stops early, for example because of ``failfast`` or a
+    :exc:`KeyboardInterrupt`, then the classes that have not started
+    to arrange are cancelled, the background threads are joined, and
+    the classes that were arranged but never run are annihilated.
+
+    """
+
+    def __init__(self, tests=(), max_workers=None):
+        super(ParallelArrangeSuite, self).__init__(tests)
+        if max_workers is None:
+            max_workers = int(
+                os.environ.get('TEST_HELPERS_ARRANGE_WORKERS', '4'))
+        self.max_workers = max_workers
+
+    def run(self, result, debug=False):
+        if getattr(result, '_parallelArrangeStarted', False):
+            return super(ParallelArrangeSuite, self).run(result, debug)
+
+        result._parallelArrangeStarted = True
+        classes = [cls for cls in self._test_classes()
+                   if self._is_eligible(cls)]
+        threads = self._start_workers(classes) if classes else []
+        try:
+            return super(ParallelArrangeSuite, self).run(result, debug)
+        finally:
+            self._stop_workers(classes, threads)
+
+    def _test_classes(self):
+        classes, pending = [], [self]
+        while pending:
+            test = pending.pop(0)
+            if isinstance(test, unittest.TestSuite):
+                pending[:0] = list(test)
+            elif test.__class__ not in classes:
+                classes.append(test.__class__)
+        return classes
+
+    @staticmethod
+    def _is_eligible(cls):
+        return (issubclass(cls, bases.BaseTest) and
+                cls.arrange_in_parallel and
+                not getattr(cls, '__unittest_skip__', False) and
+                '_arrangement' not in vars(cls))
+
+    def _start_workers(self, classes):
+        pending = queue.Queue()
+        for cls in classes:
+            cls._arrangement = Arrangement(cls)
+            pending.put(cls._arrangement)
+
+        def worker():
+            while True:
+                try:
+                    arrangement = pending.get_nowait()
+                except queue.Empty:
+                    return
+                arrangement.run()
+
+        threads = []
+        for _ in range(max(1, min(self.max_workers, len(classes)))):
+            thread = threading.Thread(target=worker)
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        return threads
+
+    @staticmethod
+    def _stop_workers(classes, threads):
+        unused = []
+        for cls in classes:
+            arrangement = vars(cls).get('_arrangement')
+            if arrangement is not None:
+                del cls._arrangement
+                arrangement.cancel()
+                unused.append(arrangement)
+        for thread in threads:
+            thread.join()
+        for arrangement in unused:
+            if arrangement.arranged:
+                arrangement.cls._dismantle()
+
+
+class ParallelArrangeLoader(unittest.TestLoader):
+    """Test loader that creates :class:`ParallelArrangeSuite` suites."""
+
+    suiteClass = ParallelArrangeSuite
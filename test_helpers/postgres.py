@@ -1,13 +1,26 @@
 import atexit
+import collections
 import logging
 import os
+import re
+import threading
+import time
 import uuid
 
-import psycopg2
+from test_helpers import broker, compat, resources
 
+psycopg2 = compat.LazyModule('psycopg2')
 
 _logger = logging.getLogger(__name__)
 _temporary_databases = []
+_temporary_schemas = []
+_SEARCH_PATH_OPTION = re.compile(r'(?:-c\s*|--)search[_-]path=\S*')
+_shared_databases = {}
+_shared_databases_lock = threading.Lock()
+
+Statement = collections.namedtuple(
+    'Statement', ['query', 'calls', 'total_time', 'rows'])
+"""A statement recorded by :class:`QueryCapture`."""
 
 
 def _remove_databases():
@@ -22,6 +35,21 @@ def _remove_databases():
 atexit.register(_remove_databases)
 
 
+def _remove_schemas():
+    for schema in _temporary_schemas[:]:
+        try:
+            schema.drop()
+        except:
+            _logger.exception('failed to drop schema %r', schema.schema_name)
+    del _temporary_schemas[:]
+
+atexit.register(_remove_schemas)
+
+
+def _quote_ident(name):
+    return '"{0}"'.format(name.replace('"', '""'))
+
+
 class TemporaryDatabase(object):
     """
     Creates a temporary database that is destroyed automatically.
@@ -81,6 +109,7 @@ class TemporaryDatabase(object):
         self.port = kwargs.pop('port', os.environ.get('PGPORT', '5432'))
         self._connect_kwargs = kwargs
         self._database_name = None
+        self._lease = None
 
     @property
     def connection_parameters(self):
@@ -103,16 +132,29 @@ class TemporaryDatabase(object):
         :keyword options: additional parameters to use in the
             ``CREATE DATABASE`` command.
 
+        The database is leased from the :mod:`fixture broker
+        <test_helpers.broker>` when :envvar:`TEST_HELPERS_BROKER` is set.
+
         """
         if self._database_name is not None:
             return
+        client = broker.get_client()
+        if client is not None:
+            self._lease_database(client, template, options)
+            return
         database_name = 'test{0}'.format(uuid.uuid4().hex)
-        self._run_ddl(
-            'CREATE DATABASE "{0}" TEMPLATE="{1}" {2}',
-            database_name,
-            template,
-            ' '.join("{0}='{1}'".format(k, v) for k, v in options.items()),
-        )
+        resources.register('postgres', self, database_name)
+        try:
+            self._run_ddl(
+                'CREATE DATABASE "{0}" TEMPLATE="{1}" {2}',
+                database_name,
+                template,
+                ' '.join("{0}='{1}'".format(k, v)
+                         for k, v in options.items()),
+            )
+        except:
+            resources.unregister(self)
+            raise
         self._database_name = database_name
         _temporary_databases.append(self)
 
@@ -120,8 +162,15 @@ class TemporaryDatabase(object):
         """Drop the temporary database if it was created."""
         if self._database_name is None:
             return
-        self._run_ddl('DROP DATABASE IF EXISTS "{0}"', self._database_name)
+        if self._lease is not None:
+            client, lease = self._lease
+            client.release(lease)
+            self._lease = None
+        else:
+            self._run_ddl(
+                'DROP DATABASE IF EXISTS "{0}"', self._database_name)
         self._database_name = None
+        resources.unregister(self)
 
     def set_environment(self):
         """
@@ -138,11 +187,43 @@ class TemporaryDatabase(object):
         if self._database_name is not None:
             os.environ['PGDATABASE'] = self._database_name
 
-    def _run_ddl(self, ddl_stmt, *args):
+    def capture_queries(self):
+        """
+        Record the statements that run in the database.
+
+        :rtype: QueryCapture
+
+        The capture is a context manager that records the statements
+        run in the body of the ``with`` statement.
+
+        """
+        return QueryCapture(self)
+
+    def _lease_database(self, client, template, options):
+        lease = client.lease('postgres', {
+            'user': self.user, 'password': self.password,
+            'host': self.host, 'port': self.port,
+            'connect_kwargs': self._connect_kwargs,
+            'template': template, 'options': options,
+        })
+        try:
+            resources.register('postgres', self, lease.resource['database'])
+        except:
+            client.release(lease)
+            raise
+        self._database_name = lease.resource['database']
+        self._lease = (client, lease)
+        _temporary_databases.append(self)
+
+    def _connect(self, database=None):
         conn_params = self._connect_kwargs.copy()
         conn_params.update(self.connection_parameters)
-        conn_params['database'] = self.STARTING_DATABASE
-        conn = psycopg2.connect(**conn_params)
+        if database is not None:
+            conn_params['database'] = database
+        return psycopg2.connect(**conn_params)
+
+    def _run_ddl(self, ddl_stmt, *args):
+        conn = self._connect(self.STARTING_DATABASE)
         conn.autocommit = True
         try:
             with conn.cursor() as cursor:
@@ -151,3 +232,449 @@ class TemporaryDatabase(object):
                 cursor.execute(sql)
         finally:
             conn.close()
+
+
+def shared_database(template='template0', **kwargs):
+    """
+    Return the temporary database that is shared by this process.
+
+    :param str template: the database to clone when the shared
+        database is created
+    :keyword kwargs: parameters for the :class:`TemporaryDatabase`
+        initializer
+
+    The database is created the first time that it is requested with
+    a given set of parameters and dropped when the process exits.
+    :class:`TemporarySchema` creates its schemas in this database
+    unless it is given a different one.
+
+    """
+    key = (template, tuple(sorted(kwargs.items())))
+    with _shared_databases_lock:
+        database = _shared_databases.get(key)
+        if database is None:
+            database = TemporaryDatabase(**kwargs)
+            database.create(template)
+            resources.disown(database)
+            _shared_databases[key] = database
+        return database
+
+
+class TemporarySchema(object):
+    """
+    Creates a temporary schema that is destroyed automatically.
+
+    :keyword database: the :class:`TemporaryDatabase` to create the
+        schema in.  This defaults to the :func:`shared_database`.
+    :keyword kwargs: parameters for :func:`shared_database` when
+        `database` is omitted
+
+    Creating a schema is much cheaper than cloning a database so this
+    is a lighter alternative to :class:`TemporaryDatabase` when tests
+    only need to be isolated from each other.  Each schema is created
+    in the same database and the code under test is pointed at it by
+    setting the ``search_path`` in the :envvar:`PGOPTIONS` environment
+    variable or the ``options`` connection parameter.
+
+    **Usage Example**
+
+    .. code-block:: python
+
+       from test_helpers import postgres
+
+       # load the tables into the "template" schema of the shared
+       # database once, then for each test:
+
+       schema = postgres.TemporarySchema()
+       schema.create(template='template')
+       schema.set_environment()
+
+       # from this point on, new connections that use the standard
+       # Postgres environment variables use the new schema
+
+    The structure of the template schema is copied: its tables with
+    their columns, defaults, constraints, and indexes, the sequences
+    owned by their columns, and the foreign keys between them.  Views,
+    functions, and data are not copied.
+
+    """
+
+    def __init__(self, database=None, **kwargs):
+        super(TemporarySchema, self).__init__()
+        self.database = database
+        self.schema_name = None
+        self._database_kwargs = kwargs
+
+    @property
+    def search_path(self):
+        """The ``search_path`` that selects the schema."""
+        return '{0},public'.format(self.schema_name)
+
+    @property
+    def connection_parameters(self):
+        """Keyword parameters for :func:`psycopg2.connect`."""
+        parameters = self.database.connection_parameters
+        if self.schema_name is not None:
+            parameters['options'] = '-c search_path={0}'.format(
+                self.search_path)
+        return parameters
+
+    def create(self, template=None):
+        """
+        Create the temporary schema if it does not exist.
+
+        :param str template: the name of a schema in the same database
+            to copy the structure of.  The new schema is empty if this
+            is omitted.
+
+        """
+        if self.schema_name is not None:
+            return
+        if self.database is None:
+            self.database = shared_database(**self._database_kwargs)
+        schema_name = 'test{0}'.format(uuid.uuid4().hex)
+        resources.register('schema', self, schema_name)
+        try:
+            self._run_in_transaction(self._create, schema_name, template)
+        except:
+            resources.unregister(self)
+            raise
+        self.schema_name = schema_name
+        _temporary_schemas.append(self)
+
+    def drop(self):
+        """Drop the temporary schema and everything in it."""
+        if self.schema_name is None:
+            return
+        self._run_in_transaction(self._drop, self.schema_name)
+        _temporary_schemas.remove(self)
+        self.schema_name = None
+        resources.unregister(self)
+
+    def set_environment(self):
+        """
+        Export Postgres environment variables for the schema.
+
+        This exports the same variables as
+        :meth:`TemporaryDatabase.set_environment` and adds the
+        ``search_path`` to :envvar:`PGOPTIONS` so that new connections
+        use the schema.  Other options in :envvar:`PGOPTIONS` are kept
+        and a ``search_path`` that is already there is replaced.
+
+        """
+        self.database.set_environment()
+        if self.schema_name is not None:
+            options = _SEARCH_PATH_OPTION.sub(
+                '', os.environ.get('PGOPTIONS', '')).split()
+            options.append('-c search_path={0}'.format(self.search_path))
+            os.environ['PGOPTIONS'] = ' '.join(options)
+
+    def capture_queries(self):
+        """
+        Record the statements that run in the schema's database.
+
+        :rtype: QueryCapture
+        :raises RuntimeError: if the schema is in the
+            :func:`shared_database`
+
+        Statements are recorded for the whole database so the schema
+        must be created in a :class:`TemporaryDatabase` that no other
+        test uses while the capture runs.  Only the sequential scans
+        of tables in this schema are reported.
+
+        """
+        return QueryCapture(self.database, schema=self.schema_name)
+
+    def _run_in_transaction(self, function, *args):
+        conn = self.database._connect()
+        try:
+            with conn:
+                with conn.cursor() as cursor:
+                    function(cursor, *args)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _drop(cursor, schema_name):
+        _logger.debug('dropping schema %s', schema_name)
+        cursor.execute('DROP SCHEMA IF EXISTS {0} CASCADE'.format(
+            _quote_ident(schema_name)))
+
+    @staticmethod
+    def _create(cursor, schema_name, template):
+        schema = _quote_ident(schema_name)
+        _logger.debug('creating schema %s from %r', schema_name, template)
+        cursor.execute('CREATE SCHEMA {0}'.format(schema))
+        if template is None:
+            return
+
+        cursor.execute(
+            "SELECT c.relname FROM pg_catalog.pg_class c"
+            "  JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace"
+            " WHERE n.nspname = %s AND c.relkind IN ('r', 'p')"
+            " ORDER BY c.oid", (template,))
+        for table, in cursor.fetchall():
+            cursor.execute('CREATE TABLE {0}.{1} (LIKE {2}.{1} INCLUDING '
+                           'ALL)'.format(schema, _quote_ident(table),
+                                         _quote_ident(template)))
+
+        cursor.execute(
+            "SELECT t.relname, a.attname, s.relname"
+            "  FROM pg_catalog.pg_depend d"
+            "  JOIN pg_catalog.pg_class s"
+            "    ON s.oid = d.objid AND s.relkind = 'S'"
+            "  JOIN pg_catalog.pg_class t ON t.oid = d.refobjid"
+            "  JOIN pg_catalog.pg_attribute a"
+            "    ON a.attrelid = t.oid AND a.attnum = d.refobjsubid"
+            "  JOIN pg_catalog.pg_namespace n ON n.oid = t.relnamespace"
+            " WHERE n.nspname = %s AND d.deptype = 'a'", (template,))
+        for table, column, sequence in cursor.fetchall():
+            table, column = _quote_ident(table), _quote_ident(column)
+            sequence = '{0}.{1}'.format(schema, _quote_ident(sequence))
+            cursor.execute('CREATE SEQUENCE {0} OWNED BY {1}.{2}.{3}'.format(
+                sequence, schema, table, column))
+            cursor.execute(
+                'ALTER TABLE {0}.{1} ALTER COLUMN {2} SET DEFAULT '
+                'nextval(%s::regclass)'.format(schema, table, column),
+                (sequence,))
+
+        cursor.execute('SET LOCAL search_path TO {0}'.format(
+            _quote_ident(template)))
+        cursor.execute(
+            "SELECT t.relname, c.conname,"
+            "       pg_catalog.pg_get_constraintdef(c.oid)"
+            "  FROM pg_catalog.pg_constraint c"
+            "  JOIN pg_catalog.pg_class t ON t.oid = c.conrelid"
+            "  JOIN pg_catalog.pg_namespace n ON n.oid = t.relnamespace"
+            " WHERE n.nspname = %s AND c.contype = 'f'", (template,))
+        foreign_keys = cursor.fetchall()
+        cursor.execute('SET LOCAL search_path TO {0}'.format(schema))
+        for table, constraint, definition in foreign_keys:
+            cursor.execute('ALTER TABLE {0}.{1} ADD CONSTRAINT {2} {3}'.format(
+                schema, _quote_ident(table), _quote_ident(constraint),
+                definition))
+
+
+class QueryCapture(object):
+    """
+    Records the statements that run in a temporary database.
+
+    :param database: the :class:`TemporaryDatabase` to watch
+    :keyword str schema: only report sequential scans of tables in
+        this schema
+
+    :raises RuntimeError: if `database` is the :func:`shared_database`
+
+    The capture compares the statistics that the server keeps before
+    and after the code under test runs.  Statements are counted by the
+    `pg_stat_statements`_ extension which is created in the database
+    when the capture starts.  This requires that the server loads it
+    by including ``pg_stat_statements`` in ``shared_preload_libraries``
+    and that the user is allowed to create it.
+
+    The statistics cover every session that uses the database, so the
+    database must not be used by anything but the code under test
+    while the capture runs.  This is why the shared database cannot
+    be captured.
+
+    **Usage Example**
+
+    .. code-block:: python
+
+       with database.capture_queries() as queries:
+           list_users()
+
+       assert queries.query_count == 1
+       assert 'users' not in queries.sequential_scans
+
+    The statements that the capture runs itself are not recorded.
+    Transaction control statements such as ``BEGIN`` are recorded like
+    any other statement.
+
+    .. _pg_stat_statements: https://www.postgresql.org/docs/current/
+       pgstatstatements.html
+
+    """
+
+    TABLE_STATS_DELAY = 1.0
+    """Seconds that sessions may take to report table statistics.
+
+    Before PostgreSQL 15, the server only publishes the table scans of
+    a session once it has been idle for up to this long, so
+    :attr:`sequential_scans` waits until this long after the capture
+    stopped before reading them.
+
+    """
+
+    IDLE_STATS_DELAY = 10.0
+    """Seconds that an idle session may take to report table statistics.
+
+    PostgreSQL 15 and newer publish the table scans of a session when
+    it becomes idle, but a session that reported its statistics less
+    than a second before only does so after being idle for up to this
+    long.  Sessions that close report them immediately.
+    :attr:`sequential_scans` polls the sessions of the database every
+    :attr:`STATS_POLL_INTERVAL` seconds and reads the scans as soon as
+    every other session has closed or has been idle for this long.
+
+    """
+
+    STATS_POLL_INTERVAL = 0.1
+    """Seconds between checks for sessions that did not report yet."""
+
+    def __init__(self, database, schema=None):
+        super(QueryCapture, self).__init__()
+        if database in list(_shared_databases.values()):
+            raise RuntimeError('cannot capture the queries of the shared '
+                               'database since other tests use it too')
+        self.database = database
+        self.schema = schema
+        self.statements = []
+        """The :class:`Statement` instances recorded by the capture.
+
+        They are ordered by decreasing :attr:`~Statement.total_time`
+        and available once the capture is stopped.
+
+        """
+        self._before = None
+        self._tables = None
+        self._own_queries = frozenset()
+        self._stopped_at = None
+        self._sequential_scans = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def query_count(self):
+        """The number of statements that were run."""
+        return sum(statement.calls for statement in self.statements)
+
+    @property
+    def total_time(self):
+        """The number of seconds that the server spent running them."""
+        return sum(statement.total_time for statement in self.statements)
+
+    @property
+    def sequential_scans(self):
+        """
+        The number of sequential scans of each table.
+
+        This maps table names to the number of times that the table
+        was scanned sequentially while the capture was running.  Tables
+        that were not scanned are omitted.  Tables outside of the
+        *public* schema are qualified with their schema name unless
+        the capture is limited to that schema.
+
+        """
+        if self._sequential_scans is None and self._stopped_at is not None:
+            tables = self._query(self._read_table_scans)
+            self._sequential_scans = dict(
+                (name, scans - self._tables.get(name, 0))
+                for name, scans in tables.items()
+                if scans > self._tables.get(name, 0))
+        return self._sequential_scans or {}
+
+    def start(self):
+        """Start recording statements."""
+        self.statements = []
+        self._stopped_at = None
+        self._sequential_scans = None
+        self._before, self._tables, self._own_queries = self._query(
+            self._start)
+
+    def stop(self):
+        """Stop recording statements and update :attr:`statements`."""
+        after = self._query(self._read_statements)
+        self._stopped_at = time.time()
+        statements = []
+        for query_id, (query, calls, total_time, rows) in after.items():
+            if query_id in self._own_queries:
+                continue
+            previous = self._before.get(query_id, (query, 0, 0.0, 0))
+            if calls > previous[1]:
+                statements.append(Statement(
+                    query, calls - previous[1],
+                    (total_time - previous[2]) / 1000.0, rows - previous[3]))
+        statements.sort(key=lambda statement: statement.total_time,
+                        reverse=True)
+        self.statements = statements
+
+    def _query(self, function):
+        conn = self.database._connect()
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                return function(cursor, conn.server_version)
+        finally:
+            conn.close()
+
+    def _start(self, cursor, server_version):
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_stat_statements')
+        first = self._read_statements(cursor, server_version)
+        tables = self._read_tables(cursor, server_version)
+        before = self._read_statements(cursor, server_version)
+        # nothing else runs yet, so whatever changed was run by the capture
+        own_queries = frozenset(
+            query_id for query_id, row in before.items()
+            if row[1] > first.get(query_id, (None, 0))[1])
+        return before, tables, own_queries
+
+    @staticmethod
+    def _read_statements(cursor, server_version):
+        cursor.execute(
+            "SELECT queryid, min(query), sum(calls)::bigint,"
+            "       sum({0})::float8, sum(rows)::bigint"
+            "  FROM pg_stat_statements"
+            " WHERE dbid = (SELECT oid FROM pg_catalog.pg_database"
+            "                WHERE datname = current_database())"
+            " GROUP BY queryid".format(
+                'total_exec_time' if server_version >= 130000
+                else 'total_time'))
+        return dict((row[0], row[1:]) for row in cursor.fetchall())
+
+    def _read_table_scans(self, cursor, server_version):
+        if server_version >= 150000:
+            self._wait_for_idle_sessions(cursor)
+        else:
+            delay = self._stopped_at + self.TABLE_STATS_DELAY - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        return self._read_tables(cursor, server_version)
+
+    def _wait_for_idle_sessions(self, cursor):
+        cursor.execute('SELECT pg_catalog.pg_stat_force_next_flush()')
+        deadline = time.time() + self.IDLE_STATS_DELAY
+        while True:
+            cursor.execute(
+                "SELECT min(extract(epoch FROM"
+                "           clock_timestamp() - state_change))::float8"
+                "  FROM pg_catalog.pg_stat_activity"
+                " WHERE datname = current_database()"
+                "   AND pid <> pg_catalog.pg_backend_pid()")
+            idle = cursor.fetchone()[0]
+            if idle is None or idle >= self.IDLE_STATS_DELAY:
+                return
+            # sessions that keep running statements never settle
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return
+            time.sleep(min(self.STATS_POLL_INTERVAL,
+                           self.IDLE_STATS_DELAY - idle, remaining))
+
+    def _read_tables(self, cursor, server_version):
+        if server_version >= 150000:
+            cursor.execute('SELECT pg_catalog.pg_stat_clear_snapshot()')
+        cursor.execute('SELECT schemaname, relname, seq_scan'
+                       '  FROM pg_catalog.pg_stat_user_tables')
+        tables = {}
+        for schema, table, scans in cursor.fetchall():
+            if schema == (self.schema or 'public'):
+                tables[table] = scans
+            elif self.schema is None:
+                tables['{0}.{1}'.format(schema, table)] = scans
+        return tables
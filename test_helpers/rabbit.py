@@ -8,7 +8,9 @@ try:
 except ImportError:  # pragma no cover
     import urllib as parse
 
-import requests
+from test_helpers import broker, compat, resources
+
+requests = compat.LazyModule('requests')
 
 
 class RabbitMqFixture(object):
@@ -52,6 +54,7 @@ class RabbitMqFixture(object):
         self._session.headers['Content-Type'] = 'application/json'
         self._session.auth = (user, password)
         self._virtual_host = None
+        self._lease = None
 
     @property
     def virtual_host(self):
@@ -96,17 +99,15 @@ class RabbitMqFixture(object):
         variable to the appropriate URL for connecting to the
         virtual host.
 
-        """
-        self._virtual_host = parse.quote('/' + uuid.uuid4().hex, safe='')
-        self._rabbit_api_request(
-            'PUT', 'vhosts', self.virtual_host,
-        ).raise_for_status()
-        atexit.register(self.remove_virtual_host)
+        The virtual host is leased from the :mod:`fixture broker
+        <test_helpers.broker>` when :envvar:`TEST_HELPERS_BROKER` is set.
 
-        self._rabbit_api_request(
-            'PUT', 'permissions', self.virtual_host, self.user,
-            data={'configure': '.*', 'write': '.*', 'read': '.*'},
-        ).raise_for_status()
+        """
+        client = broker.get_client()
+        if client is not None:
+            self._lease_virtual_host(client)
+        else:
+            self._create_virtual_host()
 
         os.environ['AMQP'] = 'amqp://{0}:{1}@{2}:{3}/{4}'.format(
             self.user, self.password, self.host, self.port,
@@ -117,8 +118,15 @@ class RabbitMqFixture(object):
     def remove_virtual_host(self):
         """Remove the generated virtual host."""
         if self.virtual_host:
-            self._rabbit_api_request('DELETE', 'vhosts', self.virtual_host)
+            if self._lease is not None:
+                client, lease = self._lease
+                client.release(lease)
+                self._lease = None
+            else:
+                self._rabbit_api_request(
+                    'DELETE', 'vhosts', self.virtual_host)
             self._virtual_host = None
+            resources.unregister(self)
 
     def create_binding(self, exchange_name, queue_name, routing_key):
         """
@@ -162,6 +170,38 @@ class RabbitMqFixture(object):
             parse.quote(queue_name, safe=''), 'contents',
         ).raise_for_status()
 
+    def _create_virtual_host(self):
+        self._virtual_host = parse.quote('/' + uuid.uuid4().hex, safe='')
+        resources.register('vhost', self, self._virtual_host)
+        try:
+            self._rabbit_api_request(
+                'PUT', 'vhosts', self.virtual_host,
+            ).raise_for_status()
+        except:
+            resources.unregister(self)
+            raise
+        atexit.register(self.remove_virtual_host)
+
+        self._rabbit_api_request(
+            'PUT', 'permissions', self.virtual_host, self.user,
+            data={'configure': '.*', 'write': '.*', 'read': '.*'},
+        ).raise_for_status()
+
+    def _lease_virtual_host(self, client):
+        lease = client.lease('vhost', {
+            'host': parse.unquote(self.host), 'port': self.port,
+            'mgmt_port': self.mgmt_port, 'user': self._session.auth[0],
+            'password': self._session.auth[1],
+        })
+        try:
+            resources.register('vhost', self, lease.resource['virtual_host'])
+        except:
+            client.release(lease)
+            raise
+        self._virtual_host = lease.resource['virtual_host']
+        self._lease = (client, lease)
+        atexit.register(self.remove_virtual_host)
+
     def _rabbit_api_request(self, method, *path, **kwargs):
         if 'data' in kwargs:
             kwargs['data'] = json.dumps(kwargs['data']).encode('utf-8')
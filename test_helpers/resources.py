@@ -0,0 +1,242 @@
+"""
+==================
+Resource Registry
+==================
+
+The resource registry keeps track of every live resource that the
+test helpers create -- databases, virtual hosts, sockets, IOLoops,
+and active patches -- in a single place.  It serves two purposes:
+
+* enforcing a budget on the number of live resources of each kind
+  so a runaway suite fails fast instead of filling up shared servers
+* detecting resources that a test class created and did not release
+  by the time that it was annihilated
+
+Budgets are configured with :func:`set_budget` or with the
+:envvar:`TEST_HELPERS_RESOURCE_BUDGET` environment variable which
+is a comma-separated list of ``kind=limit`` pairs, for example
+``postgres=4,vhost=2``.  The variable is read when the first
+resource is registered and a malformed value raises a
+:exc:`ValueError` then.  The registry is per-process so budgets
+apply to each test worker separately.
+
+Resources are attributed to the :class:`~test_helpers.bases.BaseTest`
+class whose phase created them.  Resources that are still live after
+the class is annihilated are logged as leaks and included in the
+report written by :func:`write_resource_report`.
+
+"""
+import atexit
+import collections
+import contextlib
+import json
+import logging
+import os
+import threading
+
+_logger = logging.getLogger(__name__)
+_lock = threading.Lock()
+_local = threading.local()
+_live = {}
+_counts = collections.defaultdict(int)
+_peaks = collections.defaultdict(int)
+_leaks = {}
+_budgets = {}
+_budgets_loaded = False
+
+Resource = collections.namedtuple(
+    'Resource', ['kind', 'description', 'owner', 'value'])
+"""A live resource tracked by the registry."""
+
+
+class ResourceBudgetExceeded(RuntimeError):
+    """Raised when registering a resource would exceed its budget."""
+
+
+def set_budget(kind, limit):
+    """
+    Limit the number of live resources of `kind`.
+
+    :param str kind: the kind of resource, for example ``'postgres'``
+    :param int limit: the most live resources allowed or :data:`None`
+        to remove the limit
+
+    """
+    _load_budgets()
+    if limit is None:
+        _budgets.pop(kind, None)
+    else:
+        _budgets[kind] = int(limit)
+
+
+def _load_budgets():
+    """Apply :envvar:`TEST_HELPERS_RESOURCE_BUDGET` when first needed.
+
+    :raises ValueError: if the variable is not a list of ``kind=limit``
+        pairs
+
+    Budgets set with :func:`set_budget` take precedence.
+
+    """
+    global _budgets_loaded
+    if _budgets_loaded:
+        return
+    value = os.environ.get('TEST_HELPERS_RESOURCE_BUDGET', '')
+    budgets = {}
+    for budget in value.split(','):
+        if budget.strip():
+            kind, _, limit = budget.partition('=')
+            try:
+                if not kind.strip():
+                    raise ValueError(kind)
+                budgets[kind.strip()] = int(limit)
+            except ValueError:
+                raise ValueError(
+                    'TEST_HELPERS_RESOURCE_BUDGET must be a comma-separated '
+                    'list of kind=limit pairs, not {0!r}'.format(value))
+    for kind, limit in budgets.items():
+        _budgets.setdefault(kind, limit)
+    _budgets_loaded = True
+
+
+def register(kind, value, description):
+    """
+    Start tracking a live resource.
+
+    :param str kind: the kind of resource.  The helpers use
+        ``'postgres'``, ``'schema'``, ``'mongo'``, ``'vhost'``,
+        ``'ioloop'``, ``'socket'``, and ``'patch'``.
+    :param value: the object that represents the resource.  It is
+        used to find the resource when it is unregistered.
+    :param str description: human readable description of the
+        resource that is used in reports
+    :raises ResourceBudgetExceeded: if the budget for `kind` is
+        already used up
+    :raises ValueError: if :envvar:`TEST_HELPERS_RESOURCE_BUDGET` is
+        malformed
+
+    The resource is attributed to the test class that is currently
+    running in this thread, if any.
+
+    """
+    with _lock:
+        _load_budgets()
+        previous = _live.get(id(value))
+        count = _counts[kind]
+        if previous is not None and previous.kind == kind:
+            count -= 1
+        limit = _budgets.get(kind)
+        if limit is not None and count >= limit:
+            raise ResourceBudgetExceeded(
+                'cannot create {0} {1}: {2} of {3} already live'.format(
+                    kind, description, count, limit))
+        if previous is not None:
+            _counts[previous.kind] -= 1
+        _live[id(value)] = Resource(kind, description, current_owner(), value)
+        _counts[kind] += 1
+        _peaks[kind] = max(_peaks[kind], _counts[kind])
+
+
+def unregister(value):
+    """Stop tracking the resource registered for `value`."""
+    with _lock:
+        resource = _live.pop(id(value), None)
+        if resource is not None:
+            _counts[resource.kind] -= 1
+
+
+def disown(value):
+    """Mark a resource as shared so it is never reported as a leak."""
+    with _lock:
+        resource = _live.get(id(value))
+        if resource is not None:
+            _live[id(value)] = resource._replace(owner=None)
+
+
+def live_resources(kind=None, owner=None):
+    """
+    Return the live resources.
+
+    :param str kind: only return resources of this kind
+    :param str owner: only return resources attributed to this owner
+    :returns: a :class:`list` of :class:`Resource` instances
+
+    """
+    with _lock:
+        return [resource for resource in _live.values()
+                if (kind is None or resource.kind == kind) and
+                (owner is None or resource.owner == owner)]
+
+
+def current_owner():
+    """Return the owner that new resources are attributed to."""
+    return getattr(_local, 'owner', None)
+
+
+@contextlib.contextmanager
+def owned_by(owner):
+    """Attribute the resources registered in this block to `owner`."""
+    previous = current_owner()
+    _local.owner = owner
+    try:
+        yield
+    finally:
+        _local.owner = previous
+
+
+def check_leaks(owner):
+    """
+    Record and log the resources that `owner` failed to release.
+
+    :param str owner: the owner to check, usually the qualified name
+        of a test class
+    :returns: the :class:`list` of leaked :class:`Resource` instances
+
+    Leaked resources are disowned after they are reported so that
+    they are not reported again by later checks.
+
+    """
+    leaked = live_resources(owner=owner)
+    if leaked:
+        _leaks.setdefault(owner, []).extend(
+            {'kind': resource.kind, 'description': resource.description}
+            for resource in leaked)
+        _logger.warning('%s leaked %d resources: %s', owner, len(leaked),
+                        ', '.join('{0} {1}'.format(r.kind, r.description)
+                                  for r in leaked))
+        for resource in leaked:
+            disown(resource.value)
+    return leaked
+
+
+def write_resource_report(path=None):
+    """
+    Write the resource leaks and peak usage as JSON.
+
+    :param str path: the file to write the report to.  This defaults
+        to the :envvar:`TEST_HELPERS_RESOURCE_REPORT` environment
+        variable.
+    :returns: the report as a :class:`dict` or :data:`None` if no
+        report was written
+
+    This is registered with :func:`atexit.register` so the report
+    is written when the process exits if the environment variable
+    is set.
+
+    """
+    path = path or os.environ.get('TEST_HELPERS_RESOURCE_REPORT')
+    if not path:
+        return None
+    report = {
+        'budgets': dict(_budgets),
+        'leaks': dict(_leaks),
+        'live': [{'kind': resource.kind, 'description': resource.description,
+                  'owner': resource.owner}
+                 for resource in live_resources()],
+        'peaks': dict(_peaks),
+    }
+    with open(path, 'w') as report_file:
+        json.dump(report, report_file, indent=2, sort_keys=True)
+    return report
+
+atexit.register(write_resource_report)
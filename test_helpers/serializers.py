@@ -0,0 +1,270 @@
+"""
+===========
+Serializers
+===========
+
+The serializers module contains the encoders and decoders that the
+HTTP testing mixins use to translate between Python objects and
+request or response bodies.  Each serializer exposes the same pair of
+``dumps`` and ``loads`` methods that operate on :class:`bytes` so
+that a body never needs to be decoded to text before it is parsed.
+
+Serializers are registered by media type with
+:func:`register_serializer` and found with :func:`get_serializer`.
+JSON, form-encoded, raw binary, and MessagePack bodies are registered
+by default.  The JSON libraries and the `msgpack`_ library are imported
+when a body is first translated instead of when this module is
+imported.
+
+.. _msgpack: https://pypi.org/project/msgpack/
+
+"""
+import collections
+import importlib
+import re
+
+from test_helpers import compat
+
+msgpack = compat.LazyModule('msgpack')
+
+ContentType = collections.namedtuple('ContentType', ['media_type', 'charset'])
+"""The parsed form of a :mailheader:`Content-Type` header value."""
+
+_MAX_CACHED_CONTENT_TYPES = 512
+_content_types = {}
+_serializers = {}
+_serializer_lookups = {}
+
+
+def parse_content_type(header_value):
+    """
+    Parse a :mailheader:`Content-Type` header value.
+
+    :param str header_value: the header value to parse
+    :returns: a :class:`ContentType` instance.  The media type is
+        lowercased and the charset is :data:`None` if it is not
+        specified.
+
+    Results are memoized per distinct header value since the same
+    handful of values are parsed over and over again in a test run.
+
+    """
+    try:
+        return _content_types[header_value]
+    except KeyError:
+        pass
+
+    media_type, _, params = header_value.partition(';')
+    charset = None
+    for param in re.split('[;,]', params):
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset':
+            charset = value.strip().strip('"')
+
+    if len(_content_types) >= _MAX_CACHED_CONTENT_TYPES:
+        _content_types.clear()
+    parsed = ContentType(media_type.strip().lower(), charset)
+    _content_types[header_value] = parsed
+    return parsed
+
+
+def register_serializer(media_type, serializer):
+    """
+    Register `serializer` for bodies of `media_type`.
+
+    :param str media_type: the media type without parameters, for
+        example ``application/json``
+    :param serializer: an object that implements ``dumps`` and
+        ``loads`` like :class:`JsonSerializer` does
+
+    Structured syntax suffixes are honored when a serializer is
+    looked up so registering ``application/json`` also covers
+    media types such as ``application/vnd.example+json``.
+
+    """
+    _serializers[media_type.lower()] = serializer
+    _serializer_lookups.clear()
+
+
+def get_serializer(media_type):
+    """
+    Find the serializer registered for `media_type`.
+
+    :param str media_type: a lowercased media type as returned
+        by :func:`parse_content_type`
+    :returns: the registered serializer or :data:`None`
+
+    """
+    try:
+        return _serializer_lookups[media_type]
+    except KeyError:
+        pass
+
+    serializer = _serializers.get(media_type)
+    if serializer is None and '+' in media_type:
+        serializer = _serializers.get(
+            'application/' + media_type.rsplit('+', 1)[1])
+    if serializer is None and media_type.endswith('json'):
+        serializer = _serializers.get('application/json')
+
+    _serializer_lookups[media_type] = serializer
+    return serializer
+
+
+class JsonSerializer(object):
+    """
+    Encodes and decodes JSON with the standard library or a faster one.
+
+    :keyword str backend: name of the JSON module to use.  If this
+        is omitted, then the first importable module in
+        :attr:`.BACKENDS` is used.
+
+    By default this uses the standard library :mod:`json` module and
+    produces exactly the bytes that ``json.dumps(value)`` does, encoded
+    as UTF-8.  The ``orjson``, ``ujson``, and ``simplejson`` libraries
+    are considerably faster for large documents and can be selected
+    by name or by listing them in :attr:`.BACKENDS`.  They do not
+    produce the same bytes as the standard library: ``orjson`` and
+    ``ujson`` write compact JSON, and ``orjson`` rejects integers that
+    do not fit in 64 bits, writes ``NaN`` as ``null``, and accepts
+    :class:`~datetime.datetime` values that the standard library
+    rejects.  Only opt in to them when the bodies that your tests send
+    are not affected by these differences.
+
+    **Usage Example**
+
+    .. code-block:: python
+
+       from test_helpers import serializers
+
+       serializer = serializers.JsonSerializer()
+       body = serializer.dumps({'key': 'value'})
+       assert serializer.loads(body) == {'key': 'value'}
+
+       fast_serializer = serializers.JsonSerializer('orjson')
+
+    """
+
+    BACKENDS = ('json',)
+    """JSON modules to try in order of preference.
+
+    Set this to something like ``('orjson', 'ujson', 'json')`` to opt
+    in to the fastest installed library.
+
+    """
+
+    def __init__(self, backend=None):
+        super(JsonSerializer, self).__init__()
+        self._backend_name = backend
+        self._backend = None
+
+    @property
+    def backend(self):
+        """The name of the JSON module in use."""
+        if self._backend is None:
+            self._load_backend()
+        return self._backend.__name__
+
+    def dumps(self, value):
+        """Serialize `value` to UTF-8 encoded JSON :class:`bytes`."""
+        if self._backend is None:
+            self._load_backend()
+        encoded = self._backend.dumps(value, **self._dumps_kwargs)
+        if self._dumps_bytes:
+            return encoded
+        return encoded.encode('utf-8')
+
+    def loads(self, data):
+        """Deserialize JSON from UTF-8 encoded :class:`bytes` or text."""
+        if self._backend is None:
+            self._load_backend()
+        if isinstance(data, bytes) and not self._loads_bytes:
+            data = data.decode('utf-8')
+        return self._backend.loads(data)
+
+    def _load_backend(self):
+        if self._backend_name is None:
+            for name in self.BACKENDS:
+                try:
+                    backend = importlib.import_module(name)
+                    break
+                except ImportError:
+                    pass
+        else:
+            backend = importlib.import_module(self._backend_name)
+        name = backend.__name__
+        self._dumps_bytes = name == 'orjson'
+        self._loads_bytes = name in ('orjson', 'ujson')
+        if name == 'orjson':
+            self._dumps_kwargs = {'option': backend.OPT_NON_STR_KEYS}
+        elif name == 'ujson':
+            self._dumps_kwargs = {'escape_forward_slashes': False}
+        else:
+            self._dumps_kwargs = {}
+        self._backend = backend
+
+
+class FormSerializer(object):
+    """
+    Encodes and decodes ``application/x-www-form-urlencoded`` bodies.
+
+    Encoding accepts anything that :func:`urllib.parse.urlencode`
+    accepts.  Decoding produces a dictionary that maps each name to
+    the list of its values like :func:`urllib.parse.parse_qs`.
+
+    """
+
+    def dumps(self, value):
+        """Serialize `value` to URL-encoded :class:`bytes`."""
+        return compat.urlencode(value, doseq=True).encode('ascii')
+
+    def loads(self, data):
+        """Deserialize URL-encoded :class:`bytes` or text."""
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return compat.parse_qs(data, keep_blank_values=True)
+
+
+class MsgpackSerializer(object):
+    """
+    Encodes and decodes MessagePack bodies.
+
+    This requires the `msgpack`_ library which is imported when a
+    body is first translated.  Binary and text values are kept
+    distinct so :class:`bytes` round-trip as :class:`bytes`.
+
+    """
+
+    def dumps(self, value):
+        """Serialize `value` to MessagePack :class:`bytes`."""
+        return msgpack.packb(value, use_bin_type=True)
+
+    def loads(self, data):
+        """Deserialize MessagePack :class:`bytes`."""
+        return msgpack.unpackb(data, raw=False)
+
+
+class RawSerializer(object):
+    """
+    Passes binary bodies through without copying them.
+
+    Decoding returns a :class:`memoryview` over the body so that
+    large binary responses can be sliced and compared without
+    creating copies of the data.
+
+    """
+
+    def dumps(self, value):
+        """Return `value` as :class:`bytes`."""
+        return bytes(value)
+
+    def loads(self, data):
+        """Return a :class:`memoryview` over `data`."""
+        return memoryview(data)
+
+
+register_serializer('application/json', JsonSerializer())
+register_serializer('application/x-www-form-urlencoded', FormSerializer())
+register_serializer('application/octet-stream', RawSerializer())
+register_serializer('application/msgpack', MsgpackSerializer())
+register_serializer('application/x-msgpack', MsgpackSerializer())
@@ -0,0 +1,34 @@
+"""Tests that use ``async def`` and require Python 3.5 or newer."""
+from __future__ import absolute_import
+
+from tornado import web
+
+from test_helpers.mixins import tornado
+
+
+class MethodRequestHandler(web.RequestHandler):
+
+    def on_request(self):
+        self.application.methods.append(self.request.method)
+
+    get = on_request
+    post = on_request
+
+
+class WhenTornadoTestExecutesNativeCoroutine(tornado.TornadoTest):
+    tornado_application = web.Application([('/', MethodRequestHandler)])
+    tornado_application.methods = []
+
+    @classmethod
+    async def execute(cls):
+        cls.response = await cls.fetch('GET', '/')
+        cls.second_response = await cls.fetch('POST', '/', body='body')
+
+    def should_run_execute_to_completion(self):
+        self.assertEqual(self.second_response.code, 200)
+
+    def should_return_response(self):
+        self.assertEqual(self.response.code, 200)
+
+    def should_issue_requests_in_order(self):
+        self.assertEqual(self.tornado_application.methods, ['GET', 'POST'])
@@ -1,9 +1,13 @@
 from __future__ import absolute_import
 
 import os
+import sys
+import threading
 import uuid
 
-from test_helpers import bases, mixins
+from test_helpers import bases, mixins, resources
+from test_helpers.compat import unittest
+from test_helpers.mixins import patch_mixin
 
 
 #########
@@ -29,6 +33,397 @@ class WhenTestingPatchingMixin(mixins.PatchMixin, bases.BaseTest):
         self.assertEqual(self.result, 'foobar')
 
 
+def function_under_test():
+    return 'original'
+
+
+def other_function_under_test():
+    return 'original'
+
+
+class WhenDeclaringPatches(mixins.PatchMixin, bases.BaseTest):
+
+    patch_prefix = 'tests.integration.test_mixins'
+    patches = {
+        'function_under_test': {'return_value': 'first'},
+        'other_function_under_test': None,
+    }
+
+    @classmethod
+    def execute(cls):
+        cls.result = function_under_test()
+        cls.owned_patches = resources.live_resources(
+            'patch', owner=bases._class_name(cls))
+
+    def should_apply_patches_before_configure(self):
+        self.assertEqual(self.result, 'first')
+
+    def should_attribute_patches_to_class(self):
+        self.assertEqual(len(self.owned_patches), 2)
+
+    def should_expose_patches(self):
+        self.assertIs(self.patched['other_function_under_test'],
+                      other_function_under_test)
+
+    def should_cache_resolved_module(self):
+        self.assertIn('tests.integration.test_mixins',
+                      patch_mixin._resolved_targets)
+
+
+class WhenMixingPatchesIntoTestCase(mixins.PatchMixin, unittest.TestCase):
+
+    patch_prefix = 'tests.integration.test_mixins'
+    patches = {'function_under_test': {'return_value': 'declared'}}
+
+    @classmethod
+    def setUpClass(cls):
+        super(WhenMixingPatchesIntoTestCase, cls).setUpClass()
+        cls.mocked = cls.create_patch('other_function_under_test',
+                                      return_value='created')
+
+    @classmethod
+    def tearDownClass(cls):
+        super(WhenMixingPatchesIntoTestCase, cls).tearDownClass()
+        if function_under_test() != 'original':
+            raise AssertionError('declared patch was not stopped')
+        if other_function_under_test() != 'original':
+            raise AssertionError('created patch was not stopped')
+
+    def should_apply_declared_patches(self):
+        self.assertEqual(function_under_test(), 'declared')
+
+    def should_apply_created_patches(self):
+        self.assertEqual(other_function_under_test(), 'created')
+
+
+class WhenCreatingPatchesFails(mixins.PatchMixin, bases.BaseTest):
+
+    patch_prefix = 'tests.integration.test_mixins'
+
+    @classmethod
+    def execute(cls):
+        try:
+            cls.create_patches({
+                'function_under_test': None,
+                'missing_function': None,
+            })
+        except AttributeError as error:
+            cls.exception = error
+
+    def should_raise_error(self):
+        self.assertIsInstance(self.exception, AttributeError)
+
+    def should_stop_applied_patches(self):
+        self.assertEqual(function_under_test(), 'original')
+
+    def should_not_track_stopped_patches(self):
+        self.assertEqual(self._active_patches, [])
+
+
+class Client(object):
+
+    def __init__(self, host):
+        self.host = host
+
+    def get(self, path, params=None):
+        return path
+
+    @staticmethod
+    def build(host):
+        return Client(host)
+
+
+class _PatchesClientAndMethod(mixins.PatchMixin, bases.BaseTest):
+
+    patch_prefix = 'tests.integration.test_mixins'
+
+    @classmethod
+    def configure(cls):
+        super(_PatchesClientAndMethod, cls).configure()
+        cls.create_patch('Client')
+        cls.create_patch('Client.get')
+
+
+class _PatchesMethod(mixins.PatchMixin, bases.BaseTest):
+
+    patch_prefix = 'tests.integration.test_mixins'
+
+    @classmethod
+    def execute(cls):
+        cls.create_patch('Client.get', return_value='mocked')
+        cls.result = Client('localhost').get('/')
+
+
+class WhenPatchingAttributeOfPreviouslyPatchedClass(bases.BaseTest):
+
+    @classmethod
+    def execute(cls):
+        _PatchesClientAndMethod.setUpClass()
+        _PatchesClientAndMethod.tearDownClass()
+        _PatchesMethod.setUpClass()
+        _PatchesMethod.tearDownClass()
+
+    def should_patch_current_class(self):
+        self.assertEqual(_PatchesMethod.result, 'mocked')
+
+    def should_restore_class(self):
+        self.assertEqual(Client('localhost').get('/'), '/')
+
+
+class WhenAutospeccingClass(mixins.PatchMixin, bases.BaseTest):
+
+    patch_prefix = 'tests.integration.test_mixins'
+
+    @classmethod
+    def execute(cls):
+        cls.original_class = Client
+        cls.client_class = cls.create_patch('Client', autospec=True)
+        cls.client = Client('localhost')
+        cls.client.get('/', params={'a': 1})
+
+    def should_return_autospecced_instance(self):
+        self.assertIsInstance(self.client, self.original_class)
+
+    def should_record_calls(self):
+        self.client.get.assert_called_once_with('/', params={'a': 1})
+
+    def should_check_method_signature(self):
+        with self.assertRaises(TypeError):
+            self.client.get()
+
+    def should_check_static_method_signature(self):
+        with self.assertRaises(TypeError):
+            self.client_class.build()
+
+    def should_check_constructor_signature(self):
+        with self.assertRaises(TypeError):
+            self.client_class()
+
+    def should_reject_unknown_attributes(self):
+        with self.assertRaises(AttributeError):
+            self.client.post
+
+    def should_cache_introspected_class(self):
+        self.assertIs(
+            patch_mixin._autospec_shadows[id(self.original_class)][0],
+            self.original_class)
+
+
+class WhenAutospeccedClassIsReplaced(bases.BaseTest):
+
+    @classmethod
+    def execute(cls):
+        first = type('Replaced', (object,), {'get': lambda self: None})
+        cls.first_shadow = patch_mixin._autospec_shadow(first)
+        cls.cached_shadow = patch_mixin._autospec_shadow(first)
+        second = type('Replaced', (object,), {'put': lambda self: None})
+        cls.second_shadow = patch_mixin._autospec_shadow(second)
+
+    def should_reuse_shadow_for_same_class(self):
+        self.assertIs(self.cached_shadow, self.first_shadow)
+
+    def should_introspect_new_class(self):
+        self.assertTrue(hasattr(self.second_shadow, 'put'))
+
+
+class WhenStubbingFunction(mixins.PatchMixin, bases.BaseTest):
+
+    patch_prefix = 'tests.integration.test_mixins'
+
+    @classmethod
+    def execute(cls):
+        cls.stub = cls.create_stub('function_under_test', return_value=42,
+                                   history=2)
+        cls.results = [function_under_test(index) for index in range(1000)]
+
+    def should_return_fixed_value(self):
+        self.assertEqual(set(self.results), {42})
+
+    def should_count_calls(self):
+        self.assertEqual(self.stub.call_count, 1000)
+
+    def should_keep_bounded_history(self):
+        self.assertEqual(list(self.stub.calls), [((998,), {}), ((999,), {})])
+
+    def should_assert_last_call(self):
+        self.stub.assert_called_with(999)
+
+    def should_fail_assertion_for_other_call(self):
+        with self.assertRaises(AssertionError):
+            self.stub.assert_called_with(1)
+
+    def should_not_allow_arbitrary_attributes(self):
+        with self.assertRaises(AttributeError):
+            self.stub.foo = 1
+
+
+class WhenStubbingWithSideEffect(mixins.PatchMixin, bases.BaseTest):
+
+    patch_prefix = 'tests.integration.test_mixins'
+
+    @classmethod
+    def execute(cls):
+        cls.stub = cls.create_stub('function_under_test',
+                                   side_effect=lambda value: value * 2)
+        cls.error_stub = cls.create_stub('other_function_under_test',
+                                         side_effect=ValueError)
+        cls.result = function_under_test(21)
+        try:
+            other_function_under_test()
+        except ValueError as error:
+            cls.exception = error
+
+    def should_return_side_effect_result(self):
+        self.assertEqual(self.result, 42)
+
+    def should_raise_side_effect_exception(self):
+        self.assertIsInstance(self.exception, ValueError)
+
+    def should_not_record_calls_by_default(self):
+        self.assertIsNone(self.stub.calls)
+
+    def should_keep_last_call_without_history(self):
+        self.stub.assert_called_with(21)
+
+    def should_fail_assertion_for_other_call_without_history(self):
+        with self.assertRaises(AssertionError):
+            self.stub.assert_called_with(1)
+
+    def should_still_count_calls(self):
+        self.assertTrue(self.error_stub.called)
+
+
+class WhenPatchingClassAttribute(mixins.PatchMixin, bases.BaseTest):
+
+    @classmethod
+    def execute(cls):
+        cls.create_patch(
+            'test_helpers.mixins.patch_mixin.PatchMixin.patch_prefix',
+            new='patched')
+
+    def should_patch_attribute(self):
+        self.assertEqual(mixins.PatchMixin.patch_prefix, 'patched')
+
+
+class WhenPatchingLocally(mixins.PatchMixin, bases.BaseTest):
+
+    patch_prefix = 'tests.integration.test_mixins'
+    patch_locally = True
+
+    @classmethod
+    def configure(cls):
+        super(WhenPatchingLocally, cls).configure()
+        cls.original_get = Client.__dict__['get']
+        cls.seen_by_thread = {}
+
+    @classmethod
+    def execute(cls):
+        cls.mocked = cls.create_patch('function_under_test',
+                                      return_value='patched')
+        cls.mocked_get = cls.create_patch('Client.get', return_value='mocked')
+        cls.result = function_under_test()
+        cls.client_result = Client('localhost').get('/')
+
+        def use_other_patch():
+            cls.seen_by_thread['before'] = function_under_test()
+            cls.seen_by_thread['get'] = Client('localhost').get('/')
+            patcher = patch_mixin._LocalPatch(
+                sys.modules[__name__], 'function_under_test',
+                return_value='other')
+            patcher.start()
+            cls.seen_by_thread['patched'] = function_under_test()
+            patcher.stop()
+
+        thread = threading.Thread(target=use_other_patch)
+        thread.start()
+        thread.join()
+        cls.result_after_thread = function_under_test()
+
+    def should_use_patch_in_current_context(self):
+        self.assertEqual(self.result, 'patched')
+        self.assertEqual(self.mocked.call_count, 2)
+
+    def should_patch_methods(self):
+        self.assertEqual(self.client_result, 'mocked')
+
+    def should_use_original_in_other_threads(self):
+        self.assertEqual(self.seen_by_thread['before'], 'original')
+        self.assertEqual(self.seen_by_thread['get'], '/')
+
+    def should_isolate_concurrent_patches(self):
+        self.assertEqual(self.seen_by_thread['patched'], 'other')
+        self.assertEqual(self.result_after_thread, 'patched')
+
+    @classmethod
+    def tearDownClass(cls):
+        super(WhenPatchingLocally, cls).tearDownClass()
+        if isinstance(globals()['function_under_test'],
+                      patch_mixin._Dispatcher):
+            raise AssertionError('dispatcher was not removed')
+        if Client.__dict__['get'] is not cls.original_get:
+            raise AssertionError('method was not restored')
+
+
+class ClientError(Exception):
+    pass
+
+
+class WhenPatchingClassLocally(mixins.PatchMixin, bases.BaseTest):
+
+    patch_prefix = 'tests.integration.test_mixins'
+    patch_locally = True
+
+    @classmethod
+    def execute(cls):
+        cls.errors = {}
+        for target in ('Client', 'ClientError'):
+            try:
+                cls.create_patch(target)
+            except TypeError as error:
+                cls.errors[target] = error
+
+    def should_reject_class_target(self):
+        self.assertIn('Client', self.errors)
+
+    def should_reject_exception_target(self):
+        self.assertIn('ClientError', self.errors)
+
+    def should_leave_classes_in_place(self):
+        self.assertIsInstance(Client('localhost'), Client)
+        self.assertTrue(issubclass(ClientError, Exception))
+        self.assertEqual(self._active_patches, [])
+
+
+LIMIT = 10
+SETTINGS = {'a': 1}
+
+
+class WhenPatchingValueLocally(mixins.PatchMixin, bases.BaseTest):
+
+    patch_prefix = 'tests.integration.test_mixins'
+    patch_locally = True
+
+    @classmethod
+    def execute(cls):
+        cls.errors = {}
+        for target in ('LIMIT', 'SETTINGS'):
+            try:
+                cls.create_patch(target, new=0)
+            except TypeError as error:
+                cls.errors[target] = error
+
+    def should_reject_number_target(self):
+        self.assertIn('LIMIT', self.errors)
+
+    def should_reject_container_target(self):
+        self.assertIn('SETTINGS', self.errors)
+
+    def should_leave_values_in_place(self):
+        self.assertGreater(LIMIT, 5)
+        self.assertEqual(SETTINGS['a'], 1)
+        self.assertEqual(self._active_patches, [])
+
+
 #########
 #
 # mixins.EnvironmentMixin
@@ -62,3 +457,51 @@ class WhenUsingEnvironmentMixin(mixins.EnvironmentMixin, bases.BaseTest):
             raise AssertionError('variable not removed from environment')
         if 'PATH' not in os.environ or os.environ['PATH'] != cls.saved_path:
             raise AssertionError('variable not restored to environment')
+
+
+class WhenUsingEnvironmentOverlay(mixins.EnvironmentMixin, bases.BaseTest):
+
+    environment_overlay = True
+
+    @classmethod
+    def configure(cls):
+        super(WhenUsingEnvironmentOverlay, cls).configure()
+        cls.var_name = uuid.uuid4().hex
+        cls.saved_path = os.environ['PATH']
+        cls.seen_by_thread = {}
+
+    @classmethod
+    def execute(cls):
+        cls.set_environment_variable(cls.var_name, 'BAR')
+        cls.unset_environment_variable('PATH')
+
+        def read_environment():
+            cls.seen_by_thread['var'] = os.getenv(cls.var_name)
+            cls.seen_by_thread['PATH'] = os.environ.get('PATH')
+
+        thread = threading.Thread(target=read_environment)
+        thread.start()
+        thread.join()
+
+    def should_set_environment_variable(self):
+        self.assertEqual(os.getenv(self.var_name), 'BAR')
+
+    def should_clear_environment_variable(self):
+        self.assertNotIn('PATH', os.environ)
+        self.assertNotIn('PATH', dict(os.environ))
+
+    def should_not_change_other_threads(self):
+        self.assertEqual(self.seen_by_thread,
+                         {'var': None, 'PATH': self.saved_path})
+
+    def should_not_change_process_environment(self):
+        self.assertNotIn(self.var_name, os.environ.environ)
+        self.assertEqual(os.environ.environ['PATH'], self.saved_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        super(WhenUsingEnvironmentOverlay, cls).tearDownClass()
+        if cls.var_name in os.environ:
+            raise AssertionError('variable not removed from overlay')
+        if os.environ.get('PATH') != cls.saved_path:
+            raise AssertionError('variable not restored to overlay')
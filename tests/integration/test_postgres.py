@@ -5,6 +5,7 @@ import os
 import psycopg2
 
 from test_helpers import bases, mixins, postgres
+from test_helpers.mixins import postgres as postgres_mixins
 
 
 class WhenCreatingTemporaryDatabase(bases.BaseTest):
@@ -137,3 +138,175 @@ class WhenCreatingTemporaryDatabaseAndExportingEnv(
             os.environ['PGDATABASE'],
             self.database.connection_parameters['database'],
         )
+
+
+class WhenCloningTemporarySchemas(bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(WhenCloningTemporarySchemas, cls).configure()
+        cls.database = postgres.TemporaryDatabase(
+            host='localhost', user='postgres', password=None)
+        cls.database.create()
+        cls.run_sql(cls.database.connection_parameters, [
+            'CREATE SCHEMA template',
+            'CREATE TABLE template.accounts (id SERIAL PRIMARY KEY)',
+            'CREATE TABLE template.users ('
+            '  id SERIAL PRIMARY KEY,'
+            '  account_id INTEGER NOT NULL REFERENCES template.accounts(id))',
+        ])
+        cls.schemas = [postgres.TemporarySchema(database=cls.database),
+                       postgres.TemporarySchema(database=cls.database)]
+
+    @classmethod
+    def execute(cls):
+        cls.inserted = []
+        for schema in cls.schemas:
+            schema.create(template='template')
+            cls.inserted.append(cls.run_sql(schema.connection_parameters, [
+                'INSERT INTO accounts DEFAULT VALUES RETURNING id',
+                'INSERT INTO users (account_id) VALUES (1) RETURNING id',
+                'INSERT INTO users (account_id) VALUES (1) RETURNING id',
+            ]))
+        try:
+            cls.run_sql(cls.schemas[0].connection_parameters, [
+                'INSERT INTO users (account_id) VALUES (2)'])
+        except psycopg2.IntegrityError as error:
+            cls.integrity_error = error
+        else:
+            cls.integrity_error = None
+
+    @classmethod
+    def annihilate(cls):
+        for schema in getattr(cls, 'schemas', []):
+            schema.drop()
+        cls.database.drop()
+        if cls.database in postgres._temporary_databases:
+            postgres._temporary_databases.remove(cls.database)
+        super(WhenCloningTemporarySchemas, cls).annihilate()
+
+    @staticmethod
+    def run_sql(connection_parameters, statements):
+        conn = psycopg2.connect(**connection_parameters)
+        try:
+            with conn:
+                with conn.cursor() as cursor:
+                    results = []
+                    for statement in statements:
+                        cursor.execute(statement)
+                        if cursor.description is not None:
+                            results.append(cursor.fetchone()[0])
+                    return results
+        finally:
+            conn.close()
+
+    def should_start_each_schema_at_first_serial_value(self):
+        self.assertEqual(self.inserted, [[1, 1, 2], [1, 1, 2]])
+
+    def should_leave_template_empty(self):
+        self.assertEqual(
+            self.run_sql(self.database.connection_parameters, [
+                'SELECT count(*) FROM template.users']), [0])
+
+    def should_enforce_foreign_keys_within_schema(self):
+        self.assertIsInstance(self.integrity_error, psycopg2.IntegrityError)
+
+
+class WhenCapturingQueriesOfNPlusOneLoop(postgres_mixins.QueryCaptureMixin,
+                                         bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(WhenCapturingQueriesOfNPlusOneLoop, cls).configure()
+        cls.database = postgres.TemporaryDatabase(
+            host='localhost', user='postgres', password=None)
+        cls.database.create()
+        cls.conn = psycopg2.connect(**cls.database.connection_parameters)
+        cls.conn.autocommit = True
+        with cls.conn.cursor() as cursor:
+            cursor.execute('CREATE TABLE accounts (id SERIAL PRIMARY KEY)')
+            cursor.execute('CREATE TABLE users (id SERIAL PRIMARY KEY,'
+                           '                    account_id INTEGER)')
+            for _ in range(3):
+                cursor.execute('INSERT INTO accounts DEFAULT VALUES'
+                               ' RETURNING id')
+                cursor.execute('INSERT INTO users (account_id) VALUES (%s)',
+                               cursor.fetchone())
+        cls.capture_database = cls.database
+
+    @classmethod
+    def execute(cls):
+        with cls.conn.cursor() as cursor:
+            cursor.execute('SELECT id FROM accounts')
+            for account_id, in cursor.fetchall():
+                cursor.execute(
+                    'SELECT id FROM users WHERE account_id = %s',
+                    (account_id,))
+
+    @classmethod
+    def annihilate(cls):
+        if getattr(cls, 'conn', None) is not None:
+            cls.conn.close()
+        cls.database.drop()
+        if cls.database in postgres._temporary_databases:
+            postgres._temporary_databases.remove(cls.database)
+        super(WhenCapturingQueriesOfNPlusOneLoop, cls).annihilate()
+
+    def should_count_query_per_account(self):
+        self.assert_query_count(4)
+
+    def should_group_repeated_statement(self):
+        self.assertEqual(
+            [(statement.query, statement.calls)
+             for statement in self.queries.statements
+             if 'users' in statement.query],
+            [('SELECT id FROM users WHERE account_id = $1', 3)])
+
+    def should_report_sequential_scans_of_users(self):
+        self.assertEqual(self.queries.sequential_scans.get('users'), 3)
+
+    def should_not_record_capture_statements(self):
+        for statement in self.queries.statements:
+            self.assertNotIn('pg_stat', statement.query)
+
+
+class WhenCapturingSequentialScanOfOpenSession(
+        postgres_mixins.QueryCaptureMixin, bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(WhenCapturingSequentialScanOfOpenSession, cls).configure()
+        cls.database = postgres.TemporaryDatabase(
+            host='localhost', user='postgres', password=None)
+        cls.database.create()
+        cls.conn = psycopg2.connect(**cls.database.connection_parameters)
+        cls.conn.autocommit = True
+        with cls.conn.cursor() as cursor:
+            cursor.execute('CREATE TABLE users (id SERIAL PRIMARY KEY)')
+            cursor.execute('INSERT INTO users DEFAULT VALUES')
+            cursor.execute('SET enable_indexscan = off')
+            cursor.execute('SET enable_bitmapscan = off')
+        cls.capture_database = cls.database
+
+    @classmethod
+    def execute(cls):
+        # the session reported its statistics just before, so it only
+        # reports this scan after being idle for a while
+        with cls.conn.cursor() as cursor:
+            cursor.execute('SELECT id FROM users WHERE id = 1')
+
+    @classmethod
+    def annihilate(cls):
+        if getattr(cls, 'conn', None) is not None:
+            cls.conn.close()
+        cls.database.drop()
+        if cls.database in postgres._temporary_databases:
+            postgres._temporary_databases.remove(cls.database)
+        super(WhenCapturingSequentialScanOfOpenSession, cls).annihilate()
+
+    def should_report_sequential_scan(self):
+        self.assertEqual(self.queries.sequential_scans, {'users': 1})
+
+    def should_fail_sequential_scan_assertion(self):
+        with self.assertRaises(AssertionError):
+            self.assert_no_sequential_scans('users')
@@ -1,6 +1,14 @@
 from __future__ import absolute_import
 
-from tornado import web
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import msgpack
+from tornado import gen, httpclient, web
 
 from test_helpers import bases, mixins
 from test_helpers.mixins import tornado
@@ -21,11 +29,39 @@ class RecordingRequestHandler(web.RequestHandler):
     patch = on_request
 
 
+class StreamingRequestHandler(web.RequestHandler):
+
+    RECORD_COUNT = 1000
+
+    @gen.coroutine
+    def get(self):
+        status = self.get_argument('status', None)
+        if status:
+            self.set_status(int(status))
+            self.write(json.dumps({'error': 'unavailable'}))
+            return
+        for index in range(self.RECORD_COUNT):
+            self.write(json.dumps({'index': index}) + '\n')
+            if index % 100 == 0:
+                yield self.flush()
+        if self.get_argument('unterminated', None):
+            self.write(json.dumps({'index': self.RECORD_COUNT}))
+
+
+class SlowRequestHandler(web.RequestHandler):
+
+    @gen.coroutine
+    def get(self):
+        yield gen.sleep(0.5)
+
+
 class Recorder(web.Application):
 
     def __init__(self):
         super(Recorder, self).__init__(handlers=[
             ('/', RecordingRequestHandler),
+            ('/slow', SlowRequestHandler),
+            ('/stream', StreamingRequestHandler),
         ])
         self.requests = []
 
@@ -33,20 +69,24 @@ class Recorder(web.Application):
         self.requests.append(request)
 
 
-class _TornadoMixinTestCase(mixins.PatchMixin, bases.BaseTest):
+class _TornadoServerTestCase(mixins.PatchMixin, bases.BaseTest):
+    transport = None
 
     @classmethod
     def configure(cls):
-        super(_TornadoMixinTestCase, cls).configure()
+        super(_TornadoServerTestCase, cls).configure()
         cls.application = Recorder()
         cls.test_instance = tornado.TornadoMixin
-        cls.test_instance.start_tornado(cls.application)
+        cls.test_instance.start_tornado(cls.application, cls.transport)
 
     @classmethod
     def annihilate(cls):
-        super(_TornadoMixinTestCase, cls).annihilate()
+        super(_TornadoServerTestCase, cls).annihilate()
         cls.test_instance.stop_tornado()
 
+
+class _TornadoMixinTestCase(_TornadoServerTestCase):
+
     @property
     def request(self):
         return self.application.requests[0]
@@ -153,3 +193,647 @@ class WhenTornadoMixinRequestsHead(_TornadoMixinTestCase):
 
     def should_request_appropriate_resource(self):
         self.assertEqual(self.request.path, '/')
+
+
+class WhenTornadoMixinPostsOverUnixSocket(WhenTornadoMixinPosts):
+    transport = 'unix'
+
+    def should_not_bind_tcp_port(self):
+        self.assertEqual(self.test_instance.url_root, 'http://localhost')
+
+
+class WhenTornadoMixinStopsAfterUsingUnixSocket(_TornadoMixinTestCase):
+    transport = 'unix'
+
+    @classmethod
+    def execute(cls):
+        cls.test_instance.get('/')
+        cls.socket_path = cls.test_instance._unix_socket_path
+        cls.test_instance.stop_tornado()
+        cls.test_instance.start_tornado(cls.application)
+
+    def should_remove_socket_file(self):
+        self.assertFalse(os.path.exists(self.socket_path))
+
+
+class WhenTornadoMixinPostsInMemory(WhenTornadoMixinPosts):
+    transport = 'memory'
+
+    def should_use_in_memory_client(self):
+        self.assertIsInstance(
+            self.test_instance.client, tornado._InMemoryHTTPClient)
+
+
+class WhenTornadoMixinGetsMissingResourceInMemory(_TornadoServerTestCase):
+    transport = 'memory'
+
+    @classmethod
+    def execute(cls):
+        cls.response = cls.test_instance.get('/missing?query=1')
+
+    def should_not_record_request(self):
+        self.assertEqual(len(self.application.requests), 0)
+
+    def should_return_error_response(self):
+        self.assertEqual(self.response.code, 404)
+
+    def should_return_response_body(self):
+        self.assertIn(b'Not Found', self.response.body)
+
+
+class WhenTornadoMixinStreamsResponse(_TornadoServerTestCase):
+
+    @classmethod
+    def execute(cls):
+        cls.consumer = tornado.DigestConsumer()
+        cls.response = cls.test_instance.stream('GET', '/stream', cls.consumer)
+
+    @property
+    def expected_body(self):
+        return ''.join(
+            json.dumps({'index': index}) + '\n'
+            for index in range(StreamingRequestHandler.RECORD_COUNT)
+        ).encode('utf-8')
+
+    def should_respond_successfully(self):
+        self.assertEqual(self.response.code, 200)
+
+    def should_not_buffer_body(self):
+        self.assertEqual(self.response.body, b'')
+
+    def should_pass_every_byte_to_consumer(self):
+        self.assertEqual(self.consumer.size, len(self.expected_body))
+
+    def should_calculate_digest(self):
+        self.assertEqual(self.consumer.hexdigest(),
+                         hashlib.sha256(self.expected_body).hexdigest())
+
+
+class WhenTornadoMixinStreamsResponseInMemory(
+        WhenTornadoMixinStreamsResponse):
+    transport = 'memory'
+
+    def should_deliver_flushed_chunks(self):
+        self.assertGreater(self.consumer.chunk_count, 1)
+
+
+class WhenTornadoMixinStreamsJsonLines(_TornadoServerTestCase):
+
+    @classmethod
+    def execute(cls):
+        cls.records = []
+        cls.consumer = tornado.JsonLinesConsumer(cls.records.append)
+        cls.response = cls.test_instance.stream('GET', '/stream', cls.consumer)
+
+    def should_respond_successfully(self):
+        self.assertEqual(self.response.code, 200)
+
+    def should_decode_every_record(self):
+        self.assertEqual(
+            self.consumer.record_count, StreamingRequestHandler.RECORD_COUNT)
+
+    def should_decode_records_in_order(self):
+        self.assertEqual(
+            [record['index'] for record in self.records],
+            list(range(StreamingRequestHandler.RECORD_COUNT)))
+
+
+class WhenTornadoMixinStreamsUnterminatedJsonLines(_TornadoServerTestCase):
+
+    @classmethod
+    def execute(cls):
+        cls.records = []
+        cls.consumer = tornado.JsonLinesConsumer(cls.records.append)
+        cls.response = cls.test_instance.stream(
+            'GET', '/stream?unterminated=1', cls.consumer)
+
+    def should_respond_successfully(self):
+        self.assertEqual(self.response.code, 200)
+
+    def should_decode_final_record(self):
+        self.assertEqual(self.records[-1],
+                         {'index': StreamingRequestHandler.RECORD_COUNT})
+
+
+class WhenTornadoMixinStreamsErrorResponse(_TornadoServerTestCase):
+
+    @classmethod
+    def execute(cls):
+        cls.records = []
+        cls.consumer = tornado.JsonLinesConsumer(cls.records.append)
+        try:
+            cls.test_instance.stream('GET', '/stream?status=503',
+                                     cls.consumer)
+        except httpclient.HTTPError as error:
+            cls.error = error
+        else:
+            cls.error = None
+
+    def should_raise_error_status(self):
+        self.assertEqual(self.error.code, 503)
+
+    def should_not_close_consumer(self):
+        self.assertEqual(self.records, [])
+
+
+class WhenTornadoMixinStreamsClientError(_TornadoServerTestCase):
+
+    @classmethod
+    def execute(cls):
+        cls.consumer = tornado.DigestConsumer()
+        try:
+            cls.test_instance.stream('GET', '/stream?status=404',
+                                     cls.consumer)
+        except httpclient.HTTPError as error:
+            cls.error = error
+        else:
+            cls.error = None
+
+    def should_raise_error_status(self):
+        self.assertEqual(self.error.code, 404)
+
+
+class WhenTornadoMixinRequestTimesOut(_TornadoServerTestCase):
+
+    @classmethod
+    def configure(cls):
+        super(WhenTornadoMixinRequestTimesOut, cls).configure()
+        cls.create_patch(
+            'test_helpers.mixins.tornado.TornadoMixin.request_timeout',
+            new=0.05)
+
+    @classmethod
+    def execute(cls):
+        cls.exception = None
+        try:
+            cls.test_instance.get('/slow')
+        except AssertionError as error:
+            cls.exception = error
+
+    def should_not_record_request(self):
+        self.assertEqual(len(self.application.requests), 0)
+
+    def should_fail_assertion(self):
+        self.assertIsNotNone(self.exception)
+
+
+class WhenTornadoTestExecutesCoroutine(tornado.TornadoTest):
+    tornado_application = Recorder()
+
+    @classmethod
+    @gen.coroutine
+    def execute(cls):
+        cls.responses = yield [cls.fetch('GET', '/'),
+                               cls.fetch('POST', '/', body='body')]
+
+    def should_run_execute_to_completion(self):
+        self.assertEqual(len(self.responses), 2)
+
+    def should_issue_concurrent_requests(self):
+        self.assertEqual(
+            sorted(request.method
+                   for request in self.tornado_application.requests),
+            ['GET', 'POST'])
+
+    def should_return_responses(self):
+        self.assertEqual([response.code for response in self.responses],
+                         [200, 200])
+
+
+if sys.version_info >= (3, 5):
+    from tests.integration.native_coroutines import (  # noqa: F401
+        WhenTornadoTestExecutesNativeCoroutine)
+
+
+class JsonRequestHandler(web.RequestHandler):
+
+    def post(self):
+        self.write({'received': json.loads(self.request.body.decode())})
+
+
+class WhenJsonTornadoTestFetchesFromCoroutine(tornado.JsonMixin,
+                                              tornado.TornadoTest):
+    tornado_application = web.Application([('/', JsonRequestHandler)])
+
+    @classmethod
+    @gen.coroutine
+    def execute(cls):
+        cls.response = yield cls.fetch('POST', '/', body={'key': 'value'})
+
+    def should_return_ok(self):
+        self.assertEqual(self.response.code, 200)
+
+    def should_decode_json_response(self):
+        self.assertEqual(self.response.json, {'received': {'key': 'value'}})
+
+
+class MsgpackRequestHandler(web.RequestHandler):
+
+    def post(self):
+        self.set_header('Content-Type', 'application/msgpack')
+        self.write(msgpack.packb(
+            {'received': msgpack.unpackb(self.request.body, raw=False),
+             'content_type': self.request.headers['Content-Type']},
+            use_bin_type=True))
+
+
+class BinaryRequestHandler(web.RequestHandler):
+
+    def get(self):
+        self.set_header('Content-Type', 'application/octet-stream')
+        self.write(b'\x00\x01\x02\x03')
+
+
+class WhenMsgpackTornadoTestPostsData(tornado.MsgpackMixin,
+                                      tornado.TornadoTest):
+    tornado_application = web.Application([('/', MsgpackRequestHandler)])
+
+    @classmethod
+    def execute(cls):
+        cls.response = cls.post('/', {'key': b'value'})
+
+    def should_return_ok(self):
+        self.assertEqual(self.response.code, 200)
+
+    def should_send_msgpack_content_type(self):
+        self.assertEqual(
+            self.response.data['content_type'], 'application/msgpack')
+
+    def should_round_trip_data(self):
+        self.assertEqual(self.response.data['received'], {'key': b'value'})
+
+
+class WhenCodecTornadoTestGetsBinaryData(tornado.CodecMixin,
+                                         tornado.TornadoTest):
+    tornado_application = web.Application([('/', BinaryRequestHandler)])
+
+    @classmethod
+    def execute(cls):
+        cls.response = cls.get('/')
+
+    def should_expose_body_as_memoryview(self):
+        self.assertIsInstance(self.response.data, memoryview)
+
+    def should_not_copy_body(self):
+        self.assertIs(self.response.data.obj, self.response.body)
+
+    def should_expose_body_contents(self):
+        self.assertEqual(self.response.data[1:3].tobytes(), b'\x01\x02')
+
+
+class WhenStartingTornadoWithUnknownTransport(bases.BaseTest):
+
+    @classmethod
+    def execute(cls):
+        try:
+            tornado.TornadoMixin.start_tornado(Recorder(), 'carrier-pigeon')
+        except Exception as error:
+            cls.exception = error
+
+    def should_raise_value_error(self):
+        self.assertIsInstance(self.exception, ValueError)
+
+
+class BenchmarkClient(tornado.TornadoBenchmarkMixin, tornado.TornadoMixin):
+    pass
+
+
+class _TornadoBenchmarkTestCase(mixins.PatchMixin, bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(_TornadoBenchmarkTestCase, cls).configure()
+        cls.application = Recorder()
+        BenchmarkClient.start_tornado(cls.application)
+
+    @classmethod
+    def annihilate(cls):
+        super(_TornadoBenchmarkTestCase, cls).annihilate()
+        BenchmarkClient.stop_tornado()
+
+
+class WhenBenchmarkingWithRequestCount(_TornadoBenchmarkTestCase):
+
+    @classmethod
+    def execute(cls):
+        cls.result = BenchmarkClient.benchmark(
+            [('GET', '/'), ('POST', '/', {'body': 'body'})],
+            count=20, concurrency=4)
+
+    def should_issue_requested_number_of_requests(self):
+        self.assertEqual(len(self.application.requests), 20)
+
+    def should_issue_requests_in_round_robin_order(self):
+        methods = [request.method for request in self.application.requests]
+        self.assertEqual(methods.count('GET'), 10)
+        self.assertEqual(methods.count('POST'), 10)
+
+    def should_record_each_latency(self):
+        self.assertEqual(self.result.request_count, 20)
+
+    def should_not_report_errors(self):
+        self.assertEqual(self.result.error_count, 0)
+
+    def should_count_status_codes(self):
+        self.assertEqual(self.result.status_counts, {200: 20})
+
+    def should_report_ordered_percentiles(self):
+        self.assertLessEqual(self.result.p50, self.result.p95)
+        self.assertLessEqual(self.result.p95, self.result.p99)
+
+    def should_report_throughput(self):
+        self.assertGreater(self.result.requests_per_second, 0)
+
+
+class WhenBenchmarkingWithErrorResponses(_TornadoBenchmarkTestCase):
+
+    @classmethod
+    def execute(cls):
+        cls.result = BenchmarkClient.benchmark(
+            [('GET', '/'), ('GET', '/missing')])
+
+    def should_issue_single_request(self):
+        self.assertEqual(len(self.application.requests), 1)
+
+    def should_count_errors(self):
+        self.assertEqual(self.result.error_count, 1)
+
+    def should_count_status_codes(self):
+        self.assertEqual(self.result.status_counts, {200: 1, 404: 1})
+
+
+class WhenBenchmarkingForDuration(_TornadoBenchmarkTestCase):
+
+    @classmethod
+    def execute(cls):
+        cls.result = BenchmarkClient.benchmark([('GET', '/')], duration=0.1)
+
+    def should_record_each_request(self):
+        self.assertEqual(
+            len(self.application.requests), self.result.request_count)
+
+    def should_run_for_requested_duration(self):
+        self.assertGreaterEqual(self.result.elapsed, 0.1)
+
+
+class WhenBenchmarkedRequestTimesOut(_TornadoBenchmarkTestCase):
+
+    @classmethod
+    def configure(cls):
+        super(WhenBenchmarkedRequestTimesOut, cls).configure()
+        cls.create_patch(
+            'test_helpers.mixins.tornado.TornadoMixin.request_timeout',
+            new=0.05)
+
+    @classmethod
+    def execute(cls):
+        cls.exception = None
+        try:
+            BenchmarkClient.benchmark([('GET', '/slow')], count=1)
+        except AssertionError as error:
+            cls.exception = error
+
+    def should_fail_benchmark(self):
+        self.assertEqual(str(self.exception), 'timeout failure')
+
+
+class _SharedRecorderTest(tornado.TornadoTest):
+    tornado_application = Recorder()
+
+    @classmethod
+    def reset_tornado(cls):
+        super(_SharedRecorderTest, cls).reset_tornado()
+        del cls.tornado_application.requests[:]
+
+
+class _SharedTornadoTestCase(bases.BaseTest):
+    scope = None
+
+    @classmethod
+    def configure(cls):
+        super(_SharedTornadoTestCase, cls).configure()
+        attributes = {'tornado_scope': cls.scope}
+        cls.first = type('First', (_SharedRecorderTest,), attributes)
+        cls.second = type('Second', (_SharedRecorderTest,), attributes)
+
+    @classmethod
+    def annihilate(cls):
+        super(_SharedTornadoTestCase, cls).annihilate()
+        tornado.stop_shared_servers()
+
+    @classmethod
+    def execute(cls):
+        cls.first.configure()
+        cls.first.get('/')
+        cls.first.annihilate()
+        cls.second.configure()
+        cls.second.get('/')
+        cls.recorded = list(cls.second.tornado_application.requests)
+        cls.second.annihilate()
+
+    def should_reset_state_between_classes(self):
+        self.assertEqual(len(self.recorded), 1)
+
+
+class _SameSharedServerTestCase(_SharedTornadoTestCase):
+
+    def should_share_io_loop(self):
+        self.assertIs(self.first.io_loop, self.second.io_loop)
+
+    def should_share_server(self):
+        self.assertIs(self.first.server, self.second.server)
+
+    def should_leave_server_running(self):
+        self.assertEqual(len(tornado._shared_servers), 1)
+
+
+class WhenSharingTornadoServerForSession(_SameSharedServerTestCase):
+    scope = 'session'
+
+
+class WhenSharingTornadoServerForModule(_SameSharedServerTestCase):
+    scope = 'module'
+
+
+class WhenSharingTornadoServerFromAnotherModule(_SharedTornadoTestCase):
+    scope = 'module'
+
+    @classmethod
+    def configure(cls):
+        super(WhenSharingTornadoServerFromAnotherModule, cls).configure()
+        cls.second.__module__ = 'tests.integration.another_module'
+
+    def should_not_share_server(self):
+        self.assertIsNot(self.first.server, self.second.server)
+
+    def should_stop_previous_module_server(self):
+        self.assertEqual(
+            list(tornado._shared_servers)[0][0],
+            'tests.integration.another_module')
+
+
+class WhenStoppingSharedServersForModule(_SharedTornadoTestCase):
+    scope = 'module'
+
+    @classmethod
+    def execute(cls):
+        super(WhenStoppingSharedServersForModule, cls).execute()
+        tornado.stop_shared_servers(cls.second.__module__)
+
+    def should_stop_server(self):
+        self.assertEqual(tornado._shared_servers, {})
+
+
+class UpstreamRequestHandler(web.RequestHandler):
+
+    def get(self):
+        self.application.upstream_hits += 1
+        self.set_header('Content-Type', 'text/plain')
+        self.write('upstream')
+
+
+class ProxyRequestHandler(web.RequestHandler):
+
+    @gen.coroutine
+    def get(self):
+        try:
+            response = yield httpclient.AsyncHTTPClient().fetch(
+                self.application.upstream_url)
+        except Exception:
+            self.set_status(502)
+        else:
+            self.write(response.body)
+
+
+class Proxy(web.Application):
+
+    def __init__(self):
+        super(Proxy, self).__init__(handlers=[
+            ('/proxy', ProxyRequestHandler),
+            ('/upstream', UpstreamRequestHandler),
+        ])
+        self.upstream_hits = 0
+        self.upstream_url = None
+
+
+class _ProxyTest(tornado.CassetteMixin, tornado.TornadoTest):
+    tornado_application = Proxy()
+
+
+class WhenReplayingRecordedRequests(bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(WhenReplayingRecordedRequests, cls).configure()
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.cassette_path = os.path.join(cls.temp_dir, 'proxy.cassette')
+        cls.recording = type('Recording', (_ProxyTest,), {
+            'cassette_path': cls.cassette_path, 'cassette_mode': 'record'})
+        cls.replaying = type('Replaying', (_ProxyTest,), {
+            'cassette_path': cls.cassette_path, 'cassette_mode': 'replay'})
+
+    @classmethod
+    def annihilate(cls):
+        super(WhenReplayingRecordedRequests, cls).annihilate()
+        shutil.rmtree(cls.temp_dir)
+
+    @classmethod
+    def execute(cls):
+        cls.recording.configure()
+        application = cls.recording.tornado_application
+        application.upstream_url = cls.recording.url_root + '/upstream'
+        cls.recorded = cls.recording.get('/proxy')
+        cls.recording.annihilate()
+
+        cls.replaying.configure()
+        cls.replayed = cls.replaying.get('/proxy')
+        cls.replayed_count = len(cls.replaying.cassette)
+        application.upstream_url += '?missing'
+        cls.missing = cls.replaying.get('/proxy')
+        cls.replaying.annihilate()
+
+    def should_record_upstream_response(self):
+        self.assertEqual(self.recorded.body, b'upstream')
+
+    def should_write_cassette(self):
+        self.assertTrue(os.path.exists(self.cassette_path))
+
+    def should_replay_recorded_response(self):
+        self.assertEqual(self.replayed.body, b'upstream')
+
+    def should_not_send_replayed_requests(self):
+        self.assertEqual(self.recording.tornado_application.upstream_hits, 1)
+
+    def should_not_record_test_requests(self):
+        self.assertEqual(self.replayed_count, 1)
+
+    def should_fail_requests_missing_from_cassette(self):
+        self.assertEqual(self.missing.code, 502)
+
+
+class WhenCassettePathIsNotSet(_ProxyTest):
+    tornado_application = Proxy()
+
+    @classmethod
+    def execute(cls):
+        cls.tornado_application.upstream_url = cls.url_root + '/upstream'
+        cls.response = cls.get('/proxy')
+
+    def should_send_request_upstream(self):
+        self.assertEqual(self.tornado_application.upstream_hits, 1)
+
+    def should_return_upstream_response(self):
+        self.assertEqual(self.response.body, b'upstream')
+
+    def should_not_create_cassette(self):
+        self.assertIsNone(self.cassette)
+
+
+class _TimedTornadoTestCase(_TornadoMixinTestCase):
+
+    @classmethod
+    def configure(cls):
+        super(_TimedTornadoTestCase, cls).configure()
+        cls.create_patch(
+            'test_helpers.mixins.tornado.TornadoMixin.timing_capacity',
+            new=2)
+
+    @classmethod
+    def annihilate(cls):
+        super(_TimedTornadoTestCase, cls).annihilate()
+        tornado._request_timings.pop('test_helpers.mixins.tornado.'
+                                     'TornadoMixin', None)
+
+    @classmethod
+    def execute(cls):
+        cls.test_instance.get('/?query=1')
+        cls.test_instance.get('/missing')
+        cls.test_instance.stream('GET', '/stream', tornado.DigestConsumer())
+        cls.timings = cls.test_instance.get_request_timings()
+
+
+class WhenTornadoMixinRecordsTimings(_TimedTornadoTestCase):
+
+    def should_keep_most_recent_timings(self):
+        self.assertEqual([timing.path for timing in self.timings],
+                         ['/missing', '/stream'])
+
+    def should_record_method(self):
+        self.assertEqual(self.timings[0].method, 'GET')
+
+    def should_record_status(self):
+        self.assertEqual(self.timings[0].code, 404)
+
+    def should_record_request_time(self):
+        self.assertGreater(self.timings[0].request_time, 0)
+
+    def should_record_time_to_first_byte(self):
+        self.assertLessEqual(self.timings[1].time_to_first_byte,
+                             self.timings[1].request_time)
+
+    def should_record_streamed_body_size(self):
+        self.assertGreater(self.timings[1].body_size, 0)
+
+
+class WhenTornadoMixinRecordsTimingsInMemory(WhenTornadoMixinRecordsTimings):
+    transport = 'memory'
@@ -0,0 +1,225 @@
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+from test_helpers import bases, mixins
+
+
+class _FixtureTest(bases.BaseTest):
+    created = []
+    destroyed = []
+
+    @classmethod
+    def create_fixture(cls):
+        cls.created.append(object())
+        return cls.created[-1]
+
+    @classmethod
+    def destroy_fixture(cls, fixture):
+        cls.destroyed.append(fixture)
+
+
+class _CachedFixtureTestCase(bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(_CachedFixtureTestCase, cls).configure()
+        attributes = {'fixture_key': str(uuid.uuid4()),
+                      'created': [], 'destroyed': []}
+        cls.first = type('First', (_FixtureTest,), attributes)
+        cls.second = type('Second', (_FixtureTest,), attributes)
+
+    @classmethod
+    def annihilate(cls):
+        super(_CachedFixtureTestCase, cls).annihilate()
+        bases.invalidate_fixture(cls.first.fixture_key)
+
+
+class WhenClassesShareFixtureKey(_CachedFixtureTestCase):
+
+    @classmethod
+    def execute(cls):
+        cls.first.setUpClass()
+        cls.first.tearDownClass()
+        cls.second.setUpClass()
+        cls.second.tearDownClass()
+
+    def should_create_fixture_once(self):
+        self.assertEqual(len(self.first.created), 1)
+
+    def should_share_fixture(self):
+        self.assertIs(self.first.fixture, self.second.fixture)
+
+    def should_keep_fixture_until_invalidated(self):
+        self.assertEqual(self.first.destroyed, [])
+
+
+class WhenFixtureIsInvalidatedWhileInUse(_CachedFixtureTestCase):
+
+    @classmethod
+    def execute(cls):
+        cls.first.setUpClass()
+        bases.invalidate_fixture(cls.first.fixture_key)
+        cls.destroyed_while_in_use = list(cls.first.destroyed)
+        cls.second.setUpClass()
+        cls.first.tearDownClass()
+        cls.second.tearDownClass()
+
+    def should_defer_destruction_until_released(self):
+        self.assertEqual(self.destroyed_while_in_use, [])
+
+    def should_destroy_invalidated_fixture(self):
+        self.assertEqual(self.first.destroyed, [self.first.created[0]])
+
+    def should_create_new_fixture(self):
+        self.assertIsNot(self.second.fixture, self.first.fixture)
+
+
+class WhenArrangeFailsWithCachedFixture(_CachedFixtureTestCase):
+
+    @classmethod
+    def execute(cls):
+        cls.first.execute = classmethod(lambda cls: 1 / 0)
+        try:
+            cls.first.setUpClass()
+        except ZeroDivisionError:
+            pass
+        bases.invalidate_fixture(cls.first.fixture_key)
+
+    def should_release_fixture(self):
+        self.assertEqual(self.first.destroyed, self.first.created)
+
+
+class WhenClassDoesNotDeclareFixtureKey(bases.BaseTest):
+
+    @classmethod
+    def execute(cls):
+        cls.test_class = type('Test', (_FixtureTest,), {'created': []})
+        cls.test_class.setUpClass()
+        cls.test_class.tearDownClass()
+
+    def should_not_create_fixture(self):
+        self.assertEqual(self.test_class.created, [])
+
+    def should_leave_fixture_unset(self):
+        self.assertIsNone(self.test_class.fixture)
+
+
+class WhenClassDoesNotCreateFixture(bases.BaseTest):
+
+    @classmethod
+    def execute(cls):
+        cls.test_class = type('Test', (bases.BaseTest,),
+                              {'fixture_key': str(uuid.uuid4())})
+        cls.test_class.setUpClass()
+        cls.test_class.tearDownClass()
+        bases.invalidate_fixture(cls.test_class.fixture_key)
+
+    def should_use_default_fixture(self):
+        self.assertIsNone(self.test_class.fixture)
+
+
+class _SlowPhaseTest(bases.BaseTest):
+
+    @classmethod
+    def execute(cls):
+        time.sleep(0.05)
+
+
+class _PhaseTimingTestCase(mixins.PatchMixin, bases.BaseTest):
+    profiler = None
+
+    @classmethod
+    def configure(cls):
+        super(_PhaseTimingTestCase, cls).configure()
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.create_patch('test_helpers.bases._phase_times', new={})
+        cls.create_patch('test_helpers.bases._phase_profiles', new={})
+        cls.test_class = type('Slow', (_SlowPhaseTest,), {
+            'profile_phases': cls.profiler,
+            'profile_threshold': 0.04,
+            'profile_directory': cls.temp_dir,
+        })
+
+    @classmethod
+    def annihilate(cls):
+        super(_PhaseTimingTestCase, cls).annihilate()
+        shutil.rmtree(cls.temp_dir)
+
+    @classmethod
+    def execute(cls):
+        cls.test_class.setUpClass()
+        cls.test_class.tearDownClass()
+        cls.times = cls.test_class.get_phase_times()
+        cls.report = bases.write_phase_report(
+            os.path.join(cls.temp_dir, 'report.json'), slowest=1)
+
+
+class WhenTimingTestPhases(_PhaseTimingTestCase):
+
+    def should_time_each_phase(self):
+        self.assertEqual(sorted(self.times),
+                         ['annihilate', 'configure', 'execute'])
+
+    def should_time_execute(self):
+        self.assertGreaterEqual(self.times['execute'], 0.05)
+
+    def should_report_slowest_phase(self):
+        self.assertEqual(self.report['slowest']['execute'][0]['class'],
+                         'tests.unit.test_bases.Slow')
+
+    def should_report_totals(self):
+        self.assertEqual(self.report['totals']['execute'],
+                         self.times['execute'])
+
+    def should_not_profile(self):
+        self.assertIsNone(self.report['slowest']['execute'][0]['profile'])
+
+
+class WhenProfilingSlowPhases(_PhaseTimingTestCase):
+    profiler = 'cprofile'
+
+    def should_save_slow_phase_profile(self):
+        path = self.report['slowest']['execute'][0]['profile']
+        self.assertEqual(os.path.basename(path),
+                         'tests.unit.test_bases.Slow.execute.prof')
+
+    def should_not_save_fast_phase_profile(self):
+        self.assertIsNone(self.report['slowest']['configure'][0]['profile'])
+
+
+class WhenTracingSlowPhaseAllocations(_PhaseTimingTestCase):
+    profiler = 'tracemalloc'
+
+    def should_save_slow_phase_allocations(self):
+        path = self.report['slowest']['execute'][0]['profile']
+        self.assertTrue(os.path.exists(path))
+
+
+class WhenProfilerIsUnknown(bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(WhenProfilerIsUnknown, cls).configure()
+        cls.phases = []
+        cls.test_class = type('Test', (bases.BaseTest,), {
+            'profile_phases': 'unknown',
+            'configure': classmethod(lambda c: cls.phases.append('configure')),
+            'annihilate': classmethod(
+                lambda c: cls.phases.append('annihilate')),
+        })
+
+    @classmethod
+    def execute(cls):
+        try:
+            cls.test_class.setUpClass()
+        except ValueError as error:
+            cls.exception = error
+
+    def should_reject_profiler(self):
+        self.assertEqual(str(self.exception), "unknown profiler 'unknown'")
+
+    def should_not_configure_test(self):
+        self.assertEqual(self.phases, [])
@@ -0,0 +1,146 @@
+import os
+import shutil
+import tempfile
+
+import benchmarks
+from test_helpers import bases, mixins
+
+
+def _record(live=False, **results):
+    record = benchmarks.make_record(
+        dict((name, None if value is None else
+              {'min': value, 'median': value, 'number': 1})
+             for name, value in results.items()), live)
+    record['revision'] = 'abc'
+    return record
+
+
+class WhenMeasuringBenchmark(bases.BaseTest):
+
+    @classmethod
+    def execute(cls):
+        cls.calls = []
+        cls.stats = benchmarks.measure(lambda: cls.calls.append(1),
+                                       repeat=3, min_time=0.001)
+
+    def should_calibrate_number_of_calls(self):
+        self.assertGreater(self.stats['number'], 1)
+
+    def should_call_function_for_each_sample(self):
+        self.assertGreaterEqual(len(self.calls), 3 * self.stats['number'])
+
+    def should_report_fastest_sample(self):
+        self.assertLessEqual(self.stats['min'], self.stats['median'])
+
+
+class WhenComparingWithHistory(bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(WhenComparingWithHistory, cls).configure()
+        cls.directory = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.directory, 'build', 'history.jsonl')
+        benchmarks.append_history(cls.path, _record(fast=1.0, slow=1.0))
+        benchmarks.append_history(cls.path, _record(live=True, fast=9.0))
+        cls.record = _record(fast=1.1, slow=2.0, skipped=None)
+
+    @classmethod
+    def execute(cls):
+        cls.baseline, cls.rows = benchmarks.compare(
+            cls.record, benchmarks.load_history(cls.path), threshold=0.25)
+
+    @classmethod
+    def annihilate(cls):
+        super(WhenComparingWithHistory, cls).annihilate()
+        shutil.rmtree(cls.directory)
+
+    def should_use_latest_comparable_run(self):
+        self.assertFalse(self.baseline['live'])
+
+    def should_report_each_common_benchmark(self):
+        self.assertEqual([row[0] for row in self.rows], ['fast', 'slow'])
+
+    def should_flag_regressions_over_threshold(self):
+        self.assertEqual([row[4] for row in self.rows], [False, True])
+
+
+class WhenComparingWithoutHistory(bases.BaseTest):
+
+    @classmethod
+    def execute(cls):
+        cls.baseline, cls.rows = benchmarks.compare(
+            _record(fast=1.0), [_record(live=True, fast=1.0)])
+
+    def should_not_find_baseline(self):
+        self.assertIsNone(self.baseline)
+        self.assertEqual(self.rows, [])
+
+
+class WhenRunningBenchmarks(mixins.PatchMixin, bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(WhenRunningBenchmarks, cls).configure()
+        cls.cleaned_up = []
+
+        def timed(live):
+            yield lambda: None
+            cls.cleaned_up.append('timed')
+
+        def unavailable(live):
+            raise benchmarks.Skip('not installed')
+            yield
+
+        cls.create_patch('benchmarks._benchmarks', new=[
+            benchmarks.Benchmark('fixture.timed', timed, False),
+            benchmarks.Benchmark('fixture.unavailable', unavailable, False),
+            benchmarks.Benchmark('fixture.live', timed, True),
+            benchmarks.Benchmark('other.excluded', timed, False),
+        ])
+
+    @classmethod
+    def execute(cls):
+        cls.results = benchmarks.run(selected='fixture.', repeat=1)
+
+    def should_measure_benchmarks(self):
+        self.assertGreater(self.results['fixture.timed']['number'], 0)
+
+    def should_clean_up_after_measuring(self):
+        self.assertEqual(self.cleaned_up, ['timed'])
+
+    def should_skip_unavailable_benchmarks(self):
+        self.assertIsNone(self.results['fixture.unavailable'])
+
+    def should_skip_live_benchmarks(self):
+        self.assertIsNone(self.results['fixture.live'])
+
+    def should_only_run_selected_benchmarks(self):
+        self.assertNotIn('other.excluded', self.results)
+
+
+class WhenRunningBenchmarksWithBroker(mixins.EnvironmentMixin,
+                                      mixins.PatchMixin, bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(WhenRunningBenchmarksWithBroker, cls).configure()
+        cls.set_environment_variable('TEST_HELPERS_BROKER', '1')
+        cls.settings = []
+
+        def record_setting(live):
+            cls.settings.append(os.environ.get('TEST_HELPERS_BROKER'))
+            yield lambda: None
+
+        cls.create_patch('benchmarks._benchmarks', new=[
+            benchmarks.Benchmark('fixture.broker', record_setting, False),
+        ])
+
+    @classmethod
+    def execute(cls):
+        benchmarks.run(repeat=1)
+
+    def should_ignore_broker(self):
+        self.assertEqual(self.settings, [None])
+
+    def should_restore_broker_setting(self):
+        self.assertEqual(os.environ.get('TEST_HELPERS_BROKER'), '1')
@@ -0,0 +1,305 @@
+import os
+import shutil
+import tempfile
+import time
+
+from test_helpers import bases, broker, mixins, postgres, rabbit
+
+
+class FakeKind(object):
+
+    def __init__(self):
+        super(FakeKind, self).__init__()
+        self.created = []
+        self.destroyed = []
+
+    def create(self, params):
+        resource = '{0}-{1}'.format(params['prefix'], len(self.created))
+        self.created.append(resource)
+        return resource
+
+    def destroy(self, resource):
+        self.destroyed.append(resource)
+
+    def as_kind(self):
+        return broker.ResourceKind(
+            self.create, lambda resource: {'name': resource}, self.destroy)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+
+
+class _BrokerTestCase(bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(_BrokerTestCase, cls).configure()
+        cls.directory = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.directory, 'broker.sock')
+        cls.kind = FakeKind()
+        cls.broker = broker.Broker(cls.path, pool_size=1,
+                                   kinds={'fake': cls.kind.as_kind()})
+        cls.broker.start()
+        cls.client = broker.BrokerClient(cls.path, autostart=False)
+
+    @classmethod
+    def annihilate(cls):
+        super(_BrokerTestCase, cls).annihilate()
+        cls.client.close()
+        cls.broker.shutdown()
+        shutil.rmtree(cls.directory)
+
+
+class WhenLeasingFromBroker(_BrokerTestCase):
+
+    @classmethod
+    def execute(cls):
+        cls.first = cls.client.lease('fake', {'prefix': 'a'})
+        wait_for(lambda: cls.client.stats()['fake']['spare'] == 1)
+        cls.second = cls.client.lease('fake', {'prefix': 'a'})
+        cls.client.release(cls.first)
+        wait_for(lambda: cls.kind.destroyed)
+        cls.stats = cls.client.stats()
+
+    def should_create_first_resource_on_demand(self):
+        self.assertEqual(self.first.resource, {'name': 'a-0'})
+
+    def should_hand_out_warm_spare(self):
+        self.assertEqual(self.second.resource, {'name': 'a-1'})
+
+    def should_destroy_released_resource(self):
+        self.assertEqual(self.kind.destroyed, ['a-0'])
+
+    def should_replenish_pool(self):
+        self.assertEqual(self.stats['fake'], {'leased': 1, 'spare': 1})
+
+
+class WhenLeasingUnpooledKindFromBroker(_BrokerTestCase):
+
+    @classmethod
+    def configure(cls):
+        super(WhenLeasingUnpooledKindFromBroker, cls).configure()
+        cls.broker.kinds['fake'] = cls.broker.kinds['fake']._replace(
+            pooled=False)
+
+    @classmethod
+    def execute(cls):
+        cls.first = cls.client.lease('fake', {'prefix': 'db'})
+        cls.second = cls.client.lease('fake', {'prefix': 'db'})
+        cls.stats = cls.client.stats()
+
+    def should_create_each_resource_when_leased(self):
+        self.assertEqual(self.kind.created, ['db-0', 'db-1'])
+
+    def should_not_keep_spares(self):
+        self.assertEqual(self.stats['fake'], {'leased': 2, 'spare': 0})
+
+    def should_clone_postgres_when_leased(self):
+        self.assertFalse(broker.KINDS['postgres'].pooled)
+
+
+class WhenBrokerRequestFails(_BrokerTestCase):
+
+    @classmethod
+    def execute(cls):
+        try:
+            cls.client.lease('unknown', {})
+        except broker.BrokerError as error:
+            cls.error = error
+
+    def should_raise_broker_error(self):
+        self.assertIn('unknown resource kind', str(self.error))
+
+
+class WhenBrokerClientDisconnects(_BrokerTestCase):
+
+    @classmethod
+    def execute(cls):
+        cls.lease = cls.client.lease('fake', {'prefix': 'b'})
+        cls.client.close()
+        wait_for(lambda: 'b-0' in cls.kind.destroyed)
+
+    def should_destroy_leased_resources(self):
+        self.assertIn('b-0', self.kind.destroyed)
+
+    def should_not_hand_out_leased_resource_again(self):
+        self.assertEqual(self.kind.created.count('b-0'), 1)
+
+
+class WhenBrokerShutsDown(_BrokerTestCase):
+
+    @classmethod
+    def execute(cls):
+        cls.lease = cls.client.lease('fake', {'prefix': 'c'})
+        wait_for(lambda: len(cls.kind.created) == 2)
+        cls.client.close()
+        cls.broker.shutdown()
+
+    def should_destroy_every_resource(self):
+        self.assertEqual(sorted(self.kind.destroyed), ['c-0', 'c-1'])
+
+    def should_remove_socket(self):
+        self.assertFalse(os.path.exists(self.path))
+
+
+class WhenBrokerDirectoryIsNotPrivate(bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(WhenBrokerDirectoryIsNotPrivate, cls).configure()
+        cls.directory = tempfile.mkdtemp()
+        os.chmod(cls.directory, 0o755)
+        cls.client = broker.BrokerClient(
+            os.path.join(cls.directory, 'broker.sock'), autostart=False)
+
+    @classmethod
+    def execute(cls):
+        try:
+            cls.client.stats()
+        except broker.BrokerError as error:
+            cls.error = error
+
+    @classmethod
+    def annihilate(cls):
+        super(WhenBrokerDirectoryIsNotPrivate, cls).annihilate()
+        shutil.rmtree(cls.directory)
+
+    def should_refuse_directory(self):
+        self.assertIn('mode 0700', str(self.error))
+
+
+class WhenBrokerDirectoryIsSymlink(bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(WhenBrokerDirectoryIsSymlink, cls).configure()
+        cls.directory = tempfile.mkdtemp()
+        cls.link = os.path.join(cls.directory, 'link')
+        os.symlink(cls.directory, cls.link)
+
+    @classmethod
+    def execute(cls):
+        try:
+            broker.Broker(os.path.join(cls.link, 'broker.sock'),
+                          kinds={}).serve_forever()
+        except broker.BrokerError as error:
+            cls.error = error
+
+    @classmethod
+    def annihilate(cls):
+        super(WhenBrokerDirectoryIsSymlink, cls).annihilate()
+        shutil.rmtree(cls.directory)
+
+    def should_refuse_directory(self):
+        self.assertIn('refusing to use', str(self.error))
+
+
+class WhenBrokerIsNotConfigured(mixins.EnvironmentMixin, bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(WhenBrokerIsNotConfigured, cls).configure()
+        cls.unset_environment_variable('TEST_HELPERS_BROKER')
+
+    @classmethod
+    def execute(cls):
+        cls.client = broker.get_client()
+
+    def should_not_return_client(self):
+        self.assertIsNone(self.client)
+
+
+class WhenBrokerIsConfigured(mixins.EnvironmentMixin, bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(WhenBrokerIsConfigured, cls).configure()
+        cls.set_environment_variable('TEST_HELPERS_BROKER', '1')
+
+    @classmethod
+    def execute(cls):
+        cls.client = broker.get_client()
+        cls.same_client = broker.get_client()
+
+    def should_use_default_socket(self):
+        self.assertEqual(self.client.path, broker.default_socket_path())
+
+    def should_reuse_client(self):
+        self.assertIs(self.same_client, self.client)
+
+
+class _LeasingTestCase(mixins.PatchMixin, bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(_LeasingTestCase, cls).configure()
+        cls.client = cls.create_patch('test_helpers.broker.get_client')
+        cls.client = cls.client.return_value
+
+
+class WhenLeasingPostgresDatabase(_LeasingTestCase):
+
+    @classmethod
+    def configure(cls):
+        super(WhenLeasingPostgresDatabase, cls).configure()
+        cls.client.lease.return_value = broker.Lease(
+            7, {'database': 'testleased'})
+        cls.run_ddl = cls.create_patch(
+            'test_helpers.postgres.TemporaryDatabase._run_ddl')
+        cls.database = postgres.TemporaryDatabase(host='db', port=5432)
+
+    @classmethod
+    def execute(cls):
+        cls.database.create('template1')
+        cls.leased_parameters = cls.database.connection_parameters
+        cls.database.drop()
+
+    def should_lease_database(self):
+        params = self.client.lease.call_args[0][1]
+        self.assertEqual((params['host'], params['template']),
+                         ('db', 'template1'))
+
+    def should_use_leased_database(self):
+        self.assertEqual(self.leased_parameters['database'], 'testleased')
+
+    def should_not_run_ddl(self):
+        self.assertFalse(self.run_ddl.called)
+
+    def should_release_lease_on_drop(self):
+        self.client.release.assert_called_once_with(
+            self.client.lease.return_value)
+
+
+class WhenLeasingVirtualHost(_LeasingTestCase):
+
+    @classmethod
+    def configure(cls):
+        super(WhenLeasingVirtualHost, cls).configure()
+        cls.client.lease.return_value = broker.Lease(
+            8, {'virtual_host': '%2Fleased'})
+        cls.create_patch('test_helpers.rabbit.atexit')
+        cls.fixture = rabbit.RabbitMqFixture('rabbit', 'guest', 'secret')
+        cls.api_request = cls.create_patch(
+            'test_helpers.rabbit.RabbitMqFixture._rabbit_api_request')
+
+    @classmethod
+    def execute(cls):
+        cls.virtual_host = cls.fixture.install_virtual_host()
+        cls.fixture.remove_virtual_host()
+
+    def should_lease_virtual_host(self):
+        self.assertEqual(self.client.lease.call_args[0][1]['password'],
+                         'secret')
+
+    def should_use_leased_virtual_host(self):
+        self.assertEqual(self.virtual_host, '%2Fleased')
+
+    def should_not_call_management_api(self):
+        self.assertFalse(self.api_request.called)
+
+    def should_release_lease_on_remove(self):
+        self.client.release.assert_called_once_with(
+            self.client.lease.return_value)
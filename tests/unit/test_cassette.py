@@ -0,0 +1,109 @@
+from __future__ import absolute_import
+
+import io
+import os
+import shutil
+import tempfile
+
+from tornado import httpclient, httputil
+
+from test_helpers import bases
+from test_helpers.mixins import tornado
+
+
+class _CassetteTestCase(bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(_CassetteTestCase, cls).configure()
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.temp_dir, 'test.cassette')
+        cls.request = httpclient.HTTPRequest(
+            'http://example.com/resource', method='POST', body=b'{}')
+
+    @classmethod
+    def annihilate(cls):
+        super(_CassetteTestCase, cls).annihilate()
+        shutil.rmtree(cls.temp_dir)
+
+    @classmethod
+    def record(cls, body):
+        cassette = tornado.Cassette(cls.path, 'auto')
+        cassette.record(cls.request, httpclient.HTTPResponse(
+            cls.request, 201, reason='Created',
+            headers=httputil.HTTPHeaders({'Content-Type': 'text/plain'}),
+            buffer=io.BytesIO(body)))
+        cassette.save()
+        cassette.close()
+
+
+class WhenReplayingFromCassetteFile(_CassetteTestCase):
+
+    @classmethod
+    def execute(cls):
+        cls.record(b'first')
+        cls.record(b'second')
+        cls.cassette = tornado.Cassette(cls.path, 'replay')
+        cls.response = cls.cassette.play(cls.request)
+        cls.cassette.close()
+
+    def should_replay_status(self):
+        self.assertEqual(self.response.code, 201)
+
+    def should_replay_reason(self):
+        self.assertEqual(self.response.reason, 'Created')
+
+    def should_replay_headers(self):
+        self.assertEqual(self.response.headers['Content-Type'], 'text/plain')
+
+    def should_replay_latest_body(self):
+        self.assertEqual(self.response.body, b'second')
+
+
+class WhenReplayingMissingRequest(_CassetteTestCase):
+
+    @classmethod
+    def execute(cls):
+        cls.record(b'body')
+        cls.other = httpclient.HTTPRequest(
+            cls.request.url, method='POST', body=b'[]')
+        cls.cassette = tornado.Cassette(cls.path, 'replay')
+        try:
+            cls.cassette.play(cls.other)
+        except tornado.CassetteMissError as error:
+            cls.exception = error
+
+    def should_raise_miss_error(self):
+        self.assertIsInstance(self.exception, tornado.CassetteMissError)
+
+    def should_return_none_in_auto_mode(self):
+        self.cassette.mode = 'auto'
+        self.assertIsNone(self.cassette.play(self.other))
+
+
+class WhenRecordingCassetteAgain(_CassetteTestCase):
+
+    @classmethod
+    def execute(cls):
+        cls.record(b'body')
+        cls.cassette = tornado.Cassette(cls.path, 'record')
+        cls.cassette.record(cls.request, httpclient.HTTPResponse(
+            cls.request, 200, buffer=io.BytesIO(b'again')))
+        cls.response = cls.cassette.play(cls.request)
+        cls.cassette.close()
+
+    def should_pass_request_through(self):
+        self.assertIsNone(self.response)
+
+
+class WhenCreatingCassetteWithUnknownMode(bases.BaseTest):
+
+    @classmethod
+    def execute(cls):
+        try:
+            tornado.Cassette('unused', 'rewind')
+        except ValueError as error:
+            cls.exception = error
+
+    def should_raise_value_error(self):
+        self.assertIsInstance(self.exception, ValueError)
@@ -0,0 +1,159 @@
+import threading
+import time
+
+from test_helpers import bases, mixins
+from test_helpers.mixins import fixtures
+
+
+class _Resource(object):
+
+    def __init__(self, name, events, delay=0.0, fail=False):
+        self.name = name
+        self.events = events
+        self.delay = delay
+        self.fail = fail
+        self.thread = None
+
+    def setup(self, **deps):
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(self.name)
+        self.thread = threading.current_thread()
+        self.events.append(('setup', self.name, sorted(deps)))
+        return self
+
+    def teardown(self, value):
+        self.events.append(('teardown', self.name))
+
+    def fixture(self, *requires):
+        return fixtures.Fixture(self.setup, self.teardown, requires)
+
+
+class WhenFixtureMixinSetsUpIndependentFixtures(bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(WhenFixtureMixinSetsUpIndependentFixtures, cls).configure()
+        cls.events = []
+        cls.test_class = type('Test', (mixins.FixtureMixin, bases.BaseTest), {
+            'fixtures': dict(
+                (name, _Resource(name, cls.events, delay=0.1).fixture())
+                for name in ('database', 'vhost', 'collection')),
+        })
+
+    @classmethod
+    def execute(cls):
+        start = time.time()
+        cls.test_class.configure()
+        cls.elapsed = time.time() - start
+        cls.test_class.annihilate()
+
+    def should_set_up_concurrently(self):
+        self.assertLess(self.elapsed, 0.25)
+
+    def should_expose_fixture_values(self):
+        self.assertEqual(self.test_class.vhost.name, 'vhost')
+
+    def should_tear_down_every_fixture(self):
+        self.assertEqual(
+            sorted(event[1] for event in self.events
+                   if event[0] == 'teardown'),
+            ['collection', 'database', 'vhost'])
+
+
+class WhenFixturesHaveDependencies(bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(WhenFixturesHaveDependencies, cls).configure()
+        cls.events = []
+        cls.scheduler = fixtures.FixtureScheduler({
+            'database': _Resource('database', cls.events, 0.05).fixture(),
+            'schema': _Resource('schema', cls.events).fixture('database'),
+            'data': _Resource('data', cls.events).fixture('schema', 'vhost'),
+            'vhost': _Resource('vhost', cls.events).fixture(),
+        })
+
+    @classmethod
+    def execute(cls):
+        cls.values = cls.scheduler.start()
+        cls.scheduler.stop()
+
+    def should_pass_dependency_values(self):
+        self.assertIn(('setup', 'data', ['schema', 'vhost']), self.events)
+
+    def should_set_up_dependencies_first(self):
+        order = [event[1] for event in self.events if event[0] == 'setup']
+        self.assertLess(order.index('database'), order.index('schema'))
+        self.assertLess(order.index('schema'), order.index('data'))
+        self.assertLess(order.index('vhost'), order.index('data'))
+
+    def should_tear_down_in_reverse_dependency_order(self):
+        order = [event[1] for event in self.events
+                 if event[0] == 'teardown']
+        self.assertLess(order.index('data'), order.index('schema'))
+        self.assertLess(order.index('schema'), order.index('database'))
+        self.assertLess(order.index('data'), order.index('vhost'))
+
+    def should_return_values(self):
+        self.assertEqual(sorted(self.values),
+                         ['data', 'database', 'schema', 'vhost'])
+
+
+class WhenFixtureSetupFails(bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(WhenFixtureSetupFails, cls).configure()
+        cls.events = []
+        cls.scheduler = fixtures.FixtureScheduler({
+            'database': _Resource('database', cls.events).fixture(),
+            'vhost': _Resource('vhost', cls.events, 0.05, True).fixture(),
+            'schema': _Resource('schema', cls.events).fixture('vhost'),
+        })
+
+    @classmethod
+    def execute(cls):
+        try:
+            cls.scheduler.start()
+        except RuntimeError as error:
+            cls.exception = error
+
+    def should_raise_setup_error(self):
+        self.assertEqual(str(self.exception), 'vhost')
+
+    def should_not_set_up_dependents(self):
+        self.assertNotIn('schema', [event[1] for event in self.events])
+
+    def should_tear_down_ready_fixtures(self):
+        self.assertIn(('teardown', 'database'), self.events)
+
+
+class WhenFixturesRequireEachOther(bases.BaseTest):
+
+    @classmethod
+    def execute(cls):
+        try:
+            fixtures.FixtureScheduler({
+                'a': fixtures.Fixture(None, requires=['b']),
+                'b': fixtures.Fixture(None, requires=['a']),
+            })
+        except ValueError as error:
+            cls.exception = error
+
+    def should_raise_value_error(self):
+        self.assertEqual(str(self.exception), 'fixture cycle: a -> b -> a')
+
+
+class WhenFixtureRequiresUnknownFixture(bases.BaseTest):
+
+    @classmethod
+    def execute(cls):
+        try:
+            fixtures.FixtureScheduler({
+                'a': fixtures.Fixture(None, requires=['missing'])})
+        except ValueError as error:
+            cls.exception = error
+
+    def should_raise_value_error(self):
+        self.assertIn("'missing'", str(self.exception))
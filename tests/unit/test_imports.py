@@ -0,0 +1,42 @@
+import json
+import os
+import subprocess
+import sys
+
+from test_helpers import bases
+
+IMPORT_SCRIPT = """
+import json, sys, timeit
+start = timeit.default_timer()
+import test_helpers
+import test_helpers.bases, test_helpers.mixins, test_helpers.mongo
+import test_helpers.postgres, test_helpers.rabbit, test_helpers.serializers
+import test_helpers.utils
+elapsed = timeit.default_timer() - start
+print(json.dumps({'elapsed': elapsed, 'modules': sorted(sys.modules)}))
+"""
+
+
+class WhenImportingTestHelpers(bases.BaseTest):
+
+    optional_modules = ('mock', 'msgpack', 'orjson', 'psycopg2', 'pymongo',
+                        'requests', 'simplejson', 'tornado', 'ujson',
+                        'unittest.mock')
+    # generous so that it only catches heavy imports on loaded machines
+    budget = float(os.environ.get('TEST_HELPERS_IMPORT_BUDGET', '2.0'))
+
+    @classmethod
+    def execute(cls):
+        output = subprocess.check_output(
+            [sys.executable, '-c', IMPORT_SCRIPT],
+            cwd=os.path.dirname(os.path.dirname(os.path.dirname(
+                os.path.abspath(__file__)))))
+        cls.result = json.loads(output.decode('utf-8'))
+
+    def should_not_import_optional_dependencies(self):
+        self.assertEqual(
+            [name for name in self.optional_modules
+             if name in self.result['modules']], [])
+
+    def should_import_within_budget(self):
+        self.assertLess(self.result['elapsed'], self.budget)
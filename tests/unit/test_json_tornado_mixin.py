@@ -67,6 +67,18 @@ class WhenJsonMixinRequestsWithJsonBody(_JsonMixinTestCase):
         )
 
 
+class WhenJsonMixinRequestsWithNullBody(_JsonMixinTestCase):
+
+    @classmethod
+    def configure(cls):
+        super(WhenJsonMixinRequestsWithNullBody, cls).configure()
+        cls.request_kwargs['body'] = None
+
+    def should_send_json_null(self):
+        self.super_request.assert_called_once_with(
+            mock.sentinel.method, body=b'null', headers=mock.ANY)
+
+
 class WhenJsonMixinRequestsWithJsonBodyAndCustomMimeType(
         WhenJsonMixinRequestsWithJsonBody):
 
@@ -93,7 +105,7 @@ class WhenJsonMixinRequestsWithNonJsonBody(_JsonMixinTestCase):
     @classmethod
     def configure(cls):
         super(WhenJsonMixinRequestsWithNonJsonBody, cls).configure()
-        cls.request_kwargs['body'] = mock.sentinel.body
+        cls.request_kwargs['body'] = 'key=value'
         cls.request_kwargs['headers'] = {
             'content-type': 'application/x-www-form-urlencoded',
         }
@@ -101,7 +113,7 @@ class WhenJsonMixinRequestsWithNonJsonBody(_JsonMixinTestCase):
     def should_pass_unaltered_body(self):
         self.super_request.assert_called_once_with(
             mock.sentinel.method,
-            body=mock.sentinel.body,
+            body='key=value',
             headers=mock.ANY,
         )
 
@@ -116,6 +128,40 @@ class WhenJsonMixinRequestsWithNonJsonBody(_JsonMixinTestCase):
         )
 
 
+class WhenJsonMixinRequestsWithFormBody(_JsonMixinTestCase):
+
+    @classmethod
+    def configure(cls):
+        super(WhenJsonMixinRequestsWithFormBody, cls).configure()
+        cls.request_kwargs['body'] = {'key': ['one', 'two']}
+        cls.request_kwargs['headers'] = {
+            'content-type': 'application/x-www-form-urlencoded',
+        }
+
+    def should_form_encode_body(self):
+        self.super_request.assert_called_once_with(
+            mock.sentinel.method,
+            body=b'key=one&key=two',
+            headers=mock.ANY,
+        )
+
+
+class WhenJsonMixinRequestsWithUnregisteredBodyType(_JsonMixinTestCase):
+
+    @classmethod
+    def configure(cls):
+        super(WhenJsonMixinRequestsWithUnregisteredBodyType, cls).configure()
+        cls.request_kwargs['body'] = mock.sentinel.body
+        cls.request_kwargs['headers'] = {'content-type': 'image/png'}
+
+    def should_pass_unaltered_body(self):
+        self.super_request.assert_called_once_with(
+            mock.sentinel.method,
+            body=mock.sentinel.body,
+            headers=mock.ANY,
+        )
+
+
 class WhenJsonMixinRequestsWithCustomAcceptHeader(_JsonMixinTestCase):
 
     @classmethod
@@ -135,17 +181,80 @@ class WhenJsonMixinGetsJsonResponse(_JsonMixinTestCase):
     @classmethod
     def configure(cls):
         super(WhenJsonMixinGetsJsonResponse, cls).configure()
-        cls.json_loads = cls.create_patch('json').loads
+        cls.json_loads = cls.create_patch('JsonMixin.json_serializer').loads
         cls.real_response.headers['content-type'] = (
             'application/json; charset=utf8')
         cls.real_response._body = b'{"body":"value"}'
 
-    def should_json_loads_response_body(self):
-        self.json_loads.assert_called_once_with('{"body":"value"}')
+    @classmethod
+    def execute(cls):
+        super(WhenJsonMixinGetsJsonResponse, cls).execute()
+        cls.json = cls.response.json
+
+    def should_json_loads_response_body_without_decoding(self):
+        self.json_loads.assert_called_once_with(b'{"body":"value"}')
 
     def should_save_json_on_response_object(self):
-        self.assertIs(
-            self.response.json, self.json_loads.return_value)
+        self.assertIs(self.json, self.json_loads.return_value)
+
+
+class WhenJsonMixinGetsJsonResponseEagerly(_JsonMixinTestCase):
+
+    @classmethod
+    def configure(cls):
+        super(WhenJsonMixinGetsJsonResponseEagerly, cls).configure()
+        cls.json_loads = cls.create_patch('JsonMixin.json_serializer').loads
+        cls.create_patch('JsonMixin.lazy_decode', new=False)
+        cls.real_response.headers['content-type'] = 'application/json'
+        cls.real_response._body = b'{"body":"value"}'
+
+    def should_decode_before_access(self):
+        self.json_loads.assert_called_once_with(b'{"body":"value"}')
+
+    def should_save_json_on_response_object(self):
+        self.assertIs(self.response.json, self.json_loads.return_value)
+
+
+class WhenJsonMixinGetsJsonResponseInOtherCharset(_JsonMixinTestCase):
+
+    @classmethod
+    def configure(cls):
+        super(WhenJsonMixinGetsJsonResponseInOtherCharset, cls).configure()
+        cls.real_response.headers['content-type'] = (
+            'application/json; charset=latin-1')
+        cls.real_response._body = u'{"body":"caf\u00e9"}'.encode('latin-1')
+
+    def should_decode_body_with_charset(self):
+        self.assertEqual(self.response.json, {'body': u'caf\u00e9'})
+
+
+class WhenJsonMixinGetsJsonResponseLazily(_JsonMixinTestCase):
+
+    @classmethod
+    def configure(cls):
+        super(WhenJsonMixinGetsJsonResponseLazily, cls).configure()
+        cls.json_loads = cls.create_patch('JsonMixin.json_serializer').loads
+        cls.real_response.headers['content-type'] = 'application/json'
+        cls.real_response._body = b'{"body":"value"}'
+
+    @classmethod
+    def execute(cls):
+        super(WhenJsonMixinGetsJsonResponseLazily, cls).execute()
+        cls.decoded_before_access = cls.json_loads.called
+        cls.first_access = cls.response.json
+        cls.second_access = cls.response.json
+
+    def should_not_decode_until_accessed(self):
+        self.assertFalse(self.decoded_before_access)
+
+    def should_save_json_on_response_object(self):
+        self.assertIs(self.first_access, self.json_loads.return_value)
+
+    def should_only_decode_once(self):
+        self.json_loads.assert_called_once_with(b'{"body":"value"}')
+
+    def should_keep_response_class(self):
+        self.assertIsInstance(self.response, httpclient.HTTPResponse)
 
 
 class WhenJsonMixinGetsNonJsonResponse(_JsonMixinTestCase):
@@ -157,3 +266,19 @@ class WhenJsonMixinGetsNonJsonResponse(_JsonMixinTestCase):
 
     def should_set_json_to_none_on_response_object(self):
         self.assertIsNone(self.response.json)
+
+
+class WhenJsonMixinStreamsJsonResponse(_JsonMixinTestCase):
+
+    @classmethod
+    def configure(cls):
+        super(WhenJsonMixinStreamsJsonResponse, cls).configure()
+        cls.json_loads = cls.create_patch('json').loads
+        cls.real_response.headers['content-type'] = 'application/json'
+        cls.request_kwargs['streaming_callback'] = mock.sentinel.consumer
+
+    def should_not_decode_body(self):
+        self.assertFalse(self.json_loads.called)
+
+    def should_set_json_to_none_on_response_object(self):
+        self.assertIsNone(self.response.json)
@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+
+from test_helpers import bases, mixins, parallel
+from test_helpers.compat import unittest
+
+
+class _SlowArrangeTest(bases.BaseTest):
+    arrange_in_parallel = True
+    arranged_in = None
+    annihilated = False
+
+    @classmethod
+    def execute(cls):
+        time.sleep(0.2)
+        cls.arranged_in = threading.current_thread()
+
+    @classmethod
+    def annihilate(cls):
+        super(_SlowArrangeTest, cls).annihilate()
+        cls.annihilated = True
+
+    def should_be_arranged(self):
+        self.assertIsNotNone(self.arranged_in)
+
+
+class _FailingArrangeTest(_SlowArrangeTest):
+
+    @classmethod
+    def execute(cls):
+        raise RuntimeError('arrange failed')
+
+
+class _SerialArrangeTest(_SlowArrangeTest):
+    arrange_in_parallel = False
+
+
+class _FailingAssertionTest(_SlowArrangeTest):
+
+    def should_be_arranged(self):
+        self.fail('assertion failed')
+
+
+class _OverlaySettingTest(mixins.EnvironmentMixin, _SlowArrangeTest):
+    environment_overlay = True
+
+    @classmethod
+    def configure(cls):
+        super(_OverlaySettingTest, cls).configure()
+        cls.set_environment_variable('TEST_HELPERS_ONLY_A', 'a')
+
+    def should_see_own_variable(self):
+        self.assertEqual(os.environ.get('TEST_HELPERS_ONLY_A'), 'a')
+
+
+class _OverlayReadingTest(mixins.EnvironmentMixin, _SlowArrangeTest):
+    environment_overlay = True
+    arranged_with = None
+
+    @classmethod
+    def configure(cls):
+        super(_OverlayReadingTest, cls).configure()
+        cls.arranged_with = os.environ.get('TEST_HELPERS_ONLY_A')
+
+    def should_not_see_other_class_variable(self):
+        self.assertIsNone(self.arranged_with)
+        self.assertNotIn('TEST_HELPERS_ONLY_A', os.environ)
+
+
+def patched_function():
+    return 'original'
+
+
+class _LocalPatchSettingTest(mixins.PatchMixin, _SlowArrangeTest):
+    patch_prefix = 'tests.unit.test_parallel'
+    patch_locally = True
+
+    @classmethod
+    def configure(cls):
+        super(_LocalPatchSettingTest, cls).configure()
+        cls.create_patch('patched_function', return_value='patched')
+
+    def should_see_own_patch(self):
+        self.assertEqual(patched_function(), 'patched')
+
+
+class _LocalPatchReadingTest(mixins.PatchMixin, _SlowArrangeTest):
+    patch_prefix = 'tests.unit.test_parallel'
+    patch_locally = True
+    arranged_with = None
+
+    @classmethod
+    def configure(cls):
+        super(_LocalPatchReadingTest, cls).configure()
+        cls.arranged_with = patched_function()
+
+    def should_not_see_other_class_patch(self):
+        self.assertEqual(self.arranged_with, 'original')
+        self.assertEqual(patched_function(), 'original')
+
+
+class _ParallelSuiteTestCase(bases.BaseTest):
+    test_classes = ()
+    failfast = False
+    max_workers = 4
+
+    @classmethod
+    def configure(cls):
+        super(_ParallelSuiteTestCase, cls).configure()
+        cls.classes = [type(base.__name__, (base,), {})
+                       for base in cls.test_classes]
+        loader = parallel.ParallelArrangeLoader()
+        loader.testMethodPrefix = 'should'
+        cls.suite = loader.suiteClass(
+            [loader.loadTestsFromTestCase(test_class)
+             for test_class in cls.classes], max_workers=cls.max_workers)
+        cls.result = unittest.TestResult()
+        cls.result.failfast = cls.failfast
+
+    @classmethod
+    def execute(cls):
+        start = time.time()
+        cls.suite.run(cls.result)
+        cls.elapsed = time.time() - start
+
+
+class WhenArrangingClassesInParallel(_ParallelSuiteTestCase):
+    test_classes = (_SlowArrangeTest, _SlowArrangeTest, _SlowArrangeTest)
+
+    def should_run_assertions(self):
+        self.assertEqual(self.result.testsRun, 3)
+
+    def should_succeed(self):
+        self.assertTrue(self.result.wasSuccessful())
+
+    def should_arrange_in_background_threads(self):
+        for test_class in self.classes:
+            self.assertIsNot(test_class.arranged_in,
+                             threading.current_thread())
+
+    def should_arrange_concurrently(self):
+        self.assertLess(self.elapsed, 0.5)
+
+    def should_annihilate_classes(self):
+        for test_class in self.classes:
+            self.assertTrue(test_class.annihilated)
+
+
+class WhenParallelArrangeFails(_ParallelSuiteTestCase):
+    test_classes = (_FailingArrangeTest, _SlowArrangeTest)
+
+    def should_report_class_error(self):
+        self.assertEqual(len(self.result.errors), 1)
+
+    def should_skip_failed_class_assertions(self):
+        self.assertEqual(self.result.testsRun, 1)
+
+    def should_annihilate_failed_class(self):
+        self.assertTrue(self.classes[0].annihilated)
+
+
+class WhenClassIsNotParallelSafe(_ParallelSuiteTestCase):
+    test_classes = (_SerialArrangeTest,)
+
+    def should_arrange_in_main_thread(self):
+        self.assertIs(self.classes[0].arranged_in, threading.current_thread())
+
+
+class WhenParallelRunStopsEarly(_ParallelSuiteTestCase):
+    test_classes = (_FailingAssertionTest, _SlowArrangeTest, _SlowArrangeTest)
+    failfast = True
+
+    def should_stop_after_first_failure(self):
+        self.assertEqual(self.result.testsRun, 1)
+
+    def should_annihilate_arranged_classes_that_did_not_run(self):
+        self.assertEqual([cls.annihilated for cls in self.classes],
+                         [True, True, True])
+
+    def should_not_leave_arrangements_behind(self):
+        for test_class in self.classes:
+            self.assertNotIn('_arrangement', vars(test_class))
+
+
+class WhenArrangingEnvironmentOverlaysInParallel(_ParallelSuiteTestCase):
+    test_classes = (_OverlaySettingTest, _OverlayReadingTest)
+    max_workers = 1
+
+    def should_succeed(self):
+        self.assertEqual(self.result.testsRun, 4)
+        self.assertTrue(self.result.wasSuccessful(),
+                        self.result.failures + self.result.errors)
+
+    def should_not_leak_overlay_into_other_classes(self):
+        self.assertIsNone(self.classes[1].arranged_with)
+
+    def should_not_leak_overlay_into_main_thread(self):
+        self.assertNotIn('TEST_HELPERS_ONLY_A', os.environ)
+
+    def should_discard_class_contexts(self):
+        for test_class in self.classes:
+            self.assertNotIn('_class_context', vars(test_class))
+
+
+class WhenArrangingLocalPatchesInParallel(_ParallelSuiteTestCase):
+    test_classes = (_LocalPatchSettingTest, _LocalPatchReadingTest)
+    max_workers = 1
+
+    def should_succeed(self):
+        self.assertEqual(self.result.testsRun, 4)
+        self.assertTrue(self.result.wasSuccessful(),
+                        self.result.failures + self.result.errors)
+
+    def should_not_leak_patch_into_other_classes(self):
+        self.assertEqual(self.classes[1].arranged_with, 'original')
+
+    def should_not_leak_patch_into_main_thread(self):
+        self.assertEqual(patched_function(), 'original')
@@ -1,6 +1,9 @@
+import os
+
 import psycopg2
 
-from test_helpers import bases, compat, mixins, postgres
+from test_helpers import bases, compat, mixins, postgres, resources
+from test_helpers.mixins import postgres as postgres_mixins
 
 
 class WhenRemovingDatabases(mixins.PatchMixin, bases.BaseTest):
@@ -64,9 +67,19 @@ class WhenCreatingDatabaseMoreThanOnce(bases.BaseTest):
         cls.db_object.create()
         cls.db_object.create()
 
+    @classmethod
+    def annihilate(cls):
+        super(WhenCreatingDatabaseMoreThanOnce, cls).annihilate()
+        cls.db_object.drop()
+        postgres._temporary_databases.remove(cls.db_object)
+
     def should_only_run_ddl_once(self):
         self.assertEqual(self.db_object._run_ddl.call_count, 1)
 
+    def should_track_database_until_dropped(self):
+        self.assertIn(self.db_object, [
+            r.value for r in resources.live_resources(kind='postgres')])
+
 
 class WhenDroppingUncreatedDatabase(bases.BaseTest):
 
@@ -82,3 +95,441 @@ class WhenDroppingUncreatedDatabase(bases.BaseTest):
 
     def should_not_run_ddl(self):
         self.assertFalse(self.db_object._run_ddl.called)
+
+
+class _SchemaTestCase(mixins.PatchMixin, bases.BaseTest):
+    patch_prefix = 'test_helpers.postgres'
+
+    @classmethod
+    def configure(cls):
+        super(_SchemaTestCase, cls).configure()
+        cls.create_patch('_temporary_schemas', new_callable=list)
+        cls.database = postgres.TemporaryDatabase(host='db', port='5432')
+        cls.database._database_name = 'testshared'
+        cls.connection = compat.mock.MagicMock()
+        cls.cursor = cls.connection.cursor.return_value.__enter__.return_value
+        cls.connect = cls.create_patch('psycopg2.connect')
+        cls.connect.return_value = cls.connection
+        cls.schema = postgres.TemporarySchema(database=cls.database)
+
+    @classmethod
+    def annihilate(cls):
+        super(_SchemaTestCase, cls).annihilate()
+        resources.unregister(cls.schema)
+
+    @classmethod
+    def statements(cls):
+        return [c[0][0] for c in cls.cursor.execute.call_args_list]
+
+
+class WhenCreatingTemporarySchema(_SchemaTestCase):
+
+    @classmethod
+    def execute(cls):
+        cls.schema.create()
+        cls.created = cls.statements()
+        cls.schema.drop()
+
+    def should_connect_to_database(self):
+        self.assertEqual(self.connect.call_args[1]['database'], 'testshared')
+
+    def should_create_schema(self):
+        self.assertEqual(len(self.created), 1)
+        self.assertTrue(self.created[0].startswith('CREATE SCHEMA "test'))
+
+    def should_drop_schema(self):
+        self.assertTrue(self.statements()[-1].startswith(
+            'DROP SCHEMA IF EXISTS "test'))
+        self.assertTrue(self.statements()[-1].endswith('CASCADE'))
+
+    def should_forget_schema(self):
+        self.assertIsNone(self.schema.schema_name)
+        self.assertEqual(postgres._temporary_schemas, [])
+
+
+class WhenCreatingTemporarySchemaFromTemplate(_SchemaTestCase):
+
+    @classmethod
+    def configure(cls):
+        super(WhenCreatingTemporarySchemaFromTemplate, cls).configure()
+        cls.cursor.fetchall.side_effect = [
+            [('accounts',), ('users',)],
+            [('accounts', 'id', 'accounts_id_seq')],
+            [('users', 'users_account_fk',
+              'FOREIGN KEY (account_id) REFERENCES accounts(id)')],
+        ]
+
+    @classmethod
+    def execute(cls):
+        cls.schema.create(template='template')
+        cls.quoted = '"{0}"'.format(cls.schema.schema_name)
+
+    def should_copy_tables(self):
+        self.assertIn(
+            'CREATE TABLE {0}."users" (LIKE "template"."users" '
+            'INCLUDING ALL)'.format(self.quoted), self.statements())
+
+    def should_create_owned_sequences(self):
+        self.assertIn(
+            'CREATE SEQUENCE {0}."accounts_id_seq" OWNED BY '
+            '{0}."accounts"."id"'.format(self.quoted), self.statements())
+
+    def should_point_defaults_at_new_sequences(self):
+        self.cursor.execute.assert_any_call(
+            'ALTER TABLE {0}."accounts" ALTER COLUMN "id" SET DEFAULT '
+            'nextval(%s::regclass)'.format(self.quoted),
+            ('{0}."accounts_id_seq"'.format(self.quoted),))
+
+    def should_copy_foreign_keys_within_new_schema(self):
+        statements = self.statements()
+        self.assertEqual(statements[-2],
+                         'SET LOCAL search_path TO {0}'.format(self.quoted))
+        self.assertEqual(
+            statements[-1],
+            'ALTER TABLE {0}."users" ADD CONSTRAINT "users_account_fk" '
+            'FOREIGN KEY (account_id) REFERENCES accounts(id)'.format(
+                self.quoted))
+
+
+class WhenExportingTemporarySchemaEnvironment(mixins.EnvironmentMixin,
+                                              _SchemaTestCase):
+
+    @classmethod
+    def configure(cls):
+        super(WhenExportingTemporarySchemaEnvironment, cls).configure()
+        for name in ('PGHOST', 'PGPORT', 'PGUSER', 'PGDATABASE',
+                     'PGOPTIONS'):
+            cls.unset_environment_variable(name)
+        cls.schema.create()
+
+    @classmethod
+    def execute(cls):
+        cls.schema.set_environment()
+
+    def should_export_database(self):
+        self.assertEqual(os.environ['PGDATABASE'], 'testshared')
+
+    def should_export_search_path(self):
+        self.assertEqual(
+            os.environ['PGOPTIONS'],
+            '-c search_path={0},public'.format(self.schema.schema_name))
+
+    def should_include_search_path_in_connection_parameters(self):
+        self.assertEqual(self.schema.connection_parameters['options'],
+                         os.environ['PGOPTIONS'])
+
+
+class WhenExportingTemporarySchemaWithOtherOptions(mixins.EnvironmentMixin,
+                                                   _SchemaTestCase):
+
+    @classmethod
+    def configure(cls):
+        super(WhenExportingTemporarySchemaWithOtherOptions, cls).configure()
+        for name in ('PGHOST', 'PGPORT', 'PGUSER', 'PGDATABASE'):
+            cls.unset_environment_variable(name)
+        cls.set_environment_variable(
+            'PGOPTIONS', '-c statement_timeout=5000 -c search_path=other')
+        cls.schema.create()
+
+    @classmethod
+    def execute(cls):
+        cls.schema.set_environment()
+
+    def should_keep_other_options(self):
+        self.assertEqual(
+            os.environ['PGOPTIONS'],
+            '-c statement_timeout=5000 -c search_path={0},public'.format(
+                self.schema.schema_name))
+
+
+class WhenUsingSharedDatabase(mixins.PatchMixin, bases.BaseTest):
+    patch_prefix = 'test_helpers.postgres'
+
+    @classmethod
+    def configure(cls):
+        super(WhenUsingSharedDatabase, cls).configure()
+        cls.create_patch('_shared_databases', new_callable=dict)
+        cls.create_patch('_temporary_databases', new_callable=list)
+        cls.run_ddl = cls.create_patch('TemporaryDatabase._run_ddl')
+
+    @classmethod
+    def execute(cls):
+        cls.first = postgres.shared_database(host='db')
+        cls.second = postgres.shared_database(host='db')
+        cls.other = postgres.shared_database(host='other')
+
+    @classmethod
+    def annihilate(cls):
+        super(WhenUsingSharedDatabase, cls).annihilate()
+        for database in (cls.first, cls.other):
+            resources.unregister(database)
+
+    def should_reuse_database(self):
+        self.assertIs(self.second, self.first)
+
+    def should_create_database_per_parameters(self):
+        self.assertIsNot(self.other, self.first)
+        self.assertEqual(self.run_ddl.call_count, 2)
+
+    def should_not_attribute_database_to_test(self):
+        self.assertEqual(
+            [r.owner for r in resources.live_resources(kind='postgres')
+             if r.value in (self.first, self.other)], [None, None])
+
+
+class WhenCapturingQueries(mixins.PatchMixin, bases.BaseTest):
+    patch_prefix = 'test_helpers.postgres'
+
+    @classmethod
+    def configure(cls):
+        super(WhenCapturingQueries, cls).configure()
+        cls.connection = compat.mock.MagicMock(server_version=150004)
+        cls.cursor = cls.connection.cursor.return_value.__enter__.return_value
+        cls.cursor.fetchall.side_effect = [
+            [(1, 'SELECT * FROM users', 2, 4.0, 2),
+             (2, 'SELECT 1', 5, 1.0, 5),
+             (8, 'SELECT queryid FROM pg_stat_statements', 3, 3.0, 30)],
+            [('public', 'users', 3), ('audit', 'events', 1)],
+            [(1, 'SELECT * FROM users', 2, 4.0, 2),
+             (2, 'SELECT 1', 5, 1.0, 5),
+             (8, 'SELECT queryid FROM pg_stat_statements', 4, 4.0, 40),
+             (9, 'SELECT seq_scan FROM pg_stat_user_tables', 1, 1.0, 3)],
+            [(1, 'SELECT * FROM users', 12, 24.0, 12),
+             (2, 'SELECT 1', 5, 1.0, 5),
+             (3, 'SELECT * FROM posts WHERE user_id = $1', 10, 1500.0, 30),
+             (4, 'SELECT * FROM pg_stat_activity', 1, 2.0, 1),
+             (8, 'SELECT queryid FROM pg_stat_statements', 5, 5.0, 50),
+             (9, 'SELECT seq_scan FROM pg_stat_user_tables', 1, 1.0, 3)],
+            [('public', 'users', 3), ('public', 'posts', 10),
+             ('audit', 'events', 2)],
+        ]
+        cls.cursor.fetchone.side_effect = [(0.25,), (None,)]
+        cls.connect = cls.create_patch('psycopg2.connect')
+        cls.connect.return_value = cls.connection
+        cls.sleep = cls.create_patch('time.sleep')
+        cls.database = postgres.TemporaryDatabase(host='db', port='5432')
+        cls.database._database_name = 'testcapture'
+
+    @classmethod
+    def execute(cls):
+        with cls.database.capture_queries() as cls.capture:
+            pass
+        cls.sequential_scans = cls.capture.sequential_scans
+
+    def should_connect_to_database(self):
+        self.assertEqual(self.connect.call_args[1]['database'],
+                         'testcapture')
+
+    def should_create_extension(self):
+        self.cursor.execute.assert_any_call(
+            'CREATE EXTENSION IF NOT EXISTS pg_stat_statements')
+
+    def should_read_execution_time(self):
+        self.assertIn('sum(total_exec_time)',
+                      self.cursor.execute.call_args_list[1][0][0])
+
+    def should_record_new_calls_by_time(self):
+        self.assertEqual(self.capture.statements, [
+            postgres.Statement(
+                'SELECT * FROM posts WHERE user_id = $1', 10, 1.5, 30),
+            postgres.Statement('SELECT * FROM users', 10, 0.02, 10),
+            postgres.Statement('SELECT * FROM pg_stat_activity', 1, 0.002, 1),
+        ])
+
+    def should_count_queries(self):
+        self.assertEqual(self.capture.query_count, 21)
+
+    def should_total_time(self):
+        self.assertAlmostEqual(self.capture.total_time, 1.522)
+
+    def should_flush_own_statistics(self):
+        self.cursor.execute.assert_any_call(
+            'SELECT pg_catalog.pg_stat_force_next_flush()')
+
+    def should_poll_until_sessions_reported(self):
+        self.sleep.assert_called_once_with(0.1)
+
+    def should_clear_statistics_snapshot(self):
+        self.cursor.execute.assert_any_call(
+            'SELECT pg_catalog.pg_stat_clear_snapshot()')
+
+    def should_report_sequential_scans(self):
+        self.assertEqual(self.sequential_scans,
+                         {'posts': 10, 'audit.events': 1})
+
+
+class WhenCapturingQueriesOfIdleDatabase(mixins.PatchMixin, bases.BaseTest):
+    patch_prefix = 'test_helpers.postgres'
+
+    @classmethod
+    def configure(cls):
+        super(WhenCapturingQueriesOfIdleDatabase, cls).configure()
+        cls.connection = compat.mock.MagicMock(server_version=160002)
+        cls.cursor = cls.connection.cursor.return_value.__enter__.return_value
+        cls.cursor.fetchall.return_value = []
+        cls.cursor.fetchone.return_value = (None,)
+        cls.create_patch('psycopg2.connect').return_value = cls.connection
+        cls.sleep = cls.create_patch('time.sleep')
+        cls.capture = postgres.QueryCapture(postgres.TemporaryDatabase())
+
+    @classmethod
+    def execute(cls):
+        with cls.capture:
+            pass
+        cls.sequential_scans = cls.capture.sequential_scans
+
+    def should_not_wait_for_table_statistics(self):
+        self.assertFalse(self.sleep.called)
+
+
+class WhenCapturingQueriesOfBusyDatabase(mixins.PatchMixin, bases.BaseTest):
+    patch_prefix = 'test_helpers.postgres'
+
+    @classmethod
+    def configure(cls):
+        super(WhenCapturingQueriesOfBusyDatabase, cls).configure()
+        cls.connection = compat.mock.MagicMock(server_version=160002)
+        cls.cursor = cls.connection.cursor.return_value.__enter__.return_value
+        cls.cursor.fetchall.return_value = []
+        cls.cursor.fetchone.return_value = (0.0,)
+        cls.create_patch('psycopg2.connect').return_value = cls.connection
+        cls.sleep = cls.create_patch('time.sleep')
+        cls.capture = postgres.QueryCapture(postgres.TemporaryDatabase())
+        cls.capture.IDLE_STATS_DELAY = 0.01
+
+    @classmethod
+    def execute(cls):
+        with cls.capture:
+            pass
+        cls.sequential_scans = cls.capture.sequential_scans
+
+    def should_stop_polling_after_idle_delay(self):
+        self.assertEqual(self.sequential_scans, {})
+
+    def should_wait_between_polls(self):
+        self.assertTrue(self.sleep.called)
+        for call in self.sleep.call_args_list:
+            self.assertLessEqual(call[0][0], 0.01)
+
+
+class WhenCapturingQueriesOfSharedDatabase(mixins.PatchMixin,
+                                           bases.BaseTest):
+    patch_prefix = 'test_helpers.postgres'
+
+    @classmethod
+    def configure(cls):
+        super(WhenCapturingQueriesOfSharedDatabase, cls).configure()
+        cls.database = postgres.TemporaryDatabase()
+        cls.create_patch('_shared_databases',
+                         new={('template0', ()): cls.database})
+        cls.schema = postgres.TemporarySchema(database=cls.database)
+
+    @classmethod
+    def execute(cls):
+        cls.errors = []
+        for target in (cls.database, cls.schema):
+            try:
+                target.capture_queries()
+            except RuntimeError as error:
+                cls.errors.append(error)
+
+    def should_refuse_database_and_schema(self):
+        self.assertEqual(len(self.errors), 2)
+
+
+class WhenCapturingQueriesOnOldServer(mixins.PatchMixin, bases.BaseTest):
+    patch_prefix = 'test_helpers.postgres'
+
+    @classmethod
+    def configure(cls):
+        super(WhenCapturingQueriesOnOldServer, cls).configure()
+        cls.connection = compat.mock.MagicMock(server_version=120010)
+        cls.cursor = cls.connection.cursor.return_value.__enter__.return_value
+        cls.cursor.fetchall.return_value = []
+        cls.create_patch('psycopg2.connect').return_value = cls.connection
+        cls.capture = postgres.QueryCapture(postgres.TemporaryDatabase())
+
+    @classmethod
+    def execute(cls):
+        cls.capture.start()
+        cls.capture.stop()
+
+    def should_read_total_time(self):
+        self.assertIn('sum(total_time)',
+                      self.cursor.execute.call_args_list[1][0][0])
+
+    def should_not_record_statements(self):
+        self.assertEqual(self.capture.query_count, 0)
+
+
+class _FakeCapture(object):
+
+    def __init__(self, events):
+        self.events = events
+        self.statements = [postgres.Statement('SELECT 1', 3, 0.01, 3)]
+        self.query_count = 3
+        self.sequential_scans = {'users': 2}
+
+    def __enter__(self):
+        self.events.append('start')
+        return self
+
+    def __exit__(self, *exc_info):
+        self.events.append('stop')
+
+
+class WhenCapturingQueriesOfExecute(postgres_mixins.QueryCaptureMixin,
+                                    bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(WhenCapturingQueriesOfExecute, cls).configure()
+        cls.events = ['configure']
+        cls.capture_database = compat.mock.Mock()
+        cls.capture_database.capture_queries.side_effect = (
+            lambda: _FakeCapture(cls.events))
+
+    @classmethod
+    def execute(cls):
+        cls.events.append('execute')
+
+    def should_only_capture_execute(self):
+        self.assertEqual(self.events,
+                         ['configure', 'start', 'execute', 'stop'])
+
+    def should_save_capture(self):
+        self.assertEqual(self.queries.query_count, 3)
+
+    def should_pass_matching_query_count(self):
+        self.assert_query_count(3)
+
+    def should_list_statements_when_query_count_differs(self):
+        with self.assertRaises(AssertionError) as context:
+            self.assert_query_count(1)
+        self.assertIn('3 statements were run instead of 1:\n'
+                      '     3  SELECT 1', str(context.exception))
+
+    def should_pass_when_other_tables_are_scanned(self):
+        self.assert_no_sequential_scans('posts')
+
+    def should_fail_when_table_is_scanned(self):
+        with self.assertRaises(AssertionError) as context:
+            self.assert_no_sequential_scans()
+        self.assertIn('sequential scans of users (2)',
+                      str(context.exception))
+
+
+class WhenCaptureDatabaseIsNotConfigured(postgres_mixins.QueryCaptureMixin,
+                                         bases.BaseTest):
+
+    def should_explain_failed_query_count(self):
+        with self.assertRaises(AssertionError) as context:
+            self.assert_query_count(1)
+        self.assertIn('capture_database is not configured',
+                      str(context.exception))
+
+    def should_explain_failed_sequential_scan_check(self):
+        with self.assertRaises(AssertionError) as context:
+            self.assert_no_sequential_scans()
+        self.assertIn('capture_database is not configured',
+                      str(context.exception))
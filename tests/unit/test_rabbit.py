@@ -6,7 +6,7 @@ import re
 
 import requests.models
 
-from test_helpers import bases, mixins, rabbit
+from test_helpers import bases, mixins, rabbit, resources
 
 
 class FakeSession(object):
@@ -75,6 +75,7 @@ class _RabbitTestCase(mixins.PatchMixin, bases.BaseTest):
     @classmethod
     def annihilate(cls):
         super(_RabbitTestCase, cls).annihilate()
+        resources.unregister(cls.fixture)  # normally removed at exit
         os.environ.pop('AMQP', None)
         if cls._saved_ampq_var is not None:
             os.environ['AMQP'] = cls._saved_ampq_var
@@ -132,6 +133,11 @@ class WhenInstallingVirtualHostAndSetPermissionsFails(
         self.atexit.register.assert_called_once_with(
             self.fixture.remove_virtual_host)
 
+    def should_track_virtual_host_until_removed(self):
+        self.assertEqual(
+            [r.value for r in resources.live_resources(kind='vhost')
+             if r.value is self.fixture], [self.fixture])
+
     def should_raise_exception(self):
         self.assertIsNotNone(self.exception)
 
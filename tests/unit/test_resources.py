@@ -0,0 +1,190 @@
+import collections
+
+from test_helpers import bases, mixins, resources
+from test_helpers.mixins import fixtures
+
+
+class _ResourceTestCase(mixins.PatchMixin, bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(_ResourceTestCase, cls).configure()
+        cls.create_patch('test_helpers.resources._live', new={})
+        cls.create_patch('test_helpers.resources._counts',
+                         new=collections.defaultdict(int))
+        cls.create_patch('test_helpers.resources._leaks', new={})
+        cls.create_patch('test_helpers.resources._budgets', new={})
+        cls.create_patch('test_helpers.resources._budgets_loaded', new=True)
+        cls.create_patch('test_helpers.resources._logger')
+
+
+class WhenResourceBudgetIsExceeded(_ResourceTestCase):
+
+    @classmethod
+    def execute(cls):
+        resources.set_budget('postgres', 1)
+        resources.register('postgres', 'first', 'first database')
+        try:
+            resources.register('postgres', 'second', 'second database')
+        except resources.ResourceBudgetExceeded as error:
+            cls.exception = error
+        resources.register('vhost', 'vhost', 'virtual host')
+
+    def should_raise_budget_exceeded(self):
+        self.assertEqual(
+            str(self.exception),
+            'cannot create postgres second database: 1 of 1 already live')
+
+    def should_not_register_over_budget_resource(self):
+        self.assertEqual(
+            [r.description for r in resources.live_resources('postgres')],
+            ['first database'])
+
+    def should_not_limit_other_kinds(self):
+        self.assertEqual(len(resources.live_resources('vhost')), 1)
+
+
+class WhenResourceBudgetIsConfigured(mixins.EnvironmentMixin,
+                                     _ResourceTestCase):
+
+    @classmethod
+    def configure(cls):
+        super(WhenResourceBudgetIsConfigured, cls).configure()
+        cls.set_environment_variable('TEST_HELPERS_RESOURCE_BUDGET',
+                                     'postgres=1, vhost=3')
+
+    @classmethod
+    def execute(cls):
+        resources._budgets_loaded = False
+        resources.set_budget('vhost', 2)
+        resources.register('postgres', 'value', 'database')
+
+    def should_apply_environment_budget(self):
+        self.assertEqual(resources._budgets['postgres'], 1)
+
+    def should_prefer_explicit_budget(self):
+        self.assertEqual(resources._budgets['vhost'], 2)
+
+
+class WhenResourceBudgetIsMalformed(mixins.EnvironmentMixin,
+                                    _ResourceTestCase):
+
+    @classmethod
+    def configure(cls):
+        super(WhenResourceBudgetIsMalformed, cls).configure()
+        cls.set_environment_variable('TEST_HELPERS_RESOURCE_BUDGET',
+                                     'postgres=many')
+
+    @classmethod
+    def execute(cls):
+        resources._budgets_loaded = False
+        try:
+            resources.register('postgres', 'value', 'database')
+        except ValueError as error:
+            cls.exception = error
+
+    def should_name_environment_variable(self):
+        self.assertIn('TEST_HELPERS_RESOURCE_BUDGET', str(self.exception))
+
+    def should_not_register_resource(self):
+        self.assertEqual(resources.live_resources('postgres'), [])
+
+
+class WhenResourceIsRegisteredAgain(_ResourceTestCase):
+
+    @classmethod
+    def execute(cls):
+        resources.set_budget('postgres', 1)
+        resources.register('postgres', 'value', 'database')
+        resources.register('vhost', 'value', 'virtual host')
+        resources.register('postgres', 'other', 'other database')
+        resources.unregister('other')
+        resources.register('postgres', 'another', 'another database')
+
+    def should_replace_resource(self):
+        self.assertEqual(
+            [r.description for r in resources.live_resources('vhost')],
+            ['virtual host'])
+
+    def should_release_budget_of_replaced_kind(self):
+        self.assertEqual(
+            [r.description for r in resources.live_resources('postgres')],
+            ['another database'])
+
+
+class _LeakyTest(bases.BaseTest):
+    resource = None
+
+    @classmethod
+    def configure(cls):
+        cls.resource = object()
+        resources.register('vhost', cls.resource, 'leaked vhost')
+
+
+class _CleanTest(_LeakyTest):
+
+    @classmethod
+    def annihilate(cls):
+        resources.unregister(cls.resource)
+
+
+class WhenTestClassLeaksResource(_ResourceTestCase):
+
+    @classmethod
+    def execute(cls):
+        cls.leaky = type('Leaky', (_LeakyTest,), {})
+        cls.leaky.setUpClass()
+        cls.owner = resources.live_resources('vhost')[0].owner
+        cls.leaky.tearDownClass()
+
+    def should_attribute_resource_to_class(self):
+        self.assertEqual(self.owner, 'tests.unit.test_resources.Leaky')
+
+    def should_record_leak(self):
+        self.assertEqual(
+            resources._leaks['tests.unit.test_resources.Leaky'],
+            [{'kind': 'vhost', 'description': 'leaked vhost'}])
+
+    def should_log_leak(self):
+        self.assertEqual(resources._logger.warning.call_count, 1)
+
+    def should_disown_leaked_resource(self):
+        self.assertIsNone(resources.live_resources('vhost')[0].owner)
+
+
+class WhenTestClassReleasesResource(_ResourceTestCase):
+
+    @classmethod
+    def execute(cls):
+        cls.clean = type('Clean', (_CleanTest,), {})
+        cls.clean.setUpClass()
+        cls.clean.tearDownClass()
+
+    def should_not_record_leak(self):
+        self.assertEqual(resources._leaks, {})
+
+
+class WhenFixtureCreatesResource(_ResourceTestCase):
+
+    @classmethod
+    def execute(cls):
+        with resources.owned_by('owner'):
+            scheduler = fixtures.FixtureScheduler({
+                'vhost': fixtures.Fixture(
+                    lambda: resources.register('vhost', cls, 'vhost'))})
+            scheduler.start()
+
+    def should_attribute_resource_to_scheduling_owner(self):
+        self.assertEqual(resources.live_resources('vhost')[0].owner, 'owner')
+
+
+class WhenPatchMixinCreatesPatch(_ResourceTestCase):
+
+    @classmethod
+    def execute(cls):
+        cls.create_patch('test_helpers.resources.current_owner')
+        cls.patches = resources.live_resources('patch')
+
+    def should_register_active_patch(self):
+        self.assertIn('test_helpers.resources.current_owner',
+                      [patch.description for patch in self.patches])
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+import json
+
+from test_helpers import bases, mixins, serializers
+
+
+class WhenCreatingJsonSerializerWithoutBackend(mixins.PatchMixin,
+                                               bases.BaseTest):
+    patch_prefix = 'test_helpers.serializers'
+
+    @classmethod
+    def configure(cls):
+        super(WhenCreatingJsonSerializerWithoutBackend, cls).configure()
+        cls.create_patch('JsonSerializer.BACKENDS',
+                         new=('not_a_json_module', 'json'))
+
+    @classmethod
+    def execute(cls):
+        cls.serializer = serializers.JsonSerializer()
+
+    def should_fall_back_to_next_backend(self):
+        self.assertEqual(self.serializer.backend, 'json')
+
+
+class _JsonSerializerTestCase(bases.BaseTest):
+    backend = None
+
+    @classmethod
+    def execute(cls):
+        cls.serializer = serializers.JsonSerializer(cls.backend)
+        cls.encoded = cls.serializer.dumps({'key': u'café'})
+        cls.decoded = cls.serializer.loads(cls.encoded)
+
+    def should_encode_to_bytes(self):
+        self.assertIsInstance(self.encoded, bytes)
+
+    def should_decode_from_bytes(self):
+        self.assertEqual(self.decoded, {'key': u'café'})
+
+
+class WhenUsingStandardLibraryJsonSerializer(_JsonSerializerTestCase):
+    backend = 'json'
+
+
+class WhenUsingDefaultJsonSerializer(_JsonSerializerTestCase):
+
+    def should_use_standard_library(self):
+        self.assertEqual(self.serializer.backend, 'json')
+
+    def should_encode_like_json_dumps(self):
+        value = {'b': [1, 2], 'a': u'café/', 1: 2 ** 70}
+        self.assertEqual(self.serializer.dumps(value),
+                         json.dumps(value).encode('utf-8'))
+
+
+class WhenParsingContentType(bases.BaseTest):
+
+    @classmethod
+    def execute(cls):
+        cls.parsed = serializers.parse_content_type(
+            'Application/JSON; q=1; charset="ISO-8859-1"')
+        cls.parsed_again = serializers.parse_content_type(
+            'Application/JSON; q=1; charset="ISO-8859-1"')
+
+    def should_lowercase_media_type(self):
+        self.assertEqual(self.parsed.media_type, 'application/json')
+
+    def should_extract_charset(self):
+        self.assertEqual(self.parsed.charset, 'ISO-8859-1')
+
+    def should_memoize_result(self):
+        self.assertIs(self.parsed, self.parsed_again)
+
+
+class WhenParsingContentTypeWithoutCharset(bases.BaseTest):
+
+    @classmethod
+    def execute(cls):
+        cls.parsed = serializers.parse_content_type('text/plain')
+
+    def should_not_set_charset(self):
+        self.assertIsNone(self.parsed.charset)
+
+
+class WhenRegisteringSerializer(mixins.PatchMixin, bases.BaseTest):
+    patch_prefix = 'test_helpers.serializers'
+
+    @classmethod
+    def configure(cls):
+        super(WhenRegisteringSerializer, cls).configure()
+        cls.create_patch('_serializers', new=dict(serializers._serializers))
+        cls.create_patch('_serializer_lookups', new={})
+        cls.serializer = object()
+
+    @classmethod
+    def execute(cls):
+        serializers.get_serializer('application/vnd.example+xml')
+        serializers.register_serializer('Application/XML', cls.serializer)
+
+    def should_find_serializer_by_media_type(self):
+        self.assertIs(serializers.get_serializer('application/xml'),
+                      self.serializer)
+
+    def should_find_serializer_by_suffix(self):
+        self.assertIs(
+            serializers.get_serializer('application/vnd.example+xml'),
+            self.serializer)
+
+    def should_find_json_serializer_for_json_types(self):
+        self.assertIsInstance(serializers.get_serializer('text/x-json'),
+                              serializers.JsonSerializer)
+
+    def should_not_find_unregistered_type(self):
+        self.assertIsNone(serializers.get_serializer('image/png'))
+
+
+class WhenUsingFormSerializer(bases.BaseTest):
+
+    @classmethod
+    def execute(cls):
+        cls.serializer = serializers.get_serializer(
+            'application/x-www-form-urlencoded')
+        cls.encoded = cls.serializer.dumps([('a', '1'), ('b', '')])
+        cls.decoded = cls.serializer.loads(cls.encoded)
+
+    def should_encode_to_bytes(self):
+        self.assertEqual(self.encoded, b'a=1&b=')
+
+    def should_decode_to_lists(self):
+        self.assertEqual(self.decoded, {'a': ['1'], 'b': ['']})
+
+
+class WhenUsingMsgpackSerializer(bases.BaseTest):
+
+    @classmethod
+    def execute(cls):
+        cls.serializer = serializers.get_serializer('application/msgpack')
+        cls.value = {'text': u'café', 'binary': b'\x00\xff', 'list': [1, 2]}
+        cls.decoded = cls.serializer.loads(cls.serializer.dumps(cls.value))
+
+    def should_round_trip_value(self):
+        self.assertEqual(self.decoded, self.value)
+
+
+class WhenUsingRawSerializer(bases.BaseTest):
+
+    @classmethod
+    def execute(cls):
+        cls.serializer = serializers.get_serializer('application/octet-stream')
+        cls.body = b'\x00\x01\x02'
+        cls.decoded = cls.serializer.loads(cls.body)
+
+    def should_return_memoryview(self):
+        self.assertIsInstance(self.decoded, memoryview)
+
+    def should_reference_original_body(self):
+        self.assertIs(self.decoded.obj, self.body)
+
+    def should_encode_bytes_like_value(self):
+        self.assertEqual(self.serializer.dumps(self.decoded), self.body)
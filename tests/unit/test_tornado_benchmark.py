@@ -0,0 +1,45 @@
+from __future__ import absolute_import
+
+from test_helpers import bases
+from test_helpers.compat import mock
+from test_helpers.mixins import tornado
+
+
+class WhenCalculatingBenchmarkPercentiles(bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(WhenCalculatingBenchmarkPercentiles, cls).configure()
+        cls.result = tornado.BenchmarkResult()
+        cls.response = mock.Mock(code=200, error=None)
+
+    @classmethod
+    def execute(cls):
+        for latency in range(100, 0, -1):
+            cls.result.record(latency / 1000.0, cls.response)
+        cls.result.elapsed = 2.0
+
+    def should_calculate_median(self):
+        self.assertEqual(self.result.p50, 0.05)
+
+    def should_calculate_95th_percentile(self):
+        self.assertEqual(self.result.p95, 0.095)
+
+    def should_calculate_99th_percentile(self):
+        self.assertEqual(self.result.p99, 0.099)
+
+    def should_calculate_throughput(self):
+        self.assertEqual(self.result.requests_per_second, 50.0)
+
+
+class WhenCalculatingPercentilesWithoutRequests(bases.BaseTest):
+
+    @classmethod
+    def execute(cls):
+        cls.result = tornado.BenchmarkResult()
+
+    def should_not_report_percentile(self):
+        self.assertIsNone(self.result.p50)
+
+    def should_not_report_throughput(self):
+        self.assertEqual(self.result.requests_per_second, 0.0)
@@ -0,0 +1,48 @@
+from __future__ import absolute_import
+
+from test_helpers import bases
+from test_helpers.mixins import tornado
+
+
+class WhenJsonLinesConsumerReceivesPartialLines(bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(WhenJsonLinesConsumerReceivesPartialLines, cls).configure()
+        cls.records = []
+        cls.consumer = tornado.JsonLinesConsumer(cls.records.append)
+
+    @classmethod
+    def execute(cls):
+        for chunk in (b'{"a":', b' 1}\n\n{"b"', b': 2}\n{"c": 3}'):
+            cls.consumer(chunk)
+        cls.records_before_close = list(cls.records)
+        cls.consumer.close()
+
+    def should_decode_complete_lines_as_received(self):
+        self.assertEqual(self.records_before_close, [{'a': 1}, {'b': 2}])
+
+    def should_decode_unterminated_record_on_close(self):
+        self.assertEqual(self.records, [{'a': 1}, {'b': 2}, {'c': 3}])
+
+    def should_count_records(self):
+        self.assertEqual(self.consumer.record_count, 3)
+
+
+class WhenDigestConsumerReceivesChunks(bases.BaseTest):
+
+    @classmethod
+    def execute(cls):
+        cls.consumer = tornado.DigestConsumer('md5')
+        cls.consumer(b'hello ')
+        cls.consumer(b'world')
+
+    def should_count_bytes(self):
+        self.assertEqual(self.consumer.size, 11)
+
+    def should_count_chunks(self):
+        self.assertEqual(self.consumer.chunk_count, 2)
+
+    def should_calculate_digest(self):
+        self.assertEqual(self.consumer.hexdigest(),
+                         '5eb63bbbe01eeed093cb22bb8f5acdc3')
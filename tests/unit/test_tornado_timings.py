@@ -0,0 +1,71 @@
+from __future__ import absolute_import
+
+import json
+import os
+import shutil
+import tempfile
+
+from test_helpers import bases, mixins
+from test_helpers.mixins import tornado
+
+
+class WhenWritingTimingReport(mixins.PatchMixin, bases.BaseTest):
+
+    @classmethod
+    def configure(cls):
+        super(WhenWritingTimingReport, cls).configure()
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.temp_dir, 'timings.json')
+        cls.create_patch('test_helpers.mixins.tornado._request_timings', new={
+            'tests.First': [
+                tornado.RequestTiming('GET', '/fast', 200, 0.1, 0.05, 10),
+                tornado.RequestTiming('GET', '/slow', 200, 0.5, 0.2, 20),
+            ],
+            'tests.Second': [
+                tornado.RequestTiming('GET', '/slow', 500, 1.5, None, 0),
+            ],
+        })
+
+    @classmethod
+    def annihilate(cls):
+        super(WhenWritingTimingReport, cls).annihilate()
+        shutil.rmtree(cls.temp_dir)
+
+    @classmethod
+    def execute(cls):
+        cls.report = tornado.write_timing_report(cls.path, slowest=1)
+        with open(cls.path) as report_file:
+            cls.written = json.load(report_file)
+
+    def should_write_report(self):
+        self.assertEqual(self.written, self.report)
+
+    def should_total_requests(self):
+        self.assertEqual(self.report['totals']['request_count'], 3)
+
+    def should_total_body_size(self):
+        self.assertEqual(self.report['totals']['body_size'], 30)
+
+    def should_summarize_classes(self):
+        self.assertEqual(self.report['classes']['tests.Second'],
+                         {'request_count': 1, 'request_time': 1.5})
+
+    def should_limit_slowest_endpoints(self):
+        self.assertEqual(len(self.report['slowest_endpoints']), 1)
+
+    def should_aggregate_slowest_endpoint(self):
+        endpoint = self.report['slowest_endpoints'][0]
+        self.assertEqual(endpoint['path'], '/slow')
+        self.assertEqual(endpoint['request_count'], 2)
+        self.assertEqual(endpoint['max_request_time'], 1.5)
+        self.assertEqual(endpoint['mean_time_to_first_byte'], 0.1)
+
+
+class WhenWritingTimingReportWithoutPath(bases.BaseTest):
+
+    @classmethod
+    def execute(cls):
+        cls.report = tornado.write_timing_report(path='')
+
+    def should_not_write_report(self):
+        self.assertIsNone(self.report)